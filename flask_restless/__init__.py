@@ -19,11 +19,19 @@ __version__ = '3.3.0'
 # The following names are available as part of the public API for Flask-Restless-NG.
 # End users of this package can import these names by doing
 # ``from flask_restless import APIManager``, for example.
+from .cache import ResourceCache  # noqa
 from .manager import APIManager  # noqa
 from .manager import IllegalArgumentError  # noqa
+from .pagination import CappedCount  # noqa
+from .pagination import CountStrategy  # noqa
+from .pagination import EstimatedCount  # noqa
+from .pagination import ExactCount  # noqa
+from .pagination import NoCount  # noqa
+from .pagination import WindowCount  # noqa
 from .serialization import DeserializationException  # noqa
 from .serialization import Deserializer  # noqa
 from .serialization import SerializationException  # noqa
 from .serialization import Serializer  # noqa
+from .serialization import json_default  # noqa
 from .views import CONTENT_TYPE  # noqa
 from .views import ProcessingException  # noqa
@@ -0,0 +1,175 @@
+# cache.py - cache of encoded resource objects
+#
+# This file is part of Flask-Restless.
+#
+# Flask-Restless is distributed under both the GNU Affero General Public
+# License version 3 and under the 3-clause BSD license. For more
+# information, see LICENSE.AGPL and LICENSE.BSD.
+"""Provides a cache of encoded resource objects.
+
+The :class:`ResourceCache` keeps the JSON encoding of resource objects,
+so that they are neither serialized nor encoded again when they appear
+in another response. Entries are invalidated when instances of the
+model are flushed to the database by a SQLAlchemy session.
+
+"""
+from collections import OrderedDict
+from collections import defaultdict
+from itertools import chain
+from threading import Lock
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy.orm.interfaces import MANYTOMANY
+from sqlalchemy.orm.interfaces import ONETOMANY
+
+from .helpers import get_model
+
+#: The key in :attr:`sqlalchemy.orm.Session.info` under which the
+#: resources flushed in the current transaction are kept.
+PENDING_KEY = 'flask_restless_flushed_resources'
+
+
+class EncodedResource(bytes):
+    """The JSON encoding of a resource object.
+
+    Documents that contain instances of this class in place of resource
+    objects are written with these bytes as they are, instead of encoding
+    the resource object again.
+
+    """
+
+
+class ResourceCache:
+    """A cache of encoded resource objects.
+
+    Entries are kept for each instance of a model, identified by its
+    primary key, and each variant of its resource object, like the sparse
+    fieldset requested by the client. At most `maxsize` instances are
+    kept; the least recently used ones are dropped first.
+
+    When an instance is created, updated or deleted, the entries for that
+    instance are dropped once the session is flushed, and once more when
+    the transaction is committed or rolled back. Since the linkage of a
+    to-many relationship depends on the instances on the other side of
+    the relationship, all entries for models with a to-many relationship
+    to the model of the changed instance are dropped as well.
+
+    Changes that are not made through a session the cache is listening
+    to, for example bulk updates, are not noticed; call :meth:`clear` in
+    that case.
+
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._identities: Dict[type, Set[Tuple]] = defaultdict(set)
+        self._dependent_models: Dict[type, Tuple[type, ...]] = {}
+        self._lock = Lock()
+
+    def listen(self, session):
+        """Invalidates entries when instances are flushed by `session`.
+
+        `session` can be anything that accepts SQLAlchemy session events,
+        like a session, a :class:`~sqlalchemy.orm.scoped_session` or a
+        :class:`~sqlalchemy.orm.sessionmaker`.
+
+        """
+        event.listen(session, 'after_flush', self._after_flush)
+        event.listen(session, 'after_commit', self._after_transaction)
+        event.listen(session, 'after_rollback', self._after_transaction)
+
+    def get(self, instance, variant: Hashable) -> Optional[EncodedResource]:
+        """Returns the encoded resource object of `instance` for the given
+        variant, or ``None`` if it is not in the cache.
+
+        """
+        key = self._key(instance)
+        if key is None:
+            return None
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is None:
+                return None
+            self._entries.move_to_end(key)
+            return variants.get(variant)
+
+    def set(self, instance, variant: Hashable, resource: bytes) -> EncodedResource:
+        """Stores the encoded resource object of `instance` for the given
+        variant and returns it as an :class:`EncodedResource`.
+
+        Instances that are not persistent yet are not stored.
+
+        """
+        resource = EncodedResource(resource)
+        key = self._key(instance)
+        if key is None:
+            return resource
+        model, identity = key
+        with self._lock:
+            self._entries.setdefault(key, {})[variant] = resource
+            self._entries.move_to_end(key)
+            self._identities[model].add(identity)
+            while len(self._entries) > self.maxsize:
+                (model, identity), _ = self._entries.popitem(last=False)
+                self._identities[model].discard(identity)
+        return resource
+
+    def invalidate(self, model: type, identity: Tuple):
+        """Drops the entries for the instance of `model` whose primary
+        key is `identity`, and for all instances of models with a to-many
+        relationship to `model`.
+
+        """
+        with self._lock:
+            self._entries.pop((model, identity), None)
+            self._identities[model].discard(identity)
+            for dependent in self._dependents(model):
+                for dependent_identity in self._identities.pop(dependent, ()):
+                    self._entries.pop((dependent, dependent_identity), None)
+
+    def clear(self):
+        """Drops all the entries."""
+        with self._lock:
+            self._entries.clear()
+            self._identities.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _dependents(self, model):
+        """Returns the models with a to-many relationship to `model`."""
+        dependents = self._dependent_models.get(model)
+        if dependents is None:
+            dependents = tuple(
+                mapper.class_ for mapper in inspect(model).registry.mappers
+                if any(relationship.direction in (ONETOMANY, MANYTOMANY) and issubclass(model, relationship.mapper.class_)
+                       for relationship in mapper.relationships)
+            )
+            self._dependent_models[model] = dependents
+        return dependents
+
+    @staticmethod
+    def _key(instance):
+        identity = inspect(instance).identity
+        if identity is None:
+            return None
+        return get_model(instance), identity
+
+    def _after_flush(self, session, flush_context):
+        pending = session.info.setdefault(PENDING_KEY, set())
+        for instance in chain(session.new, session.dirty, session.deleted):
+            model = get_model(instance)
+            identity = tuple(inspect(model).primary_key_from_instance(instance))
+            pending.add((model, identity))
+            self.invalidate(model, identity)
+
+    def _after_transaction(self, session):
+        for model, identity in session.info.pop(PENDING_KEY, ()):
+            self.invalidate(model, identity)
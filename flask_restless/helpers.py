@@ -12,10 +12,13 @@
 """Helper functions for Flask-Restless."""
 import datetime
 import inspect
+from collections import namedtuple
 from functools import lru_cache
+from functools import partial
 from itertools import chain
 from typing import Any
 from typing import Dict
+from typing import FrozenSet
 from typing import Generator
 from typing import Iterable
 from typing import List
@@ -50,6 +53,11 @@ RELATION_EXCLUDE_LIST = {'query', 'query_class', '_sa_class_manager', '_decl_cla
 #: attributes of a model class.
 COLUMN_TYPES = (InstrumentedAttribute, hybrid_property)
 
+#: The maximum number of values in the ``IN`` clause of a single query,
+#: like one that loads instances by their primary keys or one that loads
+#: the to-many linkage of a page of instances by their keys.
+MAX_IN_VALUES = 500
+
 #: Strings which, when received by the server as the value of a date or time
 #: field, indicate that the server should use the current time when setting the
 #: value of the field.
@@ -79,6 +87,30 @@ def session_query(session, model):
     return session.query(model)
 
 
+def is_unrestricted_query(session, model, query=None) -> bool:
+    """Returns ``True`` if `query`, which defaults to the query for `model`
+    given by :func:`session_query`, is the plain query for every instance
+    of `model`.
+
+    Shortcuts that read rows without that query, like reading an
+    association table or the identity map of `session`, are only correct
+    if this is ``True``, because they would bypass a custom ``query``
+    attribute of the model.
+
+    The statement and the execution options of `query` are compared with
+    those of ``session.query(model)``, so a filter, join, limit, ordering,
+    loader option or execution option counts as a restriction, even if it
+    does not leave out any rows. Restrictions that are not part of the
+    query, like ``do_orm_execute`` event handlers of the session, are not
+    detected.
+
+    """
+    if query is None:
+        query = session_query(session, model)
+    plain = session.query(model)
+    return query.statement.compare(plain.statement) and query.get_execution_options() == plain.get_execution_options()
+
+
 @lru_cache()
 def get_relations(model):
     """Returns a list of relation names of `model` (as a list of strings)."""
@@ -241,28 +273,42 @@ def query_by_primary_key(session, model, pk_value, primary_key=None):
 
     """
     pk_name = primary_key if primary_key else 'id'
-    pk_type = get_field_type(model, pk_name)
+    pk_value = _coerce_primary_key(model, pk_name, pk_value)
+    query = session_query(session, model)
+    return query.filter(getattr(model, pk_name) == pk_value)
 
+
+def _coerce_primary_key(model, pk_name, pk_value):
+    pk_type = get_field_type(model, pk_name)
     if isinstance(pk_type, Integer):
         try:
-            pk_value = int(pk_value)
+            return int(pk_value)
         except (ValueError, TypeError):
             pass
+    return pk_value
 
-    query = session_query(session, model)
-    return query.filter(getattr(model, pk_name) == pk_value)
 
+@lru_cache()
+def inclusion_tree(include: FrozenSet[str]) -> Dict[str, dict]:
+    """Returns the tree of relationship names described by the include
+    paths in `include`.
 
-def get_inclusions_for_instances(include: Set[str], instances) -> Set:
-    inclusion_tree: Dict[str, dict] = dict()
+    For example, ``{'comments.author', 'comments.article'}`` becomes
+    ``{'comments': {'author': {}, 'article': {}}}``. The returned
+    dictionary is shared between callers and must not be modified.
+
+    """
+    tree: Dict[str, dict] = dict()
     for path in include:
-        tree = path.split('.')
-        current_tree = inclusion_tree
-        for level in tree:
-            current_tree[level] = current_tree.get(level, {})
-            current_tree = current_tree[level]
+        current_tree = tree
+        for level in path.split('.'):
+            current_tree = current_tree.setdefault(level, {})
+    return tree
 
-    return set(chain.from_iterable(get_inclusions(inclusion_tree, instances)))
+
+def get_inclusions_for_instances(include: Set[str], instances) -> Set:
+    tree = inclusion_tree(frozenset(include))
+    return set(chain.from_iterable(get_inclusions(tree, instances)))
 
 
 def get_inclusions(inclusion_tree: Dict[str, dict], instances: Iterable) -> Generator:
@@ -286,6 +332,62 @@ def get_inclusions(inclusion_tree: Dict[str, dict], instances: Iterable) -> Gene
         inclusion_tree, instances = stack.pop()
 
 
+def get_by_many(session, model, pk_values, primary_key=None) -> Dict[Any, Any]:
+    """Returns a dictionary mapping each of `pk_values` to the instance of
+    `model` whose primary key has that value; values for which no such
+    instance exists are left out.
+
+    Instances already loaded in the identity map of `session` are used as
+    they are, and the others are loaded with one ``IN`` query for each
+    :data:`MAX_IN_VALUES` values. `primary_key` is as described in
+    :func:`query_by_primary_key`.
+
+    """
+    pk_name = primary_key if primary_key else 'id'
+    column = getattr(model, pk_name)
+    coerced = {value: _coerce_primary_key(model, pk_name, value) for value in pk_values}
+    query = session_query(session, model)
+    found = _identity_map_instances(session, model, pk_name, set(coerced.values())) if is_unrestricted_query(session, model, query) else {}
+    keys = list(set(coerced.values()) - found.keys())
+    for start in range(0, len(keys), MAX_IN_VALUES):
+        for instance in query.filter(column.in_(keys[start:start + MAX_IN_VALUES])):
+            key = getattr(instance, pk_name)
+            found[key] = instance
+            # Requested values are usually strings, like JSON API IDs.
+            found.setdefault(str(key), instance)
+    result = {}
+    for value, key in coerced.items():
+        instance = found.get(key)
+        if instance is None and not isinstance(key, str):
+            instance = found.get(str(key))
+        if instance is not None:
+            result[value] = instance
+    return result
+
+
+def _identity_map_instances(session, model, pk_name, keys) -> Dict[Any, Any]:
+    """Returns a dictionary mapping those of `keys` that identify an
+    instance of `model` in the identity map of `session` to that
+    instance.
+
+    Only the instances whose attributes are loaded are returned, since
+    the others would each be refreshed with a query of their own.
+
+    """
+    mapper = sqlalchemy_inspect(model)
+    if len(mapper.primary_key) != 1 or mapper.get_property_by_column(mapper.primary_key[0]).key != pk_name:
+        return {}
+    found = {}
+    for key in keys:
+        try:
+            instance = session.identity_map.get(mapper.identity_key_from_primary_key([key]))
+        except TypeError:
+            continue
+        if isinstance(instance, model) and instance not in session.deleted and not sqlalchemy_inspect(instance).expired:
+            found[key] = instance
+    return found
+
+
 def get_by(session, model, pk_value, primary_key):
     """Returns the first instance of `model` whose primary key has the value
     `pk_value`, or ``None`` if no such instance exists.
@@ -298,7 +400,7 @@ def get_by(session, model, pk_value, primary_key):
     return result.first()
 
 
-def string_to_datetime(model, fieldname, value):
+def string_to_datetime(model, fieldname, value, iso_only=False):
     """Casts `value` to a :class:`datetime.datetime` or
     :class:`datetime.timedelta` object if the given field of the given
     model is a date-like or interval column.
@@ -310,33 +412,90 @@ def string_to_datetime(model, fieldname, value):
     object corresponding to `value`. Otherwise, the `value` is returned
     unchanged.
 
+    `iso_only` is as described in :func:`parse_datetime_string`.
+
     """
-    if value is None:
+    coerce = coercer_for(get_field_type(model, fieldname))
+    if coerce is None:
         return value
-    # If this is a date, time or datetime field, parse it and convert it to
-    # the appropriate type.
-    field_type = get_field_type(model, fieldname)
+    return coerce(value, iso_only=iso_only)
+
+
+def coercer_for(field_type):
+    """Returns a function that converts a value received from the client
+    to a value of a field of the SQLAlchemy type `field_type`, or ``None``
+    if values of that type are used unchanged.
+
+    Strings are parsed for :class:`sqlalchemy.types.Date`,
+    :class:`sqlalchemy.types.Time` and :class:`sqlalchemy.types.DateTime`
+    fields, and integers are converted to :class:`datetime.timedelta`
+    objects for :class:`sqlalchemy.Interval` fields. The function takes
+    the value and the `iso_only` keyword argument of
+    :func:`parse_datetime_string`.
+
+    """
     if isinstance(field_type, (Date, Time, DateTime)):
-        # If the string is empty, no datetime can be inferred from it.
-        if value.strip() == '':
-            return None
-        # If the string is a string indicating that the value of should be the
-        # current datetime on the server, get the current datetime that way.
-        if value in CURRENT_TIME_MARKERS:
-            return getattr(func, value.lower())()
-        value_as_datetime = parse_datetime(value)
-        # If the attribute on the model needs to be a Date or Time object as
-        # opposed to a DateTime object, just get the date component of the
-        # datetime.
-        if isinstance(field_type, Date):
-            return value_as_datetime.date()
-        if isinstance(field_type, Time):
-            return value_as_datetime.timetz()
-        return value_as_datetime
-    # If this is an Interval field, convert the integer value to a timedelta.
-    if isinstance(field_type, Interval) and isinstance(value, int):
+        return partial(_to_datetime, field_type)
+    if isinstance(field_type, Interval):
+        return _to_timedelta
+    return None
+
+
+def parse_datetime_string(value: str, iso_only=False) -> datetime.datetime:
+    """Returns the :class:`datetime.datetime` represented by the string
+    `value`.
+
+    ISO 8601 strings, including those ending in ``Z``, are parsed with
+    :meth:`datetime.datetime.fromisoformat`. Other strings are parsed with
+    :func:`dateutil.parser.parse`, unless `iso_only` is ``True``, in
+    which case :exc:`ValueError` is raised.
+
+    """
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        # Before Python 3.11, `fromisoformat` does not accept the "Z" suffix.
+        if value.endswith(('Z', 'z')):
+            try:
+                return datetime.datetime.fromisoformat(value[:-1] + '+00:00')
+            except ValueError:
+                pass
+        if iso_only:
+            raise
+    return parse_datetime(value)
+
+
+def _to_datetime(field_type, value, iso_only=False):
+    if value is None:
+        return value
+    # If the string is empty, no datetime can be inferred from it.
+    if value.strip() == '':
+        return None
+    # If the string is a string indicating that the value of should be the
+    # current datetime on the server, get the current datetime that way.
+    if value in CURRENT_TIME_MARKERS:
+        return getattr(func, value.lower())()
+    # A time field may be given just the time.
+    if isinstance(field_type, Time):
+        try:
+            return datetime.time.fromisoformat(value)
+        except ValueError:
+            pass
+    value_as_datetime = parse_datetime_string(value, iso_only=iso_only)
+    # If the attribute on the model needs to be a Date or Time object as
+    # opposed to a DateTime object, just get the date component of the
+    # datetime.
+    if isinstance(field_type, Date):
+        return value_as_datetime.date()
+    if isinstance(field_type, Time):
+        return value_as_datetime.timetz()
+    return value_as_datetime
+
+
+def _to_timedelta(value, iso_only=False):
+    # Convert the integer number of seconds to a timedelta.
+    if isinstance(value, int):
         return datetime.timedelta(seconds=value)
-    # In any other case, simply copy the value unchanged.
     return value
 
 
@@ -356,7 +515,57 @@ def strings_to_datetimes(model, dictionary):
     This function outputs a new dictionary; it does not modify the argument.
 
     """
-    return {k: string_to_datetime(model, k, v) for k, v in dictionary.items()}
+    return coerce_fields(field_plan(model), dictionary)
+
+
+#: The fields of a model that can be set from a request document.
+#:
+#: `fields` is the set of the names of the fields for which
+#: :func:`has_field` returns ``True``, `coercers` maps the name of each
+#: date-like and interval field to the function returned by
+#: :func:`coercer_for`, and `relations` maps the name of each
+#: relationship and association proxy to the related model.
+FieldPlan = namedtuple('FieldPlan', ['fields', 'coercers', 'relations'])
+
+
+@lru_cache()
+def field_plan(model) -> FieldPlan:
+    """Returns the :data:`FieldPlan` of `model`, computed once, so that
+    deserializing a resource does not inspect the model again for each
+    field.
+
+    """
+    descriptors = sqlalchemy_inspect(model).all_orm_descriptors
+    names = set(dir(model)) | set(descriptors.keys())
+    fields = frozenset(name for name in names if has_field(model, name))
+    coercers = {}
+    relations = {}
+    for name in fields.intersection(descriptors.keys()):
+        try:
+            related_model = get_related_model(model, name)
+            field_type = get_field_type(model, name) if related_model is None else None
+        except Exception:
+            # The expression of a hybrid property may not be usable on
+            # the class, in which case the value is set unchanged.
+            continue
+        if related_model is not None:
+            relations[name] = related_model
+            continue
+        coerce = coercer_for(field_type)
+        if coerce is not None:
+            coercers[name] = coerce
+    return FieldPlan(fields, coercers, relations)
+
+
+def coerce_fields(plan: FieldPlan, dictionary, iso_only=False) -> Dict[str, Any]:
+    """Returns a new dictionary with the values of `dictionary` converted
+    by the coercers of `plan`, as in :func:`strings_to_datetimes`.
+
+    `iso_only` is as described in :func:`parse_datetime_string`.
+
+    """
+    coercers = plan.coercers
+    return {k: coercers[k](v, iso_only=iso_only) if k in coercers else v for k, v in dictionary.items()}
 
 
 def get_model(instance) -> type:
@@ -16,15 +16,24 @@ their SQLAlchemy models.
 
 """
 from collections import defaultdict
+from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Optional
+from typing import Union
 from uuid import uuid1
 
 from flask import Blueprint
+from flask import json
+from flask import request
 
 from . import registry
+from .cache import ResourceCache
 from .helpers import get_model
+from .helpers import get_relations
 from .helpers import primary_key_names
+from .pagination import CountStrategy
+from .pagination import count_strategy_for
 from .serialization import DefaultDeserializer
 from .serialization import DefaultSerializer
 from .serialization import Deserializer
@@ -52,6 +61,47 @@ class IllegalArgumentError(Exception):
     pass
 
 
+class LinkTemplates:
+    """The links of the resources of a model, computed up to the ID of
+    the resource.
+
+    `collection_url` is the URL of the collection of resources of the
+    model, and `relations` are the names of its relationships.
+
+    """
+
+    def __init__(self, collection_url: str, relations):
+        #: The URL of the collection of resources.
+        self.collection_url = collection_url
+        self._resource_prefix = f'{collection_url}/'
+        self._relation_suffixes = {relation: self._suffixes(relation) for relation in relations}
+        # An absolute path is relative to the host and any other path to the
+        # root URL of the application, as with urljoin.
+        self._host_relative = collection_url.startswith('/')
+
+    @staticmethod
+    def _suffixes(relation):
+        return f'/relationships/{relation}', f'/{relation}'
+
+    def resource_url(self, resource_id) -> str:
+        """Returns the absolute URL of the resource with the given ID for
+        the current request.
+
+        """
+        # Both roots are computed once per request by Werkzeug.
+        root = request.host_url[:-1] if self._host_relative else request.url_root
+        return f'{root}{self._resource_prefix}{resource_id}'
+
+    def relationship_links(self, resource_id, relation) -> Dict[str, str]:
+        """Returns the ``self`` and ``related`` links of a relationship of
+        the resource with the given ID.
+
+        """
+        suffixes = self._relation_suffixes.get(relation) or self._suffixes(relation)
+        resource_url = f'{self._resource_prefix}{resource_id}'
+        return {'self': resource_url + suffixes[0], 'related': resource_url + suffixes[1]}
+
+
 class APIManager:
     """Provides a method for creating a public ReSTful JSON API with respect
     to a given :class:`~flask.Flask` application object.
@@ -101,9 +151,28 @@ class APIManager:
     `include_links` controls whether to include link objects in resource objects
     https://jsonapi.org/format/#document-links
 
+    `json_dumps` and `json_loads` replace the functions used to encode
+    response documents and to decode request documents and filter
+    objects, for example with a faster JSON library. `json_dumps` may
+    return either a string or bytes. By default, :func:`flask.json.dumps`
+    and :func:`flask.json.loads` are used. For more information, see
+    :ref:`jsonbackend`.
+
+    `resource_cache` is a :class:`~flask_restless.ResourceCache` that keeps
+    the encoded resource objects fetched from the APIs created by this
+    manager. It is invalidated by the events of `session`. For more
+    information, see :ref:`resourcecache`.
+
+    If `iso_dates_only` is ``True``, values of date and time fields in
+    request documents and filter objects must be ISO 8601 strings.
+    Otherwise, strings in other formats are parsed with
+    :func:`dateutil.parser.parse`, which is much slower.
+
     """
 
-    def __init__(self, app=None, session=None, preprocessors=None, postprocessors=None, url_prefix='/api', include_links: bool = False):
+    def __init__(self, app=None, session=None, preprocessors=None, postprocessors=None, url_prefix='/api', include_links: bool = False,
+                 json_dumps: Optional[Callable[[Any], Union[str, bytes]]] = None, json_loads: Optional[Callable[[Union[str, bytes]], Any]] = None,
+                 resource_cache: Optional[ResourceCache] = None, iso_dates_only: bool = False):
         if session is None:
             raise ValueError('`session` can not be empty')
 
@@ -115,6 +184,10 @@ class APIManager:
         #: those models.
         self.created_apis_for: dict = {}
 
+        #: A mapping from models to the :class:`LinkTemplates` for the
+        #: resources of that model.
+        self.link_templates: Dict[Any, LinkTemplates] = {}
+
         #: List of blueprints created by :meth:`create_api` to be registered
         #: to the app when calling :meth:`init_app`.
         self.blueprints: list = []
@@ -131,6 +204,20 @@ class APIManager:
 
         self.include_links = include_links
 
+        #: The function that encodes response documents.
+        self.json_dumps = json_dumps or json.dumps
+
+        #: The function that decodes request documents and filter objects.
+        self.json_loads = json_loads or json.loads
+
+        #: Whether values of date and time fields must be ISO 8601 strings.
+        self.iso_dates_only = iso_dates_only
+
+        #: The cache of encoded resource objects, if any.
+        self.resource_cache = resource_cache
+        if resource_cache is not None:
+            resource_cache.listen(session)
+
     def url_for(self, model, **kw) -> str:
         """Returns the URL for the specified model, similar to
         :func:`flask.url_for`.
@@ -310,6 +397,11 @@ class APIManager:
             allow_delete_from_to_many_relationships: bool = False,
             allow_client_generated_ids: bool = False,
             allow_non_primary_key_id: bool = False,
+            serialize_from_rows: bool = False,
+            stream_unpaginated: bool = False,
+            linkage_limit: Optional[int] = None,
+            count_strategy: Union[CountStrategy, str, None] = None,
+            deferred_join_offset: Optional[int] = None,
     ):
         """Creates and returns a ReSTful API interface as a blueprint, but does
         not register it on any :class:`flask.Flask` application.
@@ -491,6 +583,44 @@ class APIManager:
         this be a UUID. This is ``False`` by default. For more information, see
         :ref:`creating`.
 
+        If `serialize_from_rows` is ``True``, requests to fetch the collection
+        of resources that do not include related resources select only the
+        columns needed for the response and serialize resource objects
+        straight from the result rows, without loading instances of `model`.
+        This only applies when the default serializer is used and every
+        requested field is either a column or a to-one relationship; other
+        requests load instances as usual. This is ``False`` by default.
+
+        If `stream_unpaginated` is ``True``, requests to fetch the whole
+        collection of resources (with a page size of zero, see
+        :ref:`pagination`) are fetched from the database and serialized in
+        chunks and the response is streamed to the client, instead of
+        building the whole document in memory. Collections are not streamed
+        if there are any ``GET_COLLECTION`` postprocessors, since they
+        expect the whole document. This is ``False`` by default.
+
+        `linkage_limit` is the maximum number of resource identifier objects
+        in the linkage of each to-many relationship of the resources in
+        responses from this API. The total number of related resources is
+        then given in the ``meta`` object of the relationship, and the
+        rest can be fetched from the relationship URL. Clients may request
+        a lower limit with the ``linkage[limit]`` query parameter, or any
+        limit if this is ``None``, the default. This only applies to
+        resources serialized by the default serializer.
+
+        `count_strategy` is the :class:`~flask_restless.CountStrategy` used
+        to find the total number of resources given in the ``meta`` object
+        of paginated collections, or the name of one: ``'exact'`` (the
+        default), ``'window'``, ``'capped'``, ``'estimated'`` or ``'none'``. Clients may
+        request a cheaper strategy for each request, see :ref:`counting`.
+
+        If `deferred_join_offset` is not ``None``, pages of collections
+        starting at this offset or past it are fetched in two queries: one
+        that selects only the primary keys of the resources of the page,
+        and one that loads those resources by their primary keys. See
+        :ref:`deferredjoin` for more information. This is ``None`` by
+        default.
+
         If `allow_functions` is ``True``, then :http:method:`get`
         requests to ``/api/eval/<collection_name>`` will return the
         result of evaluating SQL functions specified in the body of the
@@ -515,6 +645,10 @@ class APIManager:
             raise IllegalArgumentError(msg)
         if collection_name is None:
             collection_name = model.__table__.name
+        try:
+            count_strategy = count_strategy_for(count_strategy or 'exact')
+        except ValueError as exception:
+            raise IllegalArgumentError(str(exception)) from exception
 
         # convert all method names to upper case
         methods = frozenset((m.upper() for m in methods))
@@ -567,7 +701,10 @@ class APIManager:
                                max_page_size=max_page_size,
                                serializer=serializer,
                                deserializer=deserializer,
-                               includes=includes)
+                               includes=includes,
+                               linkage_limit=linkage_limit,
+                               count_strategy=count_strategy,
+                               deferred_join_offset=deferred_join_offset)
 
         # add the URL rules to the blueprint: the first is for methods on the
         # collection only, the second is for methods which may or may not
@@ -607,6 +744,7 @@ class APIManager:
             primary_key=primary_key,
             validation_exceptions=validation_exceptions,
             allow_to_many_replacement=allow_to_many_replacement,
+            count_strategy=count_strategy,
             # Keyword arguments RelationshipAPI.__init__()
             allow_delete_from_to_many_relationships=allow_delete_from_to_many_relationships
         )
@@ -627,7 +765,12 @@ class APIManager:
             postprocessors=postprocessors_['GET_COLLECTION'],
             max_page_size=max_page_size,
             page_size=page_size,
-            includes=includes
+            includes=includes,
+            serialize_from_rows=serialize_from_rows,
+            stream_unpaginated=stream_unpaginated,
+            linkage_limit=linkage_limit,
+            count_strategy=count_strategy,
+            deferred_join_offset=deferred_join_offset
         )
         if 'GET' in methods:
             add_rule(collection_url, view_func=get_collection_function, methods=['GET'])
@@ -639,7 +782,8 @@ class APIManager:
             api_manager=self,
             preprocessors=preprocessors_['GET_RESOURCE'],
             postprocessors=postprocessors_['GET_RESOURCE'],
-            includes=includes
+            includes=includes,
+            linkage_limit=linkage_limit
         )
 
         # The URL for accessing the entire collection. (POST is special because
@@ -682,6 +826,7 @@ class APIManager:
         api_info = registry.APIInfo(collection_name, blueprint.name, serializer, primary_key, prefix)
         self.created_apis_for[model] = api_info
         registry.add(model, api_info)
+        self.link_templates[model] = LinkTemplates(self.url_for(model), get_relations(model))
         return blueprint
 
     def serialize_relationship(self, instance):
@@ -0,0 +1,607 @@
+# pagination.py - keyset pagination of collections
+#
+# This file is part of Flask-Restless.
+#
+# Flask-Restless is distributed under both the GNU Affero General Public
+# License version 3 and under the 3-clause BSD license. For more
+# information, see LICENSE.AGPL and LICENSE.BSD.
+"""Provides pagination of collections and the strategies for counting
+their items.
+
+Pages are selected either by their number, with ``LIMIT`` and
+``OFFSET``, or by a cursor (keyset pagination). Instead of skipping the
+rows of all the previous pages with an ``OFFSET``, a page requested by
+its cursor is selected with a predicate on the sort keys of the row next
+to it, so fetching any page costs the same as fetching the first one,
+given an index on the sort keys. The position of a page is sent to the
+client as an opaque cursor, which encodes the values of the sort keys of
+the last (or first) row of the previous page.
+
+The total number of items given with pages selected by their number is
+found by a :class:`CountStrategy`, which can be cheaper than counting
+every row.
+
+"""
+import base64
+import binascii
+import enum
+import json
+import math
+from collections import namedtuple
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from uuid import UUID
+
+from sqlalchemy import Interval
+from sqlalchemy import and_
+from sqlalchemy import false
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.exc import ArgumentError
+
+from .helpers import coercer_for
+from .helpers import primary_key_names
+
+#: The sort keys of a collection, in the order in which they are sorted.
+#:
+#: `names` are the names of the fields of the model, `columns` are the
+#: corresponding SQL expressions and `descending` are booleans which are
+#: ``True`` for the fields sorted in descending order. The primary key
+#: always comes last, so that the order of the rows is total.
+Keyset = namedtuple('Keyset', ['names', 'columns', 'descending'])
+
+#: A page of a collection selected by :func:`keyset_page`.
+#:
+#: `items` are the items of the page, and `prev` and `next_` are the
+#: cursors of the previous and next pages, or ``None`` if there is no
+#: such page.
+KeysetPage = namedtuple('KeysetPage', ['items', 'prev', 'next_'])
+
+#: A page of a collection selected by :func:`offset_page`.
+#:
+#: `items` are the items of the page and `total` is the :data:`Total`
+#: number of items of the collection. `last`, `prev` and `next_` are the
+#: numbers of the last, previous and next pages, or ``None`` if there is
+#: no such page, or if the number of the last page is not known.
+OffsetPage = namedtuple('OffsetPage', ['items', 'total', 'last', 'prev', 'next_'])
+
+#: The number of items of a collection found by a :class:`CountStrategy`.
+#:
+#: `value` is the number of items, or ``None`` if they were not counted.
+#: `exact` is ``False`` if `value` is only an estimate or a lower bound.
+Total = namedtuple('Total', ['value', 'exact'])
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded or used with the requested
+    sort order.
+
+    """
+    pass
+
+
+def keyset_for(model, sort) -> Keyset:
+    """Returns the :data:`Keyset` for sorting instances of `model` by the
+    sort fields `sort`.
+
+    `sort` is a list of pairs of the form ``(direction, fieldname)``, as
+    returned by :func:`~flask_restless.views.base.collection_parameters`,
+    or ``None``. The primary key is added as the last sort key, if it is
+    not already one of them.
+
+    Raises :exc:`InvalidCursor` if any of the sort fields is a field of a
+    related model.
+
+    """
+    names: List[str] = []
+    descending: List[bool] = []
+    for direction, name in sort or ():
+        if '.' in name:
+            raise InvalidCursor('Cursor pagination does not support sorting by fields of related resources')
+        names.append(name)
+        descending.append(direction == '-')
+    for name in primary_key_names(model):
+        if name not in names:
+            names.append(name)
+            descending.append(False)
+    columns = [getattr(model, name) for name in names]
+    return Keyset(tuple(names), tuple(columns), tuple(descending))
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, enum.Enum) and not isinstance(value, str):
+        return value.name
+    # Decimals are encoded as strings so they do not lose precision.
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    # Only strings and numbers are accepted in a cursor.
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _decode_value(column, value):
+    # Any other JSON value, like a list or an object, would be bound as
+    # is in the seek predicate.
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(value)
+    field_type = getattr(column, 'type', None)
+    if isinstance(field_type, Interval) and isinstance(value, (int, float)):
+        return timedelta(seconds=value)
+    coercer = coercer_for(field_type)
+    if coercer is not None and isinstance(value, str):
+        return coercer(value, iso_only=True)
+    try:
+        python_type = field_type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+    if isinstance(value, python_type):
+        return value
+    if isinstance(value, str) and python_type in (Decimal, UUID):
+        return python_type(value)
+    if isinstance(python_type, type) and issubclass(python_type, enum.Enum) and isinstance(value, str):
+        try:
+            return python_type[value]
+        except KeyError:
+            raise ValueError(value)
+    if python_type is bool and value in (0, 1):
+        return bool(value)
+    if python_type in (float, Decimal) and isinstance(value, (int, float)):
+        return python_type(value)
+    raise ValueError(value)
+
+
+def encode_cursor(values, backwards=False) -> str:
+    """Returns the cursor of the page that starts right after the row
+    whose sort keys have the given values, or that ends right before it
+    if `backwards` is ``True``.
+
+    The cursor is URL-safe base64, so it can be used as is in the query
+    string of a link.
+
+    """
+    payload = json.dumps([int(backwards), [_encode_value(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, keyset: Keyset) -> Tuple[list, bool]:
+    """Returns the values of the sort keys and the direction encoded in
+    `cursor` by :func:`encode_cursor`.
+
+    Raises :exc:`InvalidCursor` if `cursor` is not a cursor for the sort
+    keys `keyset`.
+
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        backwards, values = json.loads(payload)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor(f'Invalid page cursor: {cursor}')
+    if not isinstance(values, list) or len(values) != len(keyset.names):
+        raise InvalidCursor(f'Page cursor does not match the sort fields: {cursor}')
+    if any(value is None and not _nullable(column) for column, value in zip(keyset.columns, values)):
+        raise InvalidCursor(f'Invalid page cursor: {cursor}')
+    try:
+        values = [None if value is None else _decode_value(column, value) for column, value in zip(keyset.columns, values)]
+    except (ValueError, TypeError, ArithmeticError):
+        raise InvalidCursor(f'Invalid page cursor: {cursor}')
+    return values, bool(backwards)
+
+
+def _nullable(column) -> bool:
+    """Returns ``False`` if the sort key `column` is a column that cannot
+    be null.
+
+    """
+    return getattr(getattr(column, 'expression', None), 'nullable', True)
+
+
+#: The names of the SQLAlchemy dialects of the databases which sort nulls
+#: after every other value in ascending order. Other databases sort them
+#: before every other value.
+NULLS_LAST_DIALECTS = frozenset({'postgresql', 'oracle'})
+
+
+def _ordering(keyset: Keyset, backwards=False, nulls_last=False) -> list:
+    """Returns the ``ORDER BY`` clauses for the sort keys `keyset`, in the
+    reverse order if `backwards` is ``True``.
+
+    `nulls_last` is ``True`` if the database sorts nulls after every other
+    value in ascending order. The nulls of each key are placed where the
+    database places them by default, so an index on the sort keys can
+    serve the ordering, which is also the ordering of pages selected by
+    their number.
+
+    """
+    ordering = []
+    for column, descending in zip(keyset.columns, keyset.descending):
+        expression = column.desc() if descending != backwards else column.asc()
+        # Only the databases which sort nulls last support NULLS FIRST and
+        # NULLS LAST, and there they are the default order anyway.
+        if nulls_last and _nullable(column):
+            expression = expression.nulls_first() if descending != backwards else expression.nulls_last()
+        ordering.append(expression)
+    return ordering
+
+
+def _compare(column, value, greater, nulls_last=False):
+    """Returns the SQL expression that selects the rows whose value of
+    `column` is greater than `value`, or less than it if `greater` is
+    ``False``.
+
+    Nulls are greater than every other value if `nulls_last` is ``True``,
+    and less than every other value otherwise.
+
+    """
+    if value is None:
+        return column.is_not(None) if greater != nulls_last else false()
+    comparison = column > value if greater else column < value
+    if greater == nulls_last and _nullable(column):
+        return or_(comparison, column.is_(None))
+    return comparison
+
+
+def seek_predicate(keyset: Keyset, values, backwards=False, nulls_last=False):
+    """Returns the SQL expression that selects the rows that come after
+    the row whose sort keys have the given values, or before it if
+    `backwards` is ``True``.
+
+    Rows are compared by each sort key in turn, in the direction of that
+    key, so this works for any mix of ascending and descending keys::
+
+        (a > :a) OR (a = :a AND b < :b) OR (a = :a AND b = :b AND id > :id)
+
+    Nulls are ordered as by :func:`_ordering` with `nulls_last`.
+
+    """
+    clauses = []
+    for i, (column, value, descending) in enumerate(zip(keyset.columns, values, keyset.descending)):
+        comparison = _compare(column, value, descending == backwards, nulls_last)
+        equalities = [previous.is_(None) if previous_value is None else previous == previous_value
+                      for previous, previous_value in zip(keyset.columns[:i], values[:i])]
+        clauses.append(and_(*equalities, comparison))
+    return or_(*clauses)
+
+
+def _item_getter(query) -> Callable[[Any], Any]:
+    """Returns a function that takes a row of `query` with additional
+    columns and returns the item that `query` would return without them,
+    either an instance of a model or a row.
+
+    """
+    descriptions = query.column_descriptions
+    if len(descriptions) == 1 and descriptions[0]['expr'] is descriptions[0]['entity']:
+        return itemgetter(0)
+    num_columns = len(descriptions)
+    return lambda row: row[:num_columns]
+
+
+def keyset_page(query, keyset: Keyset, cursor: Optional[str], page_size: int) -> KeysetPage:
+    """Returns the :data:`KeysetPage` of `query` at the given cursor.
+
+    `query` is a query for the collection, whose ordering is replaced
+    by the order of `keyset`. If `cursor` is ``None`` or empty, the first
+    page is returned. The items of the page are the same that the
+    query would return, whether instances of a model or rows.
+
+    Raises :exc:`InvalidCursor` if `cursor` is not a valid cursor for
+    `keyset`.
+
+    """
+    backwards = False
+    nulls_last = query.session.get_bind().dialect.name in NULLS_LAST_DIALECTS
+    if cursor:
+        values, backwards = decode_cursor(cursor, keyset)
+        try:
+            query = query.filter(seek_predicate(keyset, values, backwards, nulls_last))
+        except ArgumentError:
+            raise InvalidCursor(f'Invalid page cursor: {cursor}')
+    item = _item_getter(query)
+    num_columns = len(query.column_descriptions)
+    # Pages before the cursor are selected in the reverse order, and then
+    # put back in the order of the collection.
+    query = query.order_by(None).order_by(*_ordering(keyset, backwards, nulls_last)).add_columns(*keyset.columns)
+    # One more row is fetched to find out whether there are more pages.
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    items = [item(row) for row in rows]
+    if not rows:
+        return KeysetPage(items, None, None)
+    next_ = encode_cursor(rows[-1][num_columns:]) if (backwards or has_more) else None
+    prev = encode_cursor(rows[0][num_columns:], backwards=True) if (has_more if backwards else bool(cursor)) else None
+    return KeysetPage(items, prev, next_)
+
+
+def count(session, query) -> int:
+    """Returns the count of the specified `query`.
+
+    This function employs an optimization that bypasses the
+    :meth:`sqlalchemy.orm.Query.count` method, which can be very slow
+    for large queries.
+
+    """
+    # A count of the selected columns would ignore the limit and offset of the query.
+    if query._limit_clause is not None or query._offset_clause is not None:
+        return query.order_by(None).count()
+    counts = query.selectable.with_only_columns(func.count(query.selectable.selected_columns[0]))
+    num_results = session.execute(counts.order_by(None)).scalar()
+    if num_results is None:
+        return query.order_by(None).count()
+    return num_results
+
+
+def postgresql_estimate(session, query) -> Optional[int]:
+    """Returns the number of rows of `query` estimated by the PostgreSQL
+    query planner, without running the query.
+
+    """
+    connection = session.connection()
+    compiled = query.statement.order_by(None).compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    if compiled.positional:
+        parameters: Any = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        parameters = compiled.params
+    plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+#: The functions that estimate the number of rows of a query, by the
+#: name of the SQLAlchemy dialect of the database.
+ESTIMATORS: Dict[str, Callable[[Any, Any], Optional[int]]] = {
+    'postgresql': postgresql_estimate,
+}
+
+
+class CountStrategy:
+    """Base class for the strategies for counting the items of a
+    collection, whose total number is given in the ``meta`` object of
+    pages selected by their number.
+
+    Subclasses must override :meth:`count`. A client may request any
+    strategy whose :attr:`cost` is lower than the one of the strategy of
+    the API by its :attr:`name`; see :data:`COUNT_STRATEGIES`.
+
+    """
+
+    #: The name by which clients request this strategy.
+    name = ''
+
+    #: The relative cost of this strategy.
+    cost = 0
+
+    #: The key in the ``meta`` object under which a total number of items
+    #: is given if it is not exact.
+    meta_key = 'total'
+
+    def count(self, session, query) -> Total:
+        """Returns the :data:`Total` number of items of `query`."""
+        raise NotImplementedError
+
+    def counted_page(self, session, query, offset: int, limit: int) -> Optional[Tuple[list, Total]]:
+        """Returns the items of `query` at `offset`, at most `limit` of
+        them, together with the :data:`Total` number of items, or ``None``
+        if they are not fetched together.
+
+        By default, this returns ``None``, so the items are counted by
+        :meth:`count` before the page is fetched.
+
+        """
+        return None
+
+
+class ExactCount(CountStrategy):
+    """Counts every item of the collection. This is the default."""
+
+    name = 'exact'
+    cost = 3
+
+    def count(self, session, query) -> Total:
+        return Total(count(session, query), True)
+
+
+class WindowCount(ExactCount):
+    """Counts every item of the collection in the same query that fetches
+    the page, by selecting ``count(*) OVER ()`` along with each row.
+
+    This saves a round trip to the database, but it requires a database
+    that supports window functions. If there are no items at the offset
+    of the page, they are counted by a separate query.
+
+    """
+
+    name = 'window'
+
+    def counted_page(self, session, query, offset: int, limit: int) -> Optional[Tuple[list, Total]]:
+        item = _item_getter(query)
+        rows = query.add_columns(func.count().over()).limit(limit).offset(offset).all()
+        if not rows:
+            return [], self.count(session, query)
+        return [item(row) for row in rows], Total(rows[0][-1], True)
+
+
+class CappedCount(CountStrategy):
+    """Counts at most `limit` items of the collection.
+
+    If there are more items, the total is given as ``total_at_least``
+    instead of ``total``, and there is no link to the last page.
+
+    """
+
+    name = 'capped'
+    cost = 2
+    meta_key = 'total_at_least'
+
+    def __init__(self, limit=1000):
+        self.limit = limit
+
+    def count(self, session, query) -> Total:
+        first_column = query.selectable.selected_columns[0]
+        # One more item is counted to tell a collection of exactly `limit`
+        # items from a larger one.
+        items = query.selectable.with_only_columns(first_column).order_by(None).limit(self.limit + 1).subquery()
+        num_results = session.execute(select(func.count()).select_from(items)).scalar()
+        return Total(min(num_results, self.limit), num_results <= self.limit)
+
+
+class EstimatedCount(CountStrategy):
+    """Estimates the number of items of the collection, for example from
+    the query planner, without counting them.
+
+    The estimate is given as ``estimated_total`` instead of ``total``, and
+    there is no link to the last page. `estimators` maps names of
+    SQLAlchemy dialects to functions that take the session and the query
+    and return the estimate, or ``None``; they are added to the ones in
+    :data:`ESTIMATORS`. The total is not given at all for other dialects.
+
+    """
+
+    name = 'estimated'
+    cost = 1
+    meta_key = 'estimated_total'
+
+    def __init__(self, estimators=None):
+        self.estimators = dict(ESTIMATORS, **(estimators or {}))
+
+    def count(self, session, query) -> Total:
+        estimator = self.estimators.get(session.get_bind().dialect.name)
+        return Total(None if estimator is None else estimator(session, query), False)
+
+
+class NoCount(CountStrategy):
+    """Does not count the items of the collection, so there is neither a
+    total number of items nor a link to the last page.
+
+    """
+
+    name = 'none'
+
+    def count(self, session, query) -> Total:
+        return Total(None, False)
+
+
+#: The count strategies that clients can request by name, with their
+#: default options.
+COUNT_STRATEGIES = {strategy.name: strategy for strategy in (ExactCount, WindowCount, CappedCount, EstimatedCount, NoCount)}
+
+
+def count_strategy_for(strategy) -> CountStrategy:
+    """Returns the :class:`CountStrategy` named `strategy`, with its default
+    options, or `strategy` itself if it is already a count strategy.
+
+    Raises :exc:`ValueError` if there is no strategy with that name.
+
+    """
+    if isinstance(strategy, CountStrategy):
+        return strategy
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f'Unknown count strategy: {strategy}')
+    return COUNT_STRATEGIES[strategy]()
+
+
+def cheaper_count_strategy(strategy: CountStrategy, name: str) -> CountStrategy:
+    """Returns the strategy named `name` if it is cheaper than `strategy`,
+    and `strategy` otherwise.
+
+    Raises :exc:`ValueError` if there is no strategy with that name.
+
+    """
+    requested = count_strategy_for(name)
+    return requested if requested.cost < strategy.cost else strategy
+
+
+def _deferred_join_key(query, offset: int, deferred_join_offset: Optional[int]) -> Optional[str]:
+    """Returns the name of the primary key by which the items of `query`
+    at `offset` are looked up with a deferred join, or ``None`` if they
+    are fetched by `query` itself.
+
+    A deferred join is used from `deferred_join_offset` on, if it is not
+    ``None``, for queries of instances of a model with a primary key of
+    a single column.
+
+    """
+    if deferred_join_offset is None or offset < deferred_join_offset:
+        return None
+    descriptions = query.column_descriptions
+    if len(descriptions) != 1 or descriptions[0]['expr'] is not descriptions[0]['entity'] or not isinstance(descriptions[0]['entity'], type):
+        return None
+    names = primary_key_names(descriptions[0]['entity'])
+    return names[0] if len(names) == 1 else None
+
+
+def fetch_page(query, offset: int, limit: int, deferred_join_offset: Optional[int] = None) -> list:
+    """Returns the items of `query` at `offset`, at most `limit` of them.
+
+    From `deferred_join_offset` on, if it is not ``None``, the rows at
+    `offset` are first found by selecting only their primary keys, which
+    the database can usually do from an index, without reading any of
+    the rows it skips. Then the items are fetched by their primary keys
+    with the loader options of `query`, and put back in the order of
+    `query`. This only applies to queries of instances of a model with a
+    primary key of a single column.
+
+    """
+    key = _deferred_join_key(query, offset, deferred_join_offset)
+    if key is None:
+        # TODO Use Query.slice() instead, since it's easier to use.
+        return query.limit(limit).offset(offset).all()
+    column = getattr(query.column_descriptions[0]['entity'], key)
+    keys = [value for value, in query.with_entities(column).limit(limit).offset(offset)]
+    if not keys:
+        return []
+    instances = {getattr(instance, key): instance for instance in query.order_by(None).filter(column.in_(keys))}
+    # Rows deleted in between are left out.
+    return [instances[value] for value in keys if value in instances]
+
+
+def offset_page(session, query, page_number: int, page_size: int, count_strategy: CountStrategy,
+                deferred_join_offset: Optional[int] = None) -> OffsetPage:
+    """Returns the :data:`OffsetPage` of `query` with the given number.
+
+    The items of the collection are counted by `count_strategy`, either
+    together with the page or before it. If the number of items is not
+    exact, one more item than `page_size` is fetched to find out whether
+    there is a next page. Pages at or past `deferred_join_offset` are
+    fetched with a deferred join, and counted before; see
+    :func:`fetch_page`.
+
+    """
+    offset = (page_number - 1) * page_size
+    prev = page_number - 1 if page_number > 1 else None
+    if _deferred_join_key(query, offset, deferred_join_offset) is None:
+        counted = count_strategy.counted_page(session, query, offset, page_size)
+    else:
+        counted = None
+    if counted is not None:
+        items, total = counted
+    else:
+        items = None
+        total = count_strategy.count(session, query)
+    if total.exact:
+        last = int(math.ceil(total.value / page_size)) if total.value else 1
+        next_ = page_number + 1 if page_number < last else None
+        if items is None:
+            items = fetch_page(query, offset, page_size, deferred_join_offset)
+        return OffsetPage(items, total, last, prev, next_)
+    items = fetch_page(query, offset, page_size + 1, deferred_join_offset)
+    next_ = page_number + 1 if len(items) > page_size else None
+    return OffsetPage(items[:page_size], total, None, prev, next_)
@@ -18,14 +18,27 @@ relationship on a particular instance of a SQLAlchemy model.
 
 """
 import inspect
+from collections import namedtuple
+from functools import lru_cache
+from functools import partial
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 from sqlalchemy import and_
+from sqlalchemy import bindparam
 from sqlalchemy import func
 from sqlalchemy import or_
 from sqlalchemy.orm import aliased
 from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.sql.elements import ClauseElement
 
 from .exceptions import BadRequest
+from .helpers import coercer_for
+from .helpers import get_field_type
 from .helpers import get_related_association_proxy_model
 from .helpers import get_related_model
 from .helpers import primary_key_names
@@ -148,6 +161,20 @@ OPERATORS = {
 }
 
 
+@lru_cache(maxsize=None)
+def operator_arity(opfunc) -> int:
+    """Returns the number of arguments of the operator function `opfunc`,
+    one of the values of :data:`OPERATORS`.
+
+    """
+    return len(inspect.getfullargspec(opfunc).args)
+
+
+# Compute the number of arguments of the built-in operators once.
+for _opfunc in OPERATORS.values():
+    operator_arity(_opfunc)
+
+
 class Filter(object):
     """Represents a filter to apply to a SQLAlchemy query object.
 
@@ -189,7 +216,7 @@ class Filter(object):
     #                                          or self.otherfield)
 
     @staticmethod
-    def from_dictionary(model, dictionary):
+    def from_dictionary(model, dictionary, iso_only=False):
         """Returns a new :class:`Filter` object with arguments parsed from
         `dictionary`.
 
@@ -219,6 +246,9 @@ class Filter(object):
                   ]
              }
 
+        If `iso_only` is ``True``, values of date and time fields must be
+        ISO 8601 strings; see :func:`~flask_restless.helpers.parse_datetime_string`.
+
         This method raises :exc:`UnknownField` if ``dictionary['name']``
         does not refer to an attribute of `model`.
 
@@ -233,10 +263,10 @@ class Filter(object):
             otherfield = dictionary.get('field')
             argument = dictionary.get('val')
             # Need to deal with the special case of converting dates.
-            argument = string_to_datetime(model, fieldname, argument)
+            argument = string_to_datetime(model, fieldname, argument, iso_only=iso_only)
             return Filter(fieldname, operator, argument, otherfield)
         # For the sake of brevity, rename this method.
-        from_dict = Filter.from_dictionary
+        from_dict = partial(Filter.from_dictionary, iso_only=iso_only)
         # If there is an OR or an AND in the dictionary, recurse on the
         # provided list of filters.
         if 'or' in dictionary:
@@ -313,7 +343,7 @@ def create_operation(model, fieldname, operator, argument):
     """
     # raises KeyError if operator not in OPERATORS
     opfunc = OPERATORS[operator]
-    numargs = len(inspect.getfullargspec(opfunc).args)
+    numargs = operator_arity(opfunc)
     # raises AttributeError if `fieldname` does not exist
     field = getattr(model, fieldname)
     # each of these will raise a TypeError if the wrong number of argments
@@ -356,7 +386,142 @@ def create_filter(model, filt):
     return or_(create_filter(model, f) for f in filt)
 
 
-def search(session, model, filters=None, sort=None, _initial_query=None):
+class Uncompilable(Exception):
+    """Raised when a filter object cannot be compiled into a
+    :class:`FilterTemplate`, in which case it is converted to a SQLAlchemy
+    expression with :meth:`Filter.from_dictionary` and
+    :func:`create_filter` instead.
+
+    """
+    pass
+
+
+#: The SQLAlchemy expressions for a list of filter objects with the same
+#: shape, with a bound parameter in place of each value.
+#:
+#: `criteria` is the list of expressions, one for each filter object, and
+#: `coercers` is the list of functions, as returned by
+#: :func:`~flask_restless.helpers.coercer_for`, that convert the value
+#: of each parameter, or ``None`` for values used unchanged.
+FilterTemplate = namedtuple('FilterTemplate', ['criteria', 'coercers'])
+
+#: The maximum number of filter shapes for which a :data:`FilterTemplate`
+#: is kept.
+MAX_FILTER_TEMPLATES = 1024
+
+#: The operators whose value is a list of values.
+LIST_OPERATORS = frozenset(['in', 'not_in'])
+
+#: The operators whose value is a filter object on the related model.
+RELATION_OPERATORS = frozenset(['has', 'any'])
+
+#: The types of values that are replaced by bound parameters.
+SCALAR_TYPES = (str, int, float)
+
+
+def filter_shape(dictionary, values, nested=False):
+    """Returns a hashable representation of the filter object `dictionary`
+    without its values, which are appended to the list `values` in the
+    order of the bound parameters of its :data:`FilterTemplate`.
+
+    `nested` is ``True`` for the filter object given as the value of a
+    ``has`` or ``any`` operator, which is applied as it is.
+
+    Raises :exc:`Uncompilable` if the filter object has a value that is
+    not replaced by a bound parameter.
+
+    """
+    if not nested:
+        if 'or' in dictionary:
+            return ('or', tuple(filter_shape(f, values) for f in dictionary['or']))
+        if 'and' in dictionary:
+            return ('and', tuple(filter_shape(f, values) for f in dictionary['and']))
+    name = dictionary['name'] if nested else dictionary.get('name')
+    operator = dictionary['op'] if nested else dictionary.get('op')
+    otherfield = None if nested else dictionary.get('field')
+    value = dictionary.get('val')
+    if otherfield or value is None or operator_arity(OPERATORS[operator]) == 1:
+        # The value is ignored or rejected by `create_operation`.
+        if otherfield and value is not None:
+            raise Uncompilable
+        return ('constant', name, operator, otherfield, value is None)
+    if operator in RELATION_OPERATORS:
+        if not isinstance(value, dict):
+            raise Uncompilable
+        return ('relation', name, operator, filter_shape(value, values, nested=True))
+    if operator in LIST_OPERATORS:
+        if not isinstance(value, list) or not all(isinstance(item, SCALAR_TYPES) for item in value):
+            raise Uncompilable
+    elif not isinstance(value, SCALAR_TYPES):
+        raise Uncompilable
+    values.append(value)
+    return ('value', name, operator)
+
+
+@lru_cache(maxsize=MAX_FILTER_TEMPLATES)
+def filter_template(model, shapes) -> FilterTemplate:
+    """Returns the :data:`FilterTemplate` for the filter objects on `model`
+    whose shapes, as returned by :func:`filter_shape`, are `shapes`.
+
+    """
+    coercers: List[Optional[Callable]] = []
+    criteria = [_template_criterion(model, shape, coercers) for shape in shapes]
+    return FilterTemplate(criteria, coercers)
+
+
+def _template_criterion(model, shape, coercers, nested=False):
+    kind = shape[0]
+    if kind in ('or', 'and'):
+        junction = or_ if kind == 'or' else and_
+        return junction(*(_template_criterion(model, subshape, coercers) for subshape in shape[1]))
+    name, operator = shape[1:3]
+    if not nested and not hasattr(model, name):
+        raise UnknownField(name)
+    if kind == 'constant':
+        otherfield, is_none = shape[3:]
+        # Any value other than ``None`` is ignored by these operators.
+        argument = getattr(model, otherfield) if otherfield else (None if is_none else True)
+        return create_operation(model, name, operator, argument)
+    if kind == 'relation':
+        field = getattr(model, name)
+        submodel = field.property.mapper.class_ if isinstance(field, InstrumentedAttribute) else get_related_association_proxy_model(field)
+        return getattr(field, operator)(_template_criterion(submodel, shape[3], coercers, nested=True))
+    parameter = bindparam(f'filter_{len(coercers)}', expanding=operator in LIST_OPERATORS)
+    # Values of nested filter objects are not converted.
+    coercers.append(None if nested else coercer_for(get_field_type(model, name)))
+    return create_operation(model, name, operator, parameter)
+
+
+def compile_filters(model, filters, iso_only=False) -> Tuple[list, Dict[str, Any]]:
+    """Returns the list of SQLAlchemy expressions for the list of filter
+    objects `filters` on `model`, and the values of their bound
+    parameters.
+
+    Filter objects with the same shape share the expressions, so only the
+    values are converted for each request. Filter objects that cannot be
+    compiled are converted with :meth:`Filter.from_dictionary` and
+    :func:`create_filter`, which raise the appropriate errors.
+
+    """
+    try:
+        values: list = []
+        shapes = tuple(filter_shape(f, values) for f in filters)
+        template = filter_template(model, shapes)
+        params = {}
+        for i, (coerce, value) in enumerate(zip(template.coercers, values)):
+            if coerce is not None:
+                value = coerce(value, iso_only=iso_only)
+                # Values like "CURRENT_TIMESTAMP" become SQL functions.
+                if value is None or isinstance(value, ClauseElement):
+                    raise Uncompilable
+            params[f'filter_{i}'] = value
+        return template.criteria, params
+    except Exception:
+        filters = [Filter.from_dictionary(model, f, iso_only=iso_only) for f in filters]
+        return [create_filter(model, f) for f in filters], {}
+
+
+def search(session, model, filters=None, sort=None, _initial_query=None, iso_only=False):
     """Returns a SQLAlchemy query instance with the specified parameters.
 
     Each instance in the returned query meet the requirements specified by
@@ -380,6 +545,8 @@ def search(session, model, filters=None, sort=None, _initial_query=None):
     will be appended to this query. Otherwise, an empty query will be
     created for the specified model.
 
+    `iso_only` is passed to :meth:`Filter.from_dictionary`.
+
     When building the query, filters are applied first, then sorting.
 
     Raises :exc:`UnknownField` if one of the named fields given in one
@@ -396,17 +563,16 @@ def search(session, model, filters=None, sort=None, _initial_query=None):
         query = session_query(session, model)
 
     try:
-        # Filter the query.
-        filters = [Filter.from_dictionary(model, f) for f in filters]
-
-        # This function call may raise an exception.
-        filters = [create_filter(model, f) for f in filters]
+        # Filter the query. This function call may raise an exception.
+        criteria, params = compile_filters(model, filters, iso_only=iso_only)
     except UnknownField as e:
         raise BadRequest(cause=e, details=f'Invalid filter object: No such field "{e.field}"') from e
     except Exception as e:
         raise BadRequest(cause=e, details='Unable to construct query') from e
 
-    query = query.filter(*filters)
+    query = query.filter(*criteria)
+    if params:
+        query = query.params(params)
 
     def get_field(obj, name):
         try:
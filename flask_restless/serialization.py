@@ -23,38 +23,218 @@ import enum
 from abc import ABC
 from abc import abstractmethod
 from collections import namedtuple
-from copy import copy
 from datetime import date
 from datetime import datetime
 from datetime import time
 from datetime import timedelta
+from itertools import chain
+from itertools import islice
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import FrozenSet
 from typing import Optional
-from urllib.parse import urljoin
-
-from flask import request
+from typing import Tuple
+
+from sqlalchemy import Boolean
+from sqlalchemy import Date
+from sqlalchemy import DateTime
+from sqlalchemy import Enum
+from sqlalchemy import Integer
+from sqlalchemy import Interval
+from sqlalchemy import Numeric
+from sqlalchemy import String
+from sqlalchemy import Time
+from sqlalchemy import func
 from sqlalchemy import inspect
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.base import MANYTOMANY
 from sqlalchemy.orm.base import MANYTOONE
+from sqlalchemy.orm.base import ONETOMANY
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.sql.elements import BinaryExpression
 
+from .helpers import MAX_IN_VALUES
 from .helpers import attribute_columns
+from .helpers import coerce_fields
+from .helpers import field_plan
 from .helpers import foreign_keys
 from .helpers import get_by
+from .helpers import get_by_many
 from .helpers import get_column_name
-from .helpers import get_related_model
 from .helpers import get_relations
-from .helpers import has_field
 from .helpers import is_like_list
+from .helpers import is_proxy
 from .helpers import primary_key_names
-from .helpers import strings_to_datetimes
 
 #: Names of columns which should definitely not be considered user columns to
 #: be included in a dictionary representation of a model.
 COLUMN_EXCLUDE_LIST = {'_sa_polymorphic_on'}
 
+#: The maximum number of per-fieldset serialization plans cached by a
+#: single :class:`DefaultSerializer`; sparse fieldsets are client-controlled,
+#: so the cache must not grow without bound.
+MAX_CACHED_PLANS = 128
+
 RelationshipInfo = namedtuple('RelationshipInfo', ['foreign_key', 'target_model'])
 
+#: How to load the linkage of a to-many relationship with a single query,
+#: without loading related instances.
+#:
+#: `parent_key` is the name of the attribute of the parent model whose
+#: value is selected in `key_column` to identify the parent instance.
+#: If `join` is ``None``, `key_column` is the foreign key column of the
+#: related table; otherwise it belongs to an alias of the parent model and
+#: `join` is the relationship attribute of that alias, which joins it to
+#: the related model. `target_model` is the related model and `order_by`
+#: is the ordering of the relationship, or ``False``. For a relationship
+#: with an association table, `secondary` is a triple of the columns of
+#: the association table that reference the parent, the column of the
+#: related table they reference, and the column of the association table
+#: that references it, so that the linkage can be read from the
+#: association table alone; otherwise it is ``None``.
+ToManyLinkageInfo = namedtuple('ToManyLinkageInfo', ['parent_key', 'key_column', 'target_model', 'order_by', 'join', 'secondary'])
+
+#: A precomputed serialization plan for a particular sparse fieldset.
+#:
+#: `attributes` is a tuple of ``(name, converter)`` pairs, where `converter`
+#: is either ``None`` (the value is already JSON serializable) or a function
+#: that converts a non-null value to its JSON representation.
+#: `relationships` is a tuple of relationship names to serialize.
+#: `columns` is a tuple of the columns to select in order to serialize the
+#: resource straight from a result row, or ``None`` if that is not possible,
+#: for example because some attribute is not backed by a column, or because
+#: some relationship cannot be rendered from a foreign key.
+SerializationPlan = namedtuple('SerializationPlan', ['attributes', 'relationships', 'columns'])
+
+#: Column types whose values do not need any conversion to be serialized.
+PLAIN_COLUMN_TYPES = (Boolean, Integer, Numeric, String)
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _total_seconds(value):
+    return value.total_seconds()
+
+
+def _enum_name(value):
+    return value.name
+
+
+def _convert_any(value):
+    """Converts a value of unknown type to its JSON representation.
+
+    This is used for attributes whose type cannot be determined from the
+    model, like hybrid properties and additional attributes, so the type
+    of the value has to be checked on every call.
+
+    """
+    # Serialize any date- or time-like objects.
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    # Enums are not serializable by default, use 'name' property
+    if isinstance(value, enum.Enum) and not isinstance(value, str):
+        return value.name
+    # Call any functions that appear in the result.
+    if callable(value):
+        return value()
+    return value
+
+
+def json_default(value):
+    """Returns the JSON representation of a date- or time-like object, an
+    interval or an enum, the same one used by :class:`DefaultSerializer`
+    for attributes of these types.
+
+    This is meant to be used as the fallback function of an alternative
+    JSON encoder (see :ref:`jsonbackend`), so that values which do not come
+    from the serializer, like the ones added by postprocessors, are
+    encoded consistently. It is only called for the values that the
+    encoder cannot encode itself; orjson, for example, encodes dates and
+    times unless given ``OPT_PASSTHROUGH_DATETIME``, and always encodes
+    enums by their value::
+
+        json_dumps = partial(orjson.dumps, default=json_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        manager = APIManager(app, session=session, json_loads=orjson.loads, json_dumps=json_dumps)
+
+    Raises :exc:`TypeError` for any other value.
+
+    """
+    if isinstance(value, (date, datetime, time, timedelta)) or (isinstance(value, enum.Enum) and not isinstance(value, str)):
+        return _convert_any(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _to_many_linkage_info(mapper, relationship) -> Optional[ToManyLinkageInfo]:
+    """Returns how to load the linkage of the given to-many relationship
+    with a query, or ``None`` if it has to be loaded from related
+    instances.
+
+    The linkage of a relationship that joins on a single foreign key
+    column of the related table, without any other criteria, is read
+    from that column. Any other relationship, like a many-to-many
+    relationship or one with a custom join condition, is joined from the
+    parent table, which requires a single primary key column on the
+    parent model. In both cases the related model must not be
+    polymorphic, so every related row has the same type.
+
+    """
+    if relationship.lazy in ('noload', 'raise', 'raise_on_sql') or relationship.mapper.polymorphic_on is not None:
+        return None
+    target_model = relationship.mapper.class_
+    if relationship.secondary is None and len(relationship.local_remote_pairs) == 1 and isinstance(relationship.primaryjoin, BinaryExpression):
+        local_column, remote_column = relationship.local_remote_pairs[0]
+        try:
+            parent_key = mapper.get_property_by_column(local_column).key
+        except UnmappedColumnError:
+            return None
+        return ToManyLinkageInfo(parent_key=parent_key, key_column=remote_column, target_model=target_model,
+                                 order_by=relationship.order_by, join=None, secondary=None)
+    if len(mapper.primary_key) != 1:
+        return None
+    try:
+        parent_key = mapper.get_property_by_column(mapper.primary_key[0]).key
+    except UnmappedColumnError:
+        return None
+    secondary = None
+    if relationship.secondary is not None and isinstance(relationship.primaryjoin, BinaryExpression) \
+            and isinstance(relationship.secondaryjoin, BinaryExpression) \
+            and len(relationship.synchronize_pairs) == 1 and len(relationship.secondary_synchronize_pairs) == 1 \
+            and relationship.synchronize_pairs[0][0] is mapper.primary_key[0]:
+        target_column, secondary_column = relationship.secondary_synchronize_pairs[0]
+        secondary = (relationship.synchronize_pairs[0][1], target_column, secondary_column)
+    parent = aliased(mapper.class_)
+    return ToManyLinkageInfo(parent_key=parent_key, key_column=getattr(parent, parent_key), target_model=target_model,
+                             order_by=relationship.order_by, join=getattr(parent, relationship.key), secondary=secondary)
+
+
+def _converter_for(column_type) -> Optional[Callable[[Any], Any]]:
+    """Returns the converter for values of the given SQLAlchemy column type.
+
+    Returns ``None`` if values of this type can be serialized as they are,
+    or :func:`_convert_any` if the type does not tell us enough.
+
+    """
+    # `Enum` is a subclass of `String`, so it must be checked first.
+    if isinstance(column_type, Enum):
+        enum_class = column_type.enum_class
+        if enum_class is None or issubclass(enum_class, str):
+            return None
+        return _enum_name
+    if isinstance(column_type, (Date, DateTime, Time)):
+        return _isoformat
+    if isinstance(column_type, Interval):
+        return _total_seconds
+    if isinstance(column_type, PLAIN_COLUMN_TYPES):
+        return None
+    return _convert_any
+
 
 class SerializationException(Exception):
     """Raised when there is a problem serializing an instance of a
@@ -163,6 +343,31 @@ class ConflictingType(DeserializationException):
         self.detail = detail
 
 
+class RelatedResourcesNotFound(DeserializationException):
+    """Raised when attempting to deserialize linkage objects for which no
+    related resource exists.
+
+    `type_name` is the type of the related resources, `ids` is the list
+    of IDs given in the linkage objects that identify no resource, and
+    `relation_name` is the name of the relationship.
+
+    """
+
+    def __init__(self, type_name, ids, relation_name=None, *args, **kw):
+        super(RelatedResourcesNotFound, self).__init__(*args, **kw)
+
+        #: The name of the relationship with the linkage objects.
+        self.relation_name = relation_name
+
+        #: The type name of the related model.
+        self.type_name = type_name
+
+        #: The IDs for which no related resource exists.
+        self.ids = ids
+
+        self.detail = 'no resource of type "{0}" with ID {1}'.format(type_name, ', '.join(map(str, ids)))
+
+
 class UnknownField(DeserializationException):
     """Raised when attempting to deserialize an object that references a
     field that does not exist on the model.
@@ -290,6 +495,22 @@ class Serializer(ABC):
         will always appear, regardless of whether they appear in `only`.
         """
 
+    def serialize_many(self, instances, only=None, linkage_limit=None) -> list:
+        """Returns a list of dictionary representations of the specified
+        instances of a SQLAlchemy model, in the same order.
+
+        All `instances` are instances of the model of this serializer, and
+        `only` is as described in :meth:`serialize`. `linkage_limit` is the
+        maximum number of resource identifier objects in the linkage of
+        to-many relationships, or ``None`` if there is no limit; the views
+        only pass it if there is a limit. The views call this method once
+        for each model in a response, so subclasses may override it to
+        load data needed by all the instances at once. By default, this
+        calls :meth:`serialize` on each instance.
+
+        """
+        return [self.serialize(instance, only=only) for instance in instances]
+
 
 class Deserializer(ABC):
     """An object that, when called, returns an instance of the SQLAlchemy model
@@ -403,10 +624,41 @@ class DefaultSerializer(Serializer):
                 target_model = relationship.mapper.class_
                 self._many_to_one_relationships[relationship.key] = RelationshipInfo(foreign_key=foreign_key, target_model=target_model)
 
+        # Finding to-many relationships whose linkage can be loaded with a query, see `to_many_linkage`
+        self._to_many_linkage = {}
+        for relationship in inspected_model.relationships:
+            if relationship.key in self._relations and relationship.direction in (ONETOMANY, MANYTOMANY):
+                info = _to_many_linkage_info(inspected_model, relationship)
+                if info is not None:
+                    self._to_many_linkage[relationship.key] = info
+
+        # Choose the converter for each attribute once, based on the column type, instead of inspecting every value.
+        column_attrs = inspected_model.column_attrs
+        attributes = []
+        for name in sorted(self._columns):
+            if name in column_attrs:
+                converter = _converter_for(column_attrs[name].columns[0].type)
+            else:
+                converter = _convert_any
+            attributes.append((name, converter))
+        self._column_attributes = frozenset(column_attrs.keys())
+        # Polymorphic models need instances to find the serializer of each subclass.
+        self._can_serialize_rows = primary_key in self._column_attributes and inspected_model.polymorphic_on is None
+        self._plans: Dict[FrozenSet[str], SerializationPlan] = {}
+        self._plan = self._create_plan(tuple(attributes), tuple(sorted(self._relations)))
+
     @property
     def many_to_one_relationships(self):
         return set(self._many_to_one_relationships.keys())
 
+    @property
+    def to_many_linkage_relationships(self):
+        """The names of the to-many relationships whose linkage can be
+        loaded by :meth:`to_many_linkage`.
+
+        """
+        return set(self._to_many_linkage.keys())
+
     @property
     def relationship_columns(self):
         return self._relations
@@ -415,34 +667,198 @@ class DefaultSerializer(Serializer):
     def attributes_columns(self):
         return self._columns
 
-    def serialize_attributes(self, instance, only=None) -> Dict[str, Any]:
-        columns = self.attributes_columns
-        if only is not None:
-            columns &= only
+    def _create_plan(self, attributes, relationships) -> SerializationPlan:
+        columns = None
+        if (self._can_serialize_rows and all(name in self._column_attributes for name, _ in attributes)
+                and all(name in self._many_to_one_relationships for name in relationships)):
+            columns = (getattr(self._model, self._primary_key),)
+            columns += tuple(getattr(self._model, name) for name, _ in attributes)
+            columns += tuple(getattr(self._model, self._many_to_one_relationships[name].foreign_key) for name in relationships)
+        return SerializationPlan(attributes=attributes, relationships=relationships, columns=columns)
+
+    def plan_for(self, only=None) -> SerializationPlan:
+        """Returns the :data:`SerializationPlan` for the given sparse fieldset.
+
+        Plans are computed once per distinct fieldset and cached.
+
+        """
+        if only is None:
+            return self._plan
+        only = frozenset(only)
+        plan = self._plans.get(only)
+        if plan is None:
+            plan = self._create_plan(
+                tuple((name, converter) for name, converter in self._plan.attributes if name in only),
+                tuple(name for name in self._plan.relationships if name in only)
+            )
+            if len(self._plans) < MAX_CACHED_PLANS:
+                self._plans[only] = plan
+        return plan
+
+    def row_columns(self, only=None) -> Optional[Tuple]:
+        """Returns the columns to select in order to serialize resources
+        with :meth:`serialize_row` for the given sparse fieldset, or
+        ``None`` if the fieldset can only be serialized from instances of
+        the model.
+
+        """
+        return self.plan_for(only).columns
 
-        # Create a dictionary mapping attribute name to attribute value for
-        # this particular instance.
-        attributes = {column: getattr(instance, column) for column in columns}
+    def columns_to_load(self, only=None, relations=()) -> Optional[Tuple]:
+        """Returns the columns that need to be loaded in order to serialize
+        instances of the model with the given sparse fieldset, or ``None``
+        if all columns should be loaded.
 
-        for key, value in attributes.items():
-            # Serialize any date- or time-like objects that appear in the attributes.
-            if isinstance(value, (date, datetime, time)):
-                attributes[key] = value.isoformat()
-            elif isinstance(value, timedelta):
-                attributes[key] = value.total_seconds()
-            # Enums are not serializable by default, use 'name' property
-            elif isinstance(value, enum.Enum) and not isinstance(value, str):
-                attributes[key] = value.name
+        The primary key and the local columns of the serialized
+        relationships are always included. `relations` is an iterable of
+        names of additional relationships that are going to be traversed,
+        for example to include related resources, whose local columns must
+        be loaded as well.
 
+        """
+        if only is None:
+            return None
+        plan = self.plan_for(only)
+        # Attributes that are not columns, like hybrid properties, may depend on any other column.
+        if self._primary_key not in self._column_attributes or any(name not in self._column_attributes for name, _ in plan.attributes):
+            return None
+        mapper = inspect(self._model)
+        names = {self._primary_key}
+        names.update(name for name, _ in plan.attributes)
+        for relation in chain(plan.relationships, relations):
+            if relation in mapper.relationships:
+                relationship = mapper.relationships[relation]
+            elif is_proxy(getattr(self._model, relation, None)):
+                relationship = getattr(self._model, relation).local_attr.property
+            else:
+                return None
+            try:
+                names.update(mapper.get_property_by_column(column).key for column in relationship.local_columns)
+            except UnmappedColumnError:
+                return None
+        return tuple(getattr(self._model, name) for name in sorted(names))
+
+    @property
+    def loads_to_many_linkage(self) -> bool:
+        """Whether :meth:`serialize_many` loads the linkage of to-many
+        relationships with :meth:`to_many_linkage`.
+
+        Subclasses that override :meth:`serialize` get the relationships
+        from the instances instead.
+
+        """
+        return type(self).serialize is DefaultSerializer.serialize
+
+    def serialize_many(self, instances, only=None, linkage_limit=None) -> list:
+        """Returns the resource objects of `instances`.
+
+        The linkage of to-many relationships of all the instances is loaded
+        at once by :meth:`to_many_linkage`. `linkage_limit` is passed to
+        :meth:`serialize` as `limit`.
+
+        """
+        if not self.loads_to_many_linkage:
+            return super().serialize_many(instances, only=only)
+        linkage = self.to_many_linkage(instances, only, limit=linkage_limit)
+        return [self.serialize(instance, only=only, linkage=linkage, limit=linkage_limit) for instance in instances]
+
+    def to_many_linkage(self, instances, only=None, limit=None) -> Dict[str, Dict[Any, Tuple[list, int]]]:
+        """Loads the linkage of the to-many relationships of `instances`
+        that are serialized for the given sparse fieldset.
+
+        For each relationship, a single query selects the key of the parent
+        instance and the ID of the related rows of all the instances, so no
+        related instances are created. The key is read from the foreign key
+        of the related table or of the association table if possible;
+        otherwise the related table is joined from the parent table. The
+        returned dictionary maps relationship
+        names to dictionaries from the key of the parent instance to a
+        pair containing the list of resource identifier objects and the
+        total number of related resources; it can be provided to
+        :meth:`serialize`. Relationships whose related model has not been
+        registered with the API are left out.
+
+        If `limit` is not ``None``, at most `limit` resource identifier
+        objects are loaded for each instance, and the total is counted by
+        a window function in the same query.
+
+        """
+        relations = [relation for relation in self.plan_for(only).relationships if relation in self._to_many_linkage]
+        if not relations or not instances:
+            return {}
+        session = object_session(instances[0])
+        if session is None:
+            return {}
+        linkage = {}
+        for relation in relations:
+            info = self._to_many_linkage[relation]
+            try:
+                type_ = self._api_manager.collection_name(info.target_model)
+                related_id = getattr(info.target_model, self._api_manager.primary_key_for(info.target_model))
+            except (KeyError, ValueError):
+                continue
+            key_column, id_column, join = info.key_column, related_id, info.join
+            if info.secondary is not None and not info.order_by and related_id.property.columns[0] is info.secondary[1]:
+                # The IDs of the related resources are in the association table.
+                key_column, id_column, join = info.secondary[0], info.secondary[2], None
+            keys = list({getattr(instance, info.parent_key) for instance in instances})
+            identifiers: Dict[Any, list] = {key: [] for key in keys}
+            totals: Dict[Any, int] = {}
+            for start in range(0, len(keys), MAX_IN_VALUES):
+                chunk = keys[start:start + MAX_IN_VALUES]
+                if limit is None:
+                    query = session.query(key_column, id_column)
+                    if join is not None:
+                        query = query.join(join)
+                    query = query.filter(key_column.in_(chunk))
+                    if info.order_by:
+                        query = query.order_by(*info.order_by)
+                    for key, id_ in query:
+                        identifiers[key].append({'id': str(id_), 'type': type_})
+                    continue
+                order_by = info.order_by or [id_column]
+                subquery = session.query(
+                    key_column.label('key'),
+                    id_column.label('id'),
+                    func.row_number().over(partition_by=key_column, order_by=order_by).label('position'),
+                    func.count().over(partition_by=key_column).label('total'),
+                )
+                if join is not None:
+                    subquery = subquery.join(join)
+                subquery = subquery.filter(key_column.in_(chunk)).subquery()
+                query = session.query(subquery.c.key, subquery.c.id, subquery.c.total)
+                query = query.filter(subquery.c.position <= max(limit, 1)).order_by(subquery.c.key, subquery.c.position)
+                for key, id_, total in query:
+                    totals[key] = total
+                    if len(identifiers[key]) < limit:
+                        identifiers[key].append({'id': str(id_), 'type': type_})
+            linkage[relation] = {key: (value, totals.get(key, len(value))) for key, value in identifiers.items()}
+        return linkage
+
+    def serialize_attributes(self, instance, only=None) -> Dict[str, Any]:
+        attributes = {}
+        for name, converter in self.plan_for(only).attributes:
+            value = getattr(instance, name)
+            if converter is not None and value is not None:
+                value = converter(value)
+            attributes[name] = value
         return attributes
 
-    def serialize(self, instance, only=None):
-        attributes = self.serialize_attributes(instance, only)
+    def serialize(self, instance, only=None, linkage=None, limit=None):
+        """Returns the resource object of `instance`.
+
+        `linkage` is the result of :meth:`to_many_linkage` for a group of
+        instances that includes `instance`; the relationships it contains
+        are not loaded from `instance`.
 
-        for key, value in attributes.items():
-            # Call any functions that appear in the result.
-            if callable(value):
-                attributes[key] = value()
+        If `limit` is not ``None``, the linkage of each to-many
+        relationship contains at most `limit` resource identifier objects,
+        the total number of related resources is given in the ``meta``
+        object of the relationship, and truncated relationships link to
+        the relationship endpoints for the rest.
+
+        """
+        attributes = self.serialize_attributes(instance, only)
 
         # Get the ID and type of the resource.
         id_ = str(getattr(instance, self._primary_key))
@@ -452,25 +868,78 @@ class DefaultSerializer(Serializer):
         if attributes:
             result['attributes'] = attributes
 
-        relations = copy(self._relations)
-        # Only consider those relations listed in `only`.
-        if only is not None:
-            relations &= only
-
+        relations = self.plan_for(only).relationships
         if relations:
-            result['relationships'] = {rel: self.create_relationship(instance, rel) for rel in relations}
+            result['relationships'] = {rel: self.create_relationship(instance, rel, linkage, limit) for rel in relations}
 
-        # TODO: Refactor
-        if (self._api_manager.include_links and (self._only is None or 'self' in self._only)
-                and (only is None or 'self' in only)):
+        if self._includes_self_link(only):
             instance_id = getattr(instance, self._api_manager.primary_key_for(self._model))
-            path = self._api_manager.url_for(self._model, resource_id=instance_id, _method='GET')
-            url = urljoin(request.url_root, path)
-            result['links'] = dict(self=url)
+            result['links'] = self._resource_links(instance_id)
 
         return result
 
-    def create_relationship(self, instance, relation):
+    def serialize_row(self, row, only=None):
+        """Returns a dictionary representation of a resource from a result
+        row, without an instance of the model.
+
+        `row` must contain the values of the columns returned by
+        :meth:`row_columns` for the same `only`, in that order.
+
+        """
+        plan = self.plan_for(only)
+        num_attributes = len(plan.attributes)
+        pk_value = row[0]
+        result = dict(id=str(pk_value), type=self._type)
+
+        if plan.attributes:
+            attributes = {}
+            for (name, converter), value in zip(plan.attributes, row[1:num_attributes + 1]):
+                if converter is not None and value is not None:
+                    value = converter(value)
+                attributes[name] = value
+            result['attributes'] = attributes
+
+        if plan.relationships:
+            relationships = {}
+            for relation, fk_value in zip(plan.relationships, row[num_attributes + 1:]):
+                relationship = {}
+                if self._api_manager.include_links:
+                    relationship['links'] = self._relationship_links(pk_value, relation)
+                relationship['data'] = self._to_one_linkage(self._many_to_one_relationships[relation], fk_value)
+                relationships[relation] = relationship
+            result['relationships'] = relationships
+
+        if self._includes_self_link(only):
+            result['links'] = self._resource_links(pk_value)
+
+        return result
+
+    def _includes_self_link(self, only):
+        # TODO: Refactor
+        return (self._api_manager.include_links and (self._only is None or 'self' in self._only)
+                and (only is None or 'self' in only))
+
+    def _resource_links(self, pk_value):
+        return dict(self=self._api_manager.link_templates[self._model].resource_url(pk_value))
+
+    def _relationship_links(self, pk_value, relation):
+        return self._api_manager.link_templates[self._model].relationship_links(pk_value, relation)
+
+    def _add_linkage_total(self, relationship, instance, relation, total):
+        relationship['meta'] = {'total': total}
+        if total > len(relationship['data']) and 'links' not in relationship:
+            pk_value = getattr(instance, self._api_manager.primary_key_for(self._model))
+            relationship['links'] = self._relationship_links(pk_value, relation)
+
+    def _to_one_linkage(self, relationship_info, fk_value):
+        if fk_value is None:
+            return None
+        return {
+            'id': str(fk_value),
+            'type': self._api_manager.collection_name(relationship_info.target_model)
+        }
+
+    def create_relationship(self, instance, relation, linkage=None, limit=None):
         """Creates a relationship from the given relation name.
 
         Returns a dictionary representing a relationship as described in
@@ -482,6 +951,8 @@ class DefaultSerializer(Serializer):
         `relation` is the name of the relation of `instance` given as a
         string.
 
+        `linkage` and `limit` are as described in :meth:`serialize`.
+
         This function may raise :exc:`ValueError` if an API has not been
         created for the primary model, `model`, or the model of the
         relation.
@@ -491,31 +962,20 @@ class DefaultSerializer(Serializer):
         """
         result = {}
         if self._api_manager.include_links:
-            # Create the self and related links.
             pk_value = getattr(instance, self._api_manager.primary_key_for(self._model))
-            self_link = self._api_manager.url_for(self._model, resource_id=pk_value, relation_name=relation, relationship=True)
-            related_link = self._api_manager.url_for(self._model, resource_id=pk_value, relation_name=relation)
-            result['links'] = {'self': self_link}
-            # If the user has not created a GET endpoint for the related
-            # resource, then there is no "related" link to provide, so we check
-            # whether the URL exists before setting the related link.
-            try:
-                get_related_model(self._model, relation)
-            except ValueError:
-                pass
-            else:
-                result['links']['related'] = related_link
+            result['links'] = self._relationship_links(pk_value, relation)
 
         relationship_info = self._many_to_one_relationships.get(relation)
         if relationship_info:
-            fk_value = getattr(instance, relationship_info.foreign_key)
-            if fk_value is None:
-                result['data'] = None
-            else:
-                result['data'] = {
-                    'id': str(fk_value),
-                    'type': self._api_manager.collection_name(relationship_info.target_model)
-                }
+            result['data'] = self._to_one_linkage(relationship_info, getattr(instance, relationship_info.foreign_key))
+            return result
+
+        if linkage and relation in linkage:
+            key = getattr(instance, self._to_many_linkage[relation].parent_key)
+            identifiers, total = linkage[relation].get(key, ((), 0))
+            result['data'] = list(identifiers)
+            if limit is not None:
+                self._add_linkage_total(result, instance, relation, total)
             return result
 
         # Get the related value so we can see if it is a to-many
@@ -530,8 +990,17 @@ class DefaultSerializer(Serializer):
             # here and provide it in the `_type` keyword argument to the
             # serialization function, but the to-many relationship could be
             # heterogeneous.
-            result['data'] = [self._api_manager.serialize_relationship(instance)
-                              for instance in related_value]
+            if limit is None:
+                result['data'] = [self._api_manager.serialize_relationship(related)
+                                  for related in related_value]
+            else:
+                if isinstance(related_value, Query):
+                    # Dynamic relationships are queried for the bounded linkage and the count only
+                    related, total = related_value.limit(limit).all(), related_value.count()
+                else:
+                    related, total = list(islice(related_value, limit)), len(related_value)
+                result['data'] = [self._api_manager.serialize_relationship(item) for item in related]
+                self._add_linkage_total(result, instance, relation, total)
         elif related_value is not None:
             result['data'] = self._api_manager.serialize_relationship(related_value)
         else:
@@ -575,16 +1044,17 @@ class DefaultDeserializer(Deserializer):
         expected_type = self.api_manager.collection_name(self.model)
         if type_ != expected_type:
             raise ConflictingType(expected_type, type_)
+        plan = field_plan(self.model)
         # Check for any request parameter naming a column which does not exist
         # on the current model.
         for field in data:
             if field == 'relationships':
                 for relation in data['relationships']:
-                    if not has_field(self.model, relation):
+                    if relation not in plan.fields:
                         raise UnknownRelationship(relation)
             elif field == 'attributes':
                 for attribute in data['attributes']:
-                    if not has_field(self.model, attribute):
+                    if attribute not in plan.fields:
                         raise UnknownAttribute(attribute)
         # Determine which related instances need to be added.
         links = {}
@@ -594,20 +1064,18 @@ class DefaultDeserializer(Deserializer):
                 if 'data' not in link_object:
                     raise MissingData(link_name)
                 linkage = link_object['data']
-                related_model = get_related_model(self.model, link_name)
-                expected_type = self.api_manager.collection_name(related_model)
+                related_model = plan.relations.get(link_name)
                 # Create the deserializer for this relationship object.
                 deserializer = DefaultRelationshipDeserializer(self.session, related_model, self.api_manager, relation_name=link_name)
                 links[link_name] = deserializer.deserialize(linkage)
-        # TODO Need to check here if any related instances are None,
-        # like we do in the patch() method. We could possibly refactor
-        # the code above and the code there into a helper function...
-        pass
         # Move the attributes up to the top level.
         attributes = data.pop('attributes', {})
         # Special case: if there are any dates, convert the string form of the
         # date into an instance of the Python ``datetime`` object.
-        attributes = strings_to_datetimes(self.model, attributes)
+        try:
+            attributes = coerce_fields(plan, attributes, iso_only=self.api_manager.iso_dates_only)
+        except ValueError as exception:
+            raise InvalidType(f'invalid date or time: {exception}')
         data.update(attributes)
         # Create the new instance by keyword attributes.
         instance = self.model(**data)
@@ -669,8 +1137,9 @@ class DefaultRelationshipDeserializer(Deserializer):
         specified in the constructor whose ID or IDs match the given
         `data`.
 
-        May raise :exc:`MissingID`, :exc:`MissingType`, or
-        :exc:`ConflictingType`.
+        May raise :exc:`MissingID`, :exc:`MissingType`,
+        :exc:`ConflictingType`, or, for a to-many relation,
+        :exc:`RelatedResourcesNotFound`.
 
         """
         if data is None:
@@ -688,6 +1157,21 @@ class DefaultRelationshipDeserializer(Deserializer):
             id_ = data['id']
             primary_key = self.api_manager.primary_key_for(self.model)
             return get_by(self.session, self.model, id_, primary_key=primary_key)
-        # Otherwise, if this is a to-many relationship, recurse on each
-        # and return a list of instances.
-        return list(map(self.deserialize, data))
+        # Otherwise, this is a to-many relationship, so get all the
+        # instances with a single query.
+        for linkage in data:
+            if 'id' not in linkage:
+                raise MissingID(self.relation_name)
+            if 'type' not in linkage:
+                raise MissingType(self.relation_name)
+            type_ = linkage['type']
+            if type_ != self.type_name:
+                raise ConflictingType(self.relation_name, self.type_name,
+                                      type_)
+        ids = [linkage['id'] for linkage in data]
+        primary_key = self.api_manager.primary_key_for(self.model)
+        found = get_by_many(self.session, self.model, ids, primary_key=primary_key)
+        not_found = [id_ for id_ in ids if id_ not in found]
+        if not_found:
+            raise RelatedResourcesNotFound(self.type_name, not_found, self.relation_name)
+        return [found[id_] for id_ in ids]
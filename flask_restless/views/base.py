@@ -17,46 +17,66 @@ The main class in this module, :class:`APIBase`, is a
 for JSON API requests on a SQLAlchemy backend.
 
 """
-import math
 import re
 from collections import defaultdict
+from collections import namedtuple
+from functools import lru_cache
 from functools import partial
 from functools import wraps
 from http import HTTPStatus
 from itertools import chain
+from itertools import islice
+from typing import AbstractSet
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
 from typing import Optional
 from typing import Set
 from typing import Tuple
-from urllib.parse import urlparse
-from urllib.parse import urlunparse
 
 from flask import Response
 from flask import current_app
 from flask import json
 from flask import request
+from flask import stream_with_context
 from flask.views import MethodView
 from flask.views import View
 from sqlalchemy import inspect
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import load_only
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import with_parent
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.dynamic import DynamicAttributeImpl
+from sqlalchemy.orm.exc import UnmappedColumnError
 from sqlalchemy.orm.query import Query
 from sqlalchemy.sql import false as FALSE
 from sqlalchemy.sql.elements import BinaryExpression
 from werkzeug.exceptions import HTTPException
 from werkzeug.http import parse_options_header
 
+from ..cache import EncodedResource
 from ..exceptions import BadRequest
 from ..exceptions import Error
 from ..exceptions import NotFound
+from ..helpers import MAX_IN_VALUES
 from ..helpers import get_inclusions_for_instances
 from ..helpers import get_model
 from ..helpers import get_related_model
+from ..helpers import inclusion_tree
 from ..helpers import is_like_list
 from ..helpers import is_proxy
+from ..helpers import is_unrestricted_query
 from ..helpers import query_by_primary_key
 from ..helpers import session_query
+from ..pagination import CountStrategy
+from ..pagination import ExactCount
+from ..pagination import InvalidCursor
+from ..pagination import cheaper_count_strategy
+from ..pagination import keyset_for
+from ..pagination import keyset_page
+from ..pagination import offset_page
 from ..search import ComparisonToNull
 from ..search import search
 from ..serialization import DefaultSerializer
@@ -64,7 +84,6 @@ from ..serialization import DeserializationException
 from ..serialization import SerializationException
 from ..serialization import Serializer
 from ..typehints import ResponseTuple
-from .helpers import count
 from .helpers import upper_keys as upper
 
 #: The Content-Type we expect for most requests to APIs.
@@ -85,6 +104,16 @@ JSONAPI_VERSION = '1.0'
 CONFLICT_INDICATORS = ('conflicts with', 'UNIQUE constraint failed',
                        'is not unique')
 
+#: A level of an include tree that is eager-loaded.
+#:
+#: `name` is the name of the relationship, `attribute` the relationship
+#: attribute, `model` the related model, `relations` the names of the
+#: relationships included at the next level and `children` the levels
+#: among them that are eager-loaded as well. If `batched` is ``True``,
+#: the level is loaded by :func:`batch_load` after its parent level,
+#: otherwise with a ``selectinload`` chained to that of its parent.
+IncludeLevel = namedtuple('IncludeLevel', ['name', 'attribute', 'model', 'relations', 'children', 'batched'])
+
 #: The names of pagination links that appear in both ``Link`` headers
 #: and JSON API links.
 LINK_NAMES = ('first', 'last', 'prev', 'next')
@@ -105,6 +134,22 @@ PAGE_NUMBER_PARAM = 'page[number]'
 #: :https:method:`get` request.
 PAGE_SIZE_PARAM = 'page[size]'
 
+#: The query parameter key that identifies the cursor of a page in a
+#: :https:method:`get` request for keyset pagination.
+PAGE_CURSOR_PARAM = 'page[cursor]'
+
+#: The query parameter key that identifies the strategy for counting the
+#: resources of a collection in a :https:method:`get` request.
+COUNT_PARAM = 'page[count]'
+
+#: The query parameter key that limits the number of resource identifier
+#: objects in the linkage of to-many relationships.
+LINKAGE_LIMIT_PARAM = 'linkage[limit]'
+
+#: The number of rows fetched from the database and serialized at a time
+#: when a collection is streamed to the client.
+STREAM_CHUNK_SIZE = 1000
+
 #: A regular expression for Accept headers.
 #:
 #: For an explanation of "media-range", etc., see Sections 5.3.{1,2} of
@@ -131,10 +176,12 @@ ERROR_FIELDS = ('id_', 'links', 'status', 'code_', 'title', 'detail', 'source',
                 'meta')
 
 
-def collection_parameters():
+def collection_parameters(loads=json.loads):
     """Gets filtering, sorting and other settings from the
     request that affect the collection of resources in a response.
 
+    `loads` is the function used to decode the filter objects.
+
     Returns a tuple of the form ``(filters, sort)``.
     These can be provided to the
     :func:`~flask_restless.search.search` function; for more
@@ -143,7 +190,7 @@ def collection_parameters():
     """
     try:
         # Determine filtering options.
-        filters = json.loads(request.args.get(FILTER_PARAM, '[]'))
+        filters = loads(request.args.get(FILTER_PARAM, '[]'))
 
         # Determine sorting options.
         sort = request.args.get(SORT_PARAM)
@@ -407,15 +454,374 @@ def requires_json_api_mimetype(func):
     return new_func
 
 
+def _to_bytes(encoded):
+    return encoded if isinstance(encoded, bytes) else encoded.encode()
+
+
+def _is_encoded(value):
+    if isinstance(value, list):
+        return any(isinstance(item, EncodedResource) for item in value)
+    return isinstance(value, EncodedResource)
+
+
+def encode_document(document, dumps=json.dumps):
+    """Encodes `document` with `dumps`.
+
+    The top-level members of `document` whose value is an
+    :class:`~flask_restless.cache.EncodedResource`, or a list containing
+    some, are written from the already encoded resource objects, so they
+    are not encoded again.
+
+    """
+    if not isinstance(document, dict) or not any(_is_encoded(value) for value in document.values()):
+        return dumps(document)
+    members = []
+    rest = {key: value for key, value in document.items() if not _is_encoded(value)}
+    if rest:
+        members.append(_to_bytes(dumps(rest)).strip()[1:-1])
+    for key, value in document.items():
+        if not _is_encoded(value):
+            continue
+        if isinstance(value, list):
+            value = b'[' + b', '.join(item if isinstance(item, EncodedResource) else _to_bytes(dumps(item)) for item in value) + b']'
+        members.append(_to_bytes(dumps(key)) + b': ' + value)
+    return b'{' + b', '.join(members) + b'}'
+
+
+def render_response(result, dumps=json.dumps):
+    """Returns a :class:`flask.Response` for the ``(data, status_code,
+    headers)`` tuple returned by a view, encoding `data` with `dumps`.
+
+    If `result` is already a response, it is returned unchanged.
+
+    """
+    if isinstance(result, Response):
+        return result
+    data, status_code, headers = result
+    return Response(response=encode_document(data, dumps), status=status_code, mimetype=CONTENT_TYPE, headers=headers)
+
+
 def mime_renderer(func):
 
     @wraps(func)
     def new_func(*args, **kw):
-        data, status_code, headers = func(*args, **kw)
-        return Response(response=json.dumps(data), status=status_code, mimetype=CONTENT_TYPE, headers=headers)
+        return render_response(func(*args, **kw))
     return new_func
 
 
+def serialize_instances(api_manager, instances, sparse_fields, linkage_limit=None, resource_cache=None) -> list:
+    """Serializes a list of instances of any SQLAlchemy models.
+
+    The instances are grouped by model and each group is serialized with a
+    single call to :meth:`Serializer.serialize_many` of the serializer for
+    that model, restricted to the fieldset for that model in
+    `sparse_fields`. The resource objects are returned in the order of
+    `instances`; ``None`` values are skipped.
+
+    `linkage_limit` is passed on to :meth:`Serializer.serialize_many`, if
+    it is not ``None``. If
+    `resource_cache` is not ``None``, encoded resource objects are taken
+    from the cache, and only the missing ones are serialized.
+
+    This function raises :exc:`MultipleExceptions` if there is a problem
+    serializing one or more of the instances.
+
+    """
+    instances = [instance for instance in instances if instance is not None]
+    indices_by_model: Dict[type, list] = defaultdict(list)
+    for index, instance in enumerate(instances):
+        indices_by_model[get_model(instance)].append(index)
+    result: list = [None] * len(instances)
+    failed = []
+    for model, indices in indices_by_model.items():
+        serializer = api_manager.serializer_for(model)
+        # This may raise ValueError
+        only = sparse_fields.get(api_manager.collection_name(model))
+        # Serializers written before the `linkage_limit` argument was added
+        # may not take it, so it is only passed when set.
+        kwargs = {} if linkage_limit is None else {'linkage_limit': linkage_limit}
+        variant = None
+        if resource_cache is not None:
+            links_root = request.url_root if api_manager.include_links else None
+            variant = (serializer, None if only is None else frozenset(only), links_root, linkage_limit)
+            for index in indices:
+                result[index] = resource_cache.get(instances[index], variant)
+            indices = [index for index in indices if result[index] is None]
+            if not indices:
+                continue
+        group = [instances[index] for index in indices]
+        try:
+            if hasattr(serializer, 'serialize_many'):
+                resources = serializer.serialize_many(group, only=only, **kwargs)
+            else:
+                # Serializers that do not derive from `Serializer`
+                resources = [serializer.serialize(instance, only=only) for instance in group]
+        except SerializationException as exception:
+            # Serialize the instances one at a time to report each of the problems.
+            exceptions = _serialization_exceptions(serializer, group, only)
+            failed.extend(exceptions or [exception])
+            continue
+        for index, resource in zip(indices, resources):
+            if resource_cache is not None:
+                resource = resource_cache.set(instances[index], variant, _to_bytes(api_manager.json_dumps(resource)))
+            result[index] = resource
+    if failed:
+        raise MultipleExceptions(failed)
+    return result
+
+
+def _serialization_exceptions(serializer, instances, only=None) -> list:
+    exceptions = []
+    for instance in instances:
+        try:
+            serializer.serialize(instance, only=only)
+        except SerializationException as exception:
+            exceptions.append(exception)
+    return exceptions
+
+
+def is_safe_to_selectload(attribute) -> bool:
+    """Returns ``True`` if the relationship `attribute` can be loaded
+    with ``selectinload``.
+
+    SQLAlchemy does not build correct ``selectinload`` queries for
+    relationships with a secondary table or a custom join condition, and
+    association proxies and dynamic relationships can not be eager-loaded.
+
+    """
+    if is_proxy(attribute):
+        return False
+    try:
+        inspected_relationship = inspect(attribute)
+        if inspected_relationship.property.secondary:
+            return False
+        if not isinstance(inspected_relationship.property.primaryjoin, BinaryExpression):
+            return False
+        if isinstance(attribute.impl, DynamicAttributeImpl):
+            return False
+    except Exception:
+        # we do not have enough information, assume it's not safe
+        return False
+    return True
+
+
+def can_batch_load(attribute) -> bool:
+    """Returns ``True`` if the relationship `attribute` can be loaded
+    for many instances at once by :func:`batch_load`.
+
+    That is any relationship that is not dynamic and not ``noload``, on
+    a model with a single primary key column.
+
+    """
+    if is_proxy(attribute):
+        return False
+    try:
+        relationship = inspect(attribute).property
+        if relationship.lazy in ('noload', 'dynamic', 'write_only'):
+            return False
+        return len(inspect(attribute.class_).primary_key) == 1
+    except Exception:
+        return False
+
+
+def batch_load(session, instances, attribute, options=()):
+    """Loads the relationship `attribute` of all the `instances` for
+    which it has not been loaded yet.
+
+    The related instances are loaded together with the primary key of
+    their parent, by joining the related table to the parent table on the
+    relationship, with one ``IN`` query for each
+    :data:`~flask_restless.helpers.MAX_IN_VALUES` instances.
+    They are then stored on each instance as if SQLAlchemy had loaded
+    them, so this works for relationships that can not be loaded with
+    ``selectinload``, like many-to-many relationships or those with a
+    custom join condition. `options` are loader options for the query,
+    relative to the related model.
+
+    """
+    model = attribute.class_
+    relationship = attribute.property
+    parent = aliased(model)
+    mapper = inspect(model)
+    parent_key = getattr(parent, mapper.get_property_by_column(mapper.primary_key[0]).key)
+    instances_by_key: Dict[Any, list] = defaultdict(list)
+    for instance in instances:
+        state = inspect(instance)
+        if state.identity is not None and attribute.key in state.unloaded:
+            instances_by_key[state.identity[0]].append(instance)
+    related: Dict[Any, list] = {key: [] for key in instances_by_key}
+    keys = list(instances_by_key)
+    for start in range(0, len(keys), MAX_IN_VALUES):
+        query = session.query(parent_key, relationship.mapper.class_).join(getattr(parent, attribute.key))
+        query = query.filter(parent_key.in_(keys[start:start + MAX_IN_VALUES])).options(*options)
+        if relationship.order_by:
+            query = query.order_by(*relationship.order_by)
+        for key, related_instance in query:
+            related[key].append(related_instance)
+    for key, values in related.items():
+        value = values if relationship.uselist else next(iter(values), None)
+        for instance in instances_by_key[key]:
+            set_committed_value(instance, attribute.key, value)
+
+
+@lru_cache()
+def include_plan(model, include: FrozenSet[str]) -> Tuple[IncludeLevel, ...]:
+    """Returns the levels of the include paths in `include` that can be
+    eager-loaded when fetching instances of `model`.
+
+    Each level is eager-loaded with a ``selectinload`` chained to the one
+    of its parent, so all the included resources are loaded with one
+    query per level. A level that is not safe to eager-load that way, see
+    :func:`is_safe_to_selectload`, is loaded by :func:`batch_load` if
+    possible, and lazily along with all the levels below it otherwise.
+
+    """
+    return _include_levels(model, inclusion_tree(include))
+
+
+def _include_levels(model, tree) -> Tuple[IncludeLevel, ...]:
+    levels = []
+    for name, subtree in tree.items():
+        attribute = getattr(model, name, None)
+        if attribute is None:
+            continue
+        if is_safe_to_selectload(attribute):
+            batched = False
+        elif can_batch_load(attribute):
+            batched = True
+        else:
+            continue
+        related_model = get_related_model(model, name)
+        levels.append(IncludeLevel(name, attribute, related_model, tuple(subtree), _include_levels(related_model, subtree), batched))
+    return tuple(levels)
+
+
+#: The columns of a many-to-many relationship whose association table
+#: can be read and written directly.
+#:
+#: `table` is the association table, `parent_column` the column of the
+#: parent table referenced by its column `parent_key_column`, and
+#: `target_column` the column of the related table referenced by its
+#: column `id_column`.
+AssociationColumns = namedtuple('AssociationColumns', ['table', 'parent_column', 'parent_key_column', 'target_column', 'id_column'])
+
+
+def association_columns(attribute) -> Optional[AssociationColumns]:
+    """Returns the columns of the association table of the relationship
+    `attribute`, or ``None`` if it is not a many-to-many relationship that
+    joins each side on a single column without any other criteria.
+
+    """
+    relationship = attribute.property
+    if relationship.secondary is None or not isinstance(relationship.primaryjoin, BinaryExpression) \
+            or not isinstance(relationship.secondaryjoin, BinaryExpression):
+        return None
+    if len(relationship.synchronize_pairs) != 1 or len(relationship.secondary_synchronize_pairs) != 1:
+        return None
+    parent_column, parent_key_column = relationship.synchronize_pairs[0]
+    target_column, id_column = relationship.secondary_synchronize_pairs[0]
+    return AssociationColumns(relationship.secondary, parent_column, parent_key_column, target_column, id_column)
+
+
+def association_key(instance, columns: AssociationColumns):
+    """Returns the value that identifies `instance` in the association
+    table, or ``None`` if the referenced column is not mapped.
+
+    """
+    try:
+        return getattr(instance, inspect(instance).mapper.get_property_by_column(columns.parent_column).key)
+    except UnmappedColumnError:
+        return None
+
+
+def association_linkage_query(session, instance, attribute, related_id):
+    """Returns a query that selects the IDs of the instances related to
+    `instance` by the many-to-many relationship `attribute` from its
+    association table alone, ordered by ID, or ``None`` if that is not
+    possible.
+
+    `related_id` is the attribute of the related model whose values are
+    the IDs of the related resources. The association table must
+    reference it, and it must be the only primary key column of the
+    related table.
+
+    """
+    columns = association_columns(attribute)
+    if columns is None:
+        return None
+    id_columns = getattr(getattr(related_id, 'property', None), 'columns', ())
+    if list(attribute.property.mapper.primary_key) != [columns.target_column] or list(id_columns) != [columns.target_column]:
+        return None
+    key = association_key(instance, columns)
+    if key is None:
+        return None
+    return session.query(columns.id_column).filter(columns.parent_key_column == key).order_by(columns.id_column)
+
+
+def resource_identifiers(type_, rows) -> list:
+    """Returns the resource identifier objects of type `type_` for `rows`
+    whose single column is the ID of a resource.
+
+    """
+    return [{'id': str(id_), 'type': type_} for id_, in rows]
+
+
+def parse_linkage_limit(max_linkage_limit=None) -> Optional[int]:
+    """Returns the maximum number of resource identifier objects in the
+    linkage of to-many relationships requested by the client.
+
+    If the client does not request a limit, `max_linkage_limit` is
+    returned; otherwise the requested limit is capped at
+    `max_linkage_limit`, if it is not ``None``.
+
+    Raises :exc:`BadRequest` if the requested limit is not a non-negative
+    integer.
+
+    """
+    value = request.args.get(LINKAGE_LIMIT_PARAM)
+    if value is None:
+        return max_linkage_limit
+    try:
+        limit = int(value)
+        if limit < 0:
+            raise ValueError(value)
+    except ValueError as exception:
+        raise BadRequest(cause=exception, details=f'{LINKAGE_LIMIT_PARAM} must be a non-negative integer') from exception
+    if max_linkage_limit is not None:
+        limit = min(limit, max_linkage_limit)
+    return limit
+
+
+def parse_count_strategy(count_strategy: CountStrategy) -> CountStrategy:
+    """Returns the strategy for counting the resources of collections
+    requested by the client.
+
+    The client may request a strategy by its name with the
+    :data:`COUNT_PARAM` query parameter or with a ``count`` preference
+    in the ``Prefer`` header, like ``Prefer: count=none``. The requested
+    strategy is only used if it is cheaper than `count_strategy`, which is
+    returned otherwise.
+
+    Raises :exc:`BadRequest` if the query parameter is not the name of a
+    count strategy. Unknown preferences are ignored.
+
+    """
+    name = request.args.get(COUNT_PARAM)
+    if name is not None:
+        try:
+            return cheaper_count_strategy(count_strategy, name)
+        except ValueError as exception:
+            raise BadRequest(cause=exception, details=str(exception)) from exception
+    for preference in ','.join(request.headers.getlist('Prefer')).split(','):
+        key, _, value = preference.split(';')[0].partition('=')
+        if key.strip().lower() == 'count':
+            try:
+                return cheaper_count_strategy(count_strategy, value.strip().strip('"'))
+            except ValueError:
+                pass
+    return count_strategy
+
+
 def catch_integrity_errors(session):
     """Returns a decorator that catches database integrity errors.
 
@@ -727,12 +1133,18 @@ class Paginated:
     large as the length of `items`.
 
     `num_results` is the total number of resources or link objects on
-    all pages, not just the page represented by `items`.
+    all pages, not just the page represented by `items`. If it is only an
+    estimate or a lower bound, `total_key` is the key under which it is
+    given in :attr:`meta` instead of ``'total'``; see
+    :class:`~flask_restless.pagination.CountStrategy`.
 
     `first`, `last`, `prev`, and `next_` are integers representing the
     number of the first, last, previous, and next pages,
     respectively. These can also be ``None``, in the case that there is
-    no such page.
+    no such page. If `page_param` is :data:`PAGE_CURSOR_PARAM` instead
+    of :data:`PAGE_NUMBER_PARAM`, they are the cursors of the pages
+    (see :mod:`flask_restless.pagination`), and `num_results` may be
+    ``None``.
 
     `filters`, and `sort` are the filtering and sorting query parameters
     from the request that yielded the given items.
@@ -792,7 +1204,7 @@ class Paginated:
     @staticmethod
     def _url_without_pagination_params():
         """Returns the request URL including all query parameters except
-        the page size and page number query parameters.
+        the page size, page number and page cursor query parameters.
 
         The URL is returned as a string.
 
@@ -807,38 +1219,18 @@ class Paginated:
         query_params = request.args
         # Set the new query_parameters to be everything except the
         # pagination query parameters.
-        new_query = {k: v for k, v in query_params.items() if k not in (PAGE_NUMBER_PARAM, PAGE_SIZE_PARAM)}
+        new_query = {k: v for k, v in query_params.items() if k not in (PAGE_NUMBER_PARAM, PAGE_SIZE_PARAM, PAGE_CURSOR_PARAM)}
         new_query_string = '&'.join(map('='.join, new_query.items()))
         # Join the base URL with the query parameter string.
         return f'{proto}://{host}{path}?{new_query_string}'
 
-    @staticmethod
-    def _to_url(base_url, query_params):
-        """Returns the specified base URL augmented with the given query
-        parameters.
-
-        `base_url` is a string representing a URL.
-
-        `query_params` is a dictionary whose keys and values are strings,
-        representing the query parameters to append to the given URL.
-
-        If the base URL already has query parameters, the ones given in
-        `query_params` are appended.
-
-        """
-        query_string = '&'.join(map('='.join, query_params.items()))
-        scheme, netloc, path, params, query, fragment = urlparse(base_url)
-        if query:
-            query_string = '&'.join((query, query_string))
-        parsed = (scheme, netloc, path, params, query_string, fragment)
-        return urlunparse(parsed)
-
     def __init__(self, items, first=None, last=None, prev=None, next_=None,
                  page_size=None, num_results=None, filters=None, sort=None,
-                 raw_items=None):
+                 raw_items=None, page_param=PAGE_NUMBER_PARAM, total_key='total'):
         self._items = items
         self._raw_items = raw_items
         self._num_results = num_results
+        self._total_key = total_key
         # Pagination links and the link header are computed by the code below.
         self._pagination_links = {}
         self._header_links = []
@@ -871,6 +1263,12 @@ class Paginated:
         # `flask.Request.base_url` is the URL *without* the query
         # parameters.)
         base_url = Paginated._url_without_pagination_params()
+        # The base URL always ends with its (possibly empty) query string,
+        # so the query parameters common to all links are appended to it
+        # once, and only the page number differs between links.
+        if not base_url.endswith('?'):
+            base_url += '&'
+        base_url += '&'.join(map('='.join, query_params.items()))
         for rel, num in zip(LINK_NAMES, link_numbers):
             # If the link doesn't exist (for example, if there is no
             # previous page), then add ``None`` to the pagination links
@@ -878,12 +1276,7 @@ class Paginated:
             if num is None:
                 self._pagination_links[rel] = None
             else:
-                # Each time through this `for` loop we update the page
-                # number in the `query_param` dictionary, so the the
-                # `_to_url` method will give us the correct URL for that
-                # page.
-                query_params[PAGE_NUMBER_PARAM] = str(num)
-                url = Paginated._to_url(base_url, query_params)
+                url = f'{base_url}&{page_param}={num}'
                 link_string = f'<{url}>; rel="{rel}"'
                 self._header_links.append(link_string)
                 self._pagination_links[rel] = url
@@ -939,6 +1332,157 @@ class Paginated:
         """
         return self._num_results
 
+    @property
+    def meta(self):
+        """Dictionary of the total number of elements for the ``meta``
+        object of JSON API documents, empty if it is not known.
+
+        """
+        if self._num_results is None:
+            return {}
+        return {self._total_key: self._num_results}
+
+
+class EagerLoadingMixin:
+    """Eager-loads the relationships of the instances fetched by a view.
+
+    Both the relationships needed to serialize the instances and those
+    along the include paths requested by the client are loaded with a
+    constant number of queries, regardless of the number of instances.
+    Included resources are pruned to their sparse fieldsets.
+
+    Classes using this mixin must have the attributes :attr:`model`,
+    :attr:`session`, :attr:`api_manager` and :attr:`sparse_fields`.
+
+    """
+
+    model: Any
+    session: Any
+    api_manager: Any
+    sparse_fields: Dict[str, Set[str]]
+
+    def _selectinload_included_relationships(
+            self,
+            query: Query,
+            include: AbstractSet[str],
+            serializer: Serializer,
+            filters=None,
+            model=None
+    ) -> Query:
+        """Adds loader options to `query` that eager-load the relationships
+        needed to serialize its instances with `serializer` and to include
+        the related resources along the paths in `include`.
+
+        `model` is the model of the instances of `query`; it defaults to
+        the model of this view. The levels of the include paths that can
+        not be loaded by these options are loaded by
+        :meth:`_load_included` after the query is executed.
+
+        """
+        model = model or self.model
+        include_paths = frozenset(include or ())
+        join_paths = set(inclusion_tree(include_paths))
+        for level in include_plan(model, include_paths):
+            if not level.batched:
+                query = query.options(self._include_options(level))
+
+        relationship_columns = serializer.relationship_columns
+
+        # `many_to_one_relationships` is not a part of the base Serializer class, so to keep backward compatibility
+        # check if we use DefaultSerializer
+        if isinstance(serializer, DefaultSerializer):
+            relationship_columns -= serializer.many_to_one_relationships
+            # The linkage of these relationships is read from the foreign keys of the related tables
+            if serializer.loads_to_many_linkage:
+                relationship_columns -= serializer.to_many_linkage_relationships
+
+        for path in relationship_columns:
+            attribute = getattr(model, path)
+            if path not in join_paths and is_safe_to_selectload(attribute):
+                options = selectinload(attribute)
+
+                # if request contains filters we need to load all columns
+                if not filters:
+                    try:
+                        related_model = get_related_model(model, path)
+                        pk = self.api_manager.primary_key_for(related_model)
+                        options = options.options(load_only(getattr(related_model, pk)))
+                    except KeyError:
+                        # theoretically all models should be known to the API, and we should raise a Server Error if they are not,
+                        # but to keep backward compatibility we let it pass
+                        pass
+                query = query.options(options)
+
+        columns = self._columns_to_load(model, relations=join_paths)
+        if columns:
+            query = query.options(load_only(*columns))
+
+        return query
+
+    def _include_options(self, level: IncludeLevel):
+        """Returns the loader option that eager-loads the relationship of
+        `level` along with the levels below it.
+
+        """
+        return selectinload(level.attribute).options(*self._level_options(level))
+
+    def _level_options(self, level: IncludeLevel) -> list:
+        """Returns the loader options for the related model of `level`."""
+        options = []
+        # Included resources are pruned to their sparse fieldsets as well.
+        columns = self._columns_to_load(level.model, relations=level.relations)
+        if columns:
+            options.append(load_only(*columns))
+        options.extend(self._include_options(child) for child in level.children if not child.batched)
+        return options
+
+    def _load_included(self, instances, include, model=None):
+        """Loads the levels of the include paths in `include` that have not
+        been loaded yet, starting from the fetched `instances` of `model`,
+        which defaults to the model of this view.
+
+        These are the levels that can not be eager-loaded by the options
+        from :meth:`_selectinload_included_relationships`, or all of them
+        if `instances` were not fetched with these options. Each level is
+        loaded by :func:`batch_load` for all instances at once.
+
+        """
+        if not include or not instances:
+            return
+        for level in include_plan(model or self.model, frozenset(include)):
+            self._load_level(level, instances)
+
+    def _load_level(self, level: IncludeLevel, instances):
+        if not instances:
+            return
+        if level.batched or can_batch_load(level.attribute):
+            batch_load(self.session, instances, level.attribute, options=self._level_options(level))
+        related = set()
+        for instance in instances:
+            value = getattr(instance, level.name)
+            if is_like_list(instance, level.name):
+                related.update(value)
+            elif value is not None:
+                related.add(value)
+        for child in level.children:
+            self._load_level(child, related)
+
+    def _columns_to_load(self, model, relations=()):
+        """Returns the columns of `model` that need to be loaded to serialize
+        the sparse fieldset requested for it, or ``None`` if all columns
+        should be loaded.
+
+        """
+        try:
+            serializer = self.api_manager.serializer_for(model)
+        except KeyError:
+            return None
+        # `columns_to_load` is not a part of the base Serializer class
+        if not isinstance(serializer, DefaultSerializer):
+            return None
+        only = self.sparse_fields.get(self.api_manager.collection_name(model))
+        return serializer.columns_to_load(only, relations=relations)
+
 
 class ModelView(MethodView):
     """Base class for :class:`flask.MethodView` classes which represent a view
@@ -974,17 +1518,33 @@ class ModelView(MethodView):
         self.model = model
 
 
-class FetchView(View):
+class FetchView(EagerLoadingMixin, View):
     decorators = [catch_processing_exceptions, requires_json_api_accept, requires_json_api_mimetype, mime_renderer]
 
-    def __init__(self, session, model, api_manager, page_size=10, max_page_size=100, preprocessors=None, postprocessors=None, includes=None):
+    def __init__(self, session, model, api_manager, page_size=10, max_page_size=100, preprocessors=None, postprocessors=None, includes=None,
+                 serialize_from_rows=False, stream_unpaginated=False, linkage_limit=None, count_strategy=None,
+                 deferred_join_offset=None):
         self.session = session
         self.model = model
         self.api_manager = api_manager
         self.page_size = page_size
         self.max_page_size = max_page_size
+        self.default_count_strategy = count_strategy or ExactCount()
+        #: The strategy for counting the resources of the collection for the
+        #: current request, parsed only when a page is requested by its
+        #: number; see :func:`parse_count_strategy`.
+        self.count_strategy = self.default_count_strategy
+        self.deferred_join_offset = deferred_join_offset
+        self.serialize_from_rows = serialize_from_rows
+        self.stream_unpaginated = stream_unpaginated
+        self.max_linkage_limit = linkage_limit
+        #: The maximum number of resource identifier objects in to-many
+        #: linkage for the current request; see :func:`parse_linkage_limit`.
+        self.linkage_limit = linkage_limit
         self.preprocessors = preprocessors or []
         self.postprocessors = postprocessors or []
+        # Postprocessors expect resource objects, not their encoding.
+        self.resource_cache = None if self.postprocessors else api_manager.resource_cache
         # TODO: parse request arguments here
         self.sparse_fields = parse_sparse_fields()
         if includes:
@@ -1000,7 +1560,8 @@ class FetchView(View):
             include = set(include.split(','))
 
         try:
-            return self.get_data(*args, include=include, **kwargs)
+            self.linkage_limit = parse_linkage_limit(self.max_linkage_limit)
+            return render_response(self.get_data(*args, include=include, **kwargs), self.api_manager.json_dumps)
         except BadRequest as e:
             return error_response(e.http_code, detail=e.details)
         except Error as e:
@@ -1013,93 +1574,15 @@ class FetchView(View):
 
     def _serialize_instances(self, instances):
         # should live in API MANAGER?
-        serialized_instances = []
-        failed = []
-        for instance in instances:
-            if instance is None:
-                continue
-            model = get_model(instance)
-            serializer = self.api_manager.serializer_for(model)
-            # This may raise ValueError
-            _type = self.api_manager.collection_name(model)
-            # TODO The `only` keyword argument will be ignored when
-            # serializing relationships, so we don't really need to
-            # recompute this every time.
-            only = self.sparse_fields.get(_type)
-            try:
-                serialized = serializer.serialize(instance, only=only)
-                serialized_instances.append(serialized)
-            except SerializationException as exception:
-                failed.append(exception)
-        if failed:
-            raise MultipleExceptions(failed)
-        return serialized_instances
-
-    def _selectinload_included_relationships(
-            self,
-            query: Query,
-            include: Set[str],
-            serializer: Serializer,
-            filters=None
-    ) -> Query:
-
-        def is_safe_to_selectload(attribute):
-            # SQLAlchemy does not build correct `selectinload` queries for models that have special select join
-            try:
-                inspected_relationship = inspect(attribute)
-                if inspected_relationship.property.secondary:
-                    return False
-                if not isinstance(inspected_relationship.property.primaryjoin, BinaryExpression):
-                    return False
-            except Exception:
-                # we do not have enough information, assume it's not safe
-                return False
-
-            return True
-
-        join_paths = {path.split('.')[0] for path in include}
-
-        for path in join_paths:
-            attribute = getattr(self.model, path)
-            if not is_safe_to_selectload(attribute):
-                continue
-            if not is_proxy(attribute) and not isinstance(attribute.impl, DynamicAttributeImpl):
-                query = query.options(selectinload(attribute))
-
-        relationship_columns = serializer.relationship_columns
-
-        # `many_to_one_relationships` is not a part of the base Serializer class, so to keep backward compatibility
-        # check if we use DefaultSerializer
-        if isinstance(serializer, DefaultSerializer):
-            relationship_columns -= serializer.many_to_one_relationships
-
-        for path in relationship_columns:
-            attribute = getattr(self.model, path)
-            if not is_safe_to_selectload(attribute):
-                continue
-            if path not in join_paths and not is_proxy(attribute) and not isinstance(attribute.impl, DynamicAttributeImpl):
-                options = selectinload(attribute)
-
-                # if request contains filters we need to load all columns
-                if not filters:
-                    try:
-                        related_model = get_related_model(self.model, path)
-                        pk = self.api_manager.primary_key_for(related_model)
-                        options = options.options(load_only(getattr(related_model, pk)))
-                    except KeyError:
-                        # theoretically all models should be known to the API, and we should raise a Server Error if they are not,
-                        # but to keep backward compatibility we let it pass
-                        pass
-                query = query.options(options)
-
-        return query
+        return serialize_instances(self.api_manager, instances, self.sparse_fields, linkage_limit=self.linkage_limit,
+                                   resource_cache=self.resource_cache)
 
 
 class FetchCollection(FetchView):
     """Processes requests to fetch a resource collection."""
 
     def get_data(self, *args, include=None, **kwargs):
-        filters, sort = collection_parameters()
+        filters, sort = collection_parameters(self.api_manager.json_loads)
         for preprocessor in self.preprocessors:
             preprocessor(filters=filters, sort=sort)
         page_size = int(request.args.get(PAGE_SIZE_PARAM, self.page_size))
@@ -1112,11 +1595,34 @@ class FetchCollection(FetchView):
             raise BadRequest(details='Page number can not be negative')
         if page_size == 0 and page_number > 1:
             raise BadRequest(details='Page number can not be used with with page size 0')
+        cursor = request.args.get(PAGE_CURSOR_PARAM)
+        if cursor is not None and (page_size == 0 or PAGE_NUMBER_PARAM in request.args):
+            raise BadRequest(details='Page cursor can not be used with a page number or with page size 0')
 
         serializer = self.api_manager.serializer_for(self.model)
-        query = search(self.session, self.model, filters=filters, sort=sort)
-        query = self._selectinload_included_relationships(query, include, serializer, filters=filters)
+        query = search(self.session, self.model, filters=filters, sort=sort, iso_only=self.api_manager.iso_dates_only)
+        only = self.sparse_fields.get(self.api_manager.collection_name(self.model))
+        columns = None
+        if self.serialize_from_rows and not include and type(serializer) is DefaultSerializer:
+            columns = serializer.row_columns(only)
+        if columns is not None:
+            # Select only the columns that are going to be serialized, so no instances of the model are created
+            query = query.with_entities(*columns)
+        else:
+            query = self._selectinload_included_relationships(query, include, serializer, filters=filters)
+
+        if columns is not None:
+            def serialize(rows):
+                return [serializer.serialize_row(row, only) for row in rows]
+        else:
+            serialize = self._serialize_instances
+
+        # Postprocessors expect the whole document, so it can not be streamed if there are any.
+        if page_size == 0 and self.stream_unpaginated and not self.postprocessors:
+            return self._streamed_response(query, serialize, include=None if columns is not None else include)
 
+        page_param = PAGE_NUMBER_PARAM
+        total_key = 'total'
         if page_size == 0:
             instances = query.all()
             num_results = len(instances)
@@ -1124,20 +1630,34 @@ class FetchCollection(FetchView):
             next_ = None
             first = None
             last = None
+        elif cursor is not None:
+            try:
+                page = keyset_page(query, keyset_for(self.model, sort), cursor, page_size)
+            except InvalidCursor as exception:
+                raise BadRequest(details=str(exception))
+            # Counting all the rows would defeat the purpose of keyset pagination.
+            num_results = None
+            instances = page.items
+            page_param = PAGE_CURSOR_PARAM
+            first = ''
+            last = None
+            prev = page.prev
+            next_ = page.next_
         else:
-            num_results = count(self.session, query)
+            self.count_strategy = parse_count_strategy(self.default_count_strategy)
+            page = offset_page(self.session, query, page_number, page_size, self.count_strategy, self.deferred_join_offset)
+            instances = page.items
+            num_results = page.total.value
+            if not page.total.exact:
+                total_key = self.count_strategy.meta_key
             first = 1
-            if num_results == 0:
-                last = 1
-            else:
-                last = int(math.ceil(num_results / page_size))
-            prev = page_number - 1 if page_number > 1 else None
-            next_ = page_number + 1 if page_number < last else None
-            offset = (page_number - 1) * page_size
-            # TODO Use Query.slice() instead, since it's easier to use.
-            instances = query.limit(page_size).offset(offset).all()
-        data = self._serialize_instances(instances)
-        paginated_data = Paginated(data, page_size=page_size, num_results=num_results, next_=next_, prev=prev, first=first, last=last)
+            last = page.last
+            prev = page.prev
+            next_ = page.next_
+        self._load_included(instances, include)
+        data = serialize(instances)
+        paginated_data = Paginated(data, page_size=page_size, num_results=num_results, next_=next_, prev=prev, first=first, last=last,
+                                   page_param=page_param, total_key=total_key)
         links = {'self': self.api_manager.url_for(self.model)}
         links.update(paginated_data.pagination_links)
         link_header = ','.join(paginated_data.header_links)
@@ -1146,7 +1666,7 @@ class FetchCollection(FetchView):
             'jsonapi': {'version': JSONAPI_VERSION},
             'data': paginated_data.items,
             'links': links,
-            'meta': {'total': paginated_data.num_results}
+            'meta': paginated_data.meta
         }
 
         if include:
@@ -1158,6 +1678,54 @@ class FetchCollection(FetchView):
             postprocessor(result=result, filters=filters, sort=sort)
         return result, 200, headers
 
+    def _streamed_response(self, query, serialize, include=None):
+        """Returns a streamed response with all the resources in `query`.
+
+        The rows are fetched from the database and serialized in chunks of
+        :data:`STREAM_CHUNK_SIZE`, so at no point the whole collection is
+        held in memory. The document is written in the order ``jsonapi``,
+        ``data``, ``meta``, ``links`` and ``included``, since the total
+        number of resources and the set of included resources are only
+        known after all the primary data has been written.
+
+        `serialize` is a function that returns a list of resource objects
+        for a list of rows of `query`.
+
+        Since the response status is sent before the primary data, any
+        serialization error aborts the response instead of producing an
+        error document.
+
+        """
+        links = {'self': self.api_manager.url_for(self.model)}
+
+        def dumps(value):
+            if isinstance(value, EncodedResource):
+                return value
+            return _to_bytes(self.api_manager.json_dumps(value))
+
+        def generate():
+            yield b'{"jsonapi": %s, "data": [' % dumps({'version': JSONAPI_VERSION})
+            num_results = 0
+            to_include = set()
+            rows = iter(query.yield_per(STREAM_CHUNK_SIZE))
+            while True:
+                chunk = list(islice(rows, STREAM_CHUNK_SIZE))
+                if not chunk:
+                    break
+                if include:
+                    self._load_included(chunk, include)
+                data = b', '.join(dumps(resource) for resource in serialize(chunk))
+                yield data if num_results == 0 else b', ' + data
+                num_results += len(chunk)
+                if include:
+                    to_include.update(get_inclusions_for_instances(include, chunk))
+            yield b'], "meta": %s, "links": %s' % (dumps({'total': num_results}), dumps(links))
+            if include:
+                yield b', "included": [%s]' % b', '.join(dumps(resource) for resource in self._serialize_instances(to_include))
+            yield b'}'
+
+        return Response(stream_with_context(generate()), status=200, mimetype=CONTENT_TYPE, headers=dict(Link=''))
+
 
 class FetchResource(FetchView):
 
@@ -1181,6 +1749,7 @@ class FetchResource(FetchView):
         instance = query.first()
         if not instance:
             raise NotFound(details=f'No resource with ID {resource_id}')
+        self._load_included([instance], include)
 
         data = self._serialize_instances([instance])
         result = {
@@ -1200,7 +1769,7 @@ class FetchResource(FetchView):
         return result, 200, {}
 
 
-class APIBase(ModelView):
+class APIBase(EagerLoadingMixin, ModelView):
     """Base class for view classes that provide fetch, create, update, and
     delete functionality for resources and relationships on resources.
 
@@ -1223,8 +1792,8 @@ class APIBase(ModelView):
     def __init__(self, session, model, api_manager, preprocessors=None, postprocessors=None,
                  primary_key=None, serializer=None, deserializer=None,
                  validation_exceptions=None, includes=None, page_size=10,
-                 max_page_size=100, allow_to_many_replacement=False, *args,
-                 **kw):
+                 max_page_size=100, allow_to_many_replacement=False, linkage_limit=None,
+                 count_strategy=None, deferred_join_offset=None, *args, **kw):
         super(APIBase, self).__init__(session, model, *args, **kw)
 
         #: The name of the collection specified by the given model class
@@ -1242,6 +1811,14 @@ class APIBase(ModelView):
         #: updating a resource.
         self.allow_to_many_replacement = allow_to_many_replacement
 
+        #: The default and maximum number of resource identifier objects in
+        #: the linkage of to-many relationships, or ``None`` if unbounded.
+        self.max_linkage_limit = linkage_limit
+
+        #: The maximum number of resource identifier objects in to-many
+        #: linkage for the current request; see :func:`parse_linkage_limit`.
+        self.linkage_limit = linkage_limit
+
         #: The default page size for responses that consist of a
         #: collection of resources.
         #:
@@ -1256,6 +1833,20 @@ class APIBase(ModelView):
         #: returned.
         self.max_page_size = max_page_size
 
+        #: The strategy for counting the resources of collections, unless
+        #: the client requests a cheaper one.
+        self.default_count_strategy = count_strategy or ExactCount()
+
+        #: The strategy for counting the resources of collections for the
+        #: current request, parsed only when a page is requested by its
+        #: number; see :func:`parse_count_strategy`.
+        self.count_strategy = self.default_count_strategy
+
+        #: The offset from which pages of collections are fetched with a
+        #: deferred join, or ``None``; see
+        #: :func:`~flask_restless.pagination.fetch_page`.
+        self.deferred_join_offset = deferred_join_offset
+
         #: A custom serialization function for primary resources; see
         #: :ref:`serialization` for more information.
         #:
@@ -1305,7 +1896,8 @@ class APIBase(ModelView):
 
     def dispatch_request(self, *args, **kwargs):
         try:
-            return super().dispatch_request(*args, **kwargs)
+            self.linkage_limit = parse_linkage_limit(self.max_linkage_limit)
+            return render_response(super().dispatch_request(*args, **kwargs), self.api_manager.json_dumps)
         except Error as e:
             return error_response(e.http_code, cause=e.cause, detail=e.details)
 
@@ -1375,34 +1967,9 @@ class APIBase(ModelView):
         problem serializing one or more of the objects in `instances`.
 
         """
-        result = []
-        failed = []
-        for instance in instances:
-            if instance is None:
-                continue
-            model = get_model(instance)
-            if relationship:
-                result.append(self.api_manager.serialize_relationship(instance))
-            else:
-                # Determine the serializer for this instance. If there
-                # is no serializer, use the default serializer for the
-                # current resource, even though the current model may
-                # different from the model of the current instance.
-                serializer = self.api_manager.serializer_for(model)
-                # This may raise ValueError
-                _type = self.api_manager.collection_name(model)
-                # TODO The `only` keyword argument will be ignored when
-                # serializing relationships, so we don't really need to
-                # recompute this every time.
-                only = self.sparse_fields.get(_type)
-                try:
-                    serialized = serializer.serialize(instance, only=only)
-                    result.append(serialized)
-                except SerializationException as exception:
-                    failed.append(exception)
-        if failed:
-            raise MultipleExceptions(failed)
-        return result
+        if relationship:
+            return [self.api_manager.serialize_relationship(instance) for instance in instances if instance is not None]
+        return serialize_instances(self.api_manager, instances, self.sparse_fields, linkage_limit=self.linkage_limit)
 
     def get_all_inclusions(self, instance_or_instances):
         """Returns a list of all the requested included resources
@@ -1424,19 +1991,60 @@ class APIBase(ModelView):
         that caused it.
 
         """
+        include = self._requested_includes()
+        if not include:
+            return []
         # If `instance_or_instances` is actually just a single instance
         # of a SQLAlchemy model, get the resources to include for that
-        # one instance. Otherwise, collect the resources to include for
-        # each instance in `instances`.
+        # one instance, but do not include the instance itself.
         if isinstance(instance_or_instances, (Query, list)):
-            to_include = set(chain.from_iterable(self.resources_to_include(resource) for resource in instance_or_instances))
+            instances = [instance for instance in instance_or_instances if instance is not None]
+        elif instance_or_instances is not None:
+            instances = [instance_or_instances]
         else:
-            to_include = self.resources_to_include(instance_or_instances)
+            instances = []
+        if not instances:
+            return []
+        # Primary data may mix the models of a polymorphic hierarchy, each
+        # with its own include plan.
+        instances_by_model: Dict[type, list] = defaultdict(list)
+        for instance in instances:
+            instances_by_model[get_model(instance)].append(instance)
+        for model, group in instances_by_model.items():
+            self._load_included(group, include, model=model)
+        # The included resources are loaded now, so this only walks the
+        # relationships of each instance.
+        to_include = set(chain.from_iterable(self.resources_to_include(instance) for instance in instances))
+        if not isinstance(instance_or_instances, (Query, list)):
+            to_include.discard(instance_or_instances)
         # This may raise MultipleExceptions if there are problems
         # serializing the included resources.
         return self._serialize_many(to_include)
 
-    def _paginated(self, items, filters=None, sort=None):
+    def _eager_load(self, query, model, filters=None):
+        """Returns `query`, which selects instances of `model`, with the
+        loader options from :meth:`_selectinload_included_relationships`
+        for the requested includes.
+
+        """
+        try:
+            serializer = self.api_manager.serializer_for(model)
+        except KeyError:
+            return query
+        return self._selectinload_included_relationships(query, self._requested_includes(), serializer, filters=filters, model=model)
+
+    def _requested_includes(self) -> FrozenSet[str]:
+        """Returns the relationship paths of the resources to include in a
+        compound document, given by the ``include`` query parameter or the
+        default includes specified in the constructor of this class.
+
+        """
+        include = request.args.get('include')
+        if include is None:
+            return self.default_includes or frozenset()
+        return frozenset(include.split(','))
+
+    def _paginated(self, items, filters=None, sort=None, serialize=None, model=None):
         """Returns a :class:`Paginated` object representing the
         correctly paginated list of resources to return to the client,
         based on the current request.
@@ -1449,9 +2057,16 @@ class APIBase(ModelView):
         extracted from the client's request (as by
         :meth:`_collection_parameters`) and applied to the query.
 
-        If `relationship` is ``True``, the resources in the query object
-        will be serialized as linkage objects instead of resources
-        objects.
+        If :meth:`use_resource_identifiers` returns ``True``, the
+        resources in the query object will be serialized as linkage
+        objects instead of resources objects. If `serialize` is not
+        ``None``, it is a function that serializes a list of items of the
+        query instead.
+
+        If the client requests a page by its cursor, the page is selected
+        by the sort keys of instances of `model` instead of by its number
+        (see :mod:`flask_restless.pagination`), and the total number of
+        items is not counted.
 
         This method serializes the (correct page of) resources. As such,
         it raises an instance of :exc:`MultipleExceptions` if there is a
@@ -1469,14 +2084,27 @@ class APIBase(ModelView):
             msg = msg.format(self.max_page_size)
             raise PaginationError(msg)
         is_relationship = self.use_resource_identifiers()
+        if serialize is None:
+            serialize = partial(self._serialize_many, relationship=is_relationship)
         # If the page size is 0, just return everything.
         if page_size == 0:
             raw_items = items.all()
-            result = self._serialize_many(raw_items, relationship=is_relationship)
+            result = serialize(raw_items)
             # Use `len()` here instead of doing `count(self.session,
             # items)` because the former should be faster.
             num_results = len(result)
             return Paginated(result, page_size=page_size, num_results=num_results, raw_items=raw_items)
+        cursor = request.args.get(PAGE_CURSOR_PARAM)
+        if cursor is not None:
+            if model is None or PAGE_NUMBER_PARAM in request.args:
+                raise PaginationError('Page cursor can not be used with a page number')
+            try:
+                page = keyset_page(items, keyset_for(model, sort), cursor, page_size)
+            except InvalidCursor as exception:
+                raise PaginationError(str(exception))
+            raw_items = page.items
+            return Paginated(serialize(raw_items), first='', prev=page.prev, next_=page.next_, page_size=page_size,
+                             filters=filters, sort=sort, raw_items=raw_items, page_param=PAGE_CURSOR_PARAM)
         # Determine the client's page number request. Raise an exception
         # if the page number is out of bounds.
         page_number = int(request.args.get(PAGE_NUMBER_PARAM, 1))
@@ -1488,7 +2116,9 @@ class APIBase(ModelView):
         # If the query is really a Flask-SQLAlchemy query, we can use
         # its built-in pagination. Otherwise, we need to manually
         # compute the page numbers, the number of results, etc.
-        if hasattr(items, 'paginate'):
+        self.count_strategy = parse_count_strategy(self.default_count_strategy)
+        total_key = 'total'
+        if hasattr(items, 'paginate') and type(self.count_strategy) is ExactCount and self.deferred_join_offset is None:
             pagination = items.paginate(page=page_number, per_page=page_size, error_out=False)
             num_results = pagination.total
             first = 1
@@ -1497,33 +2127,26 @@ class APIBase(ModelView):
             next_ = pagination.next_num
             items = pagination.items
         else:
-            num_results = count(self.session, items)
+            page = offset_page(self.session, items, page_number, page_size, self.count_strategy, self.deferred_join_offset)
+            num_results = page.total.value
+            if not page.total.exact:
+                total_key = self.count_strategy.meta_key
             first = 1
-            # Handle a special case for an empty collection of items.
-            #
-            # There will be no division-by-zero error here because we
-            # have already checked that page size is not equal to zero
-            # above.
-            if num_results == 0:
-                last = 1
-            else:
-                last = int(math.ceil(num_results / page_size))
-            prev = page_number - 1 if page_number > 1 else None
-            next_ = page_number + 1 if page_number < last else None
-            offset = (page_number - 1) * page_size
-            # TODO Use Query.slice() instead, since it's easier to use.
-            items = items.limit(page_size).offset(offset)
+            last = page.last
+            prev = page.prev
+            next_ = page.next_
+            items = page.items
         # Serialize the found items. This may raise an exception if
         # there is a problem serializing any of the objects.
         raw_items = items
-        result = self._serialize_many(items, relationship=is_relationship)
+        result = serialize(items)
         # Wrap the list of results in a Paginated object, which
         # represents the result set and stores some extra information
         # about how it was determined.
         return Paginated(result, num_results=num_results, first=first,
                          last=last, next_=next_, prev=prev,
                          page_size=page_size, filters=filters, sort=sort,
-                         raw_items=raw_items)
+                         raw_items=raw_items, total_key=total_key)
 
     def _get_resource_helper(self, resource, primary_resource=None,
                              relation_name=None, related_resource=False):
@@ -1598,22 +2221,45 @@ class APIBase(ModelView):
         query = session_query(self.session, related_model)
 
         # Filter by only those related values that are related to `instance`.
-        relationship = getattr(resource, relation_name)
-        primary_keys = {self.api_manager.primary_key_value(inst) for inst in relationship}
-        # If the relationship is empty, we can avoid a potentially expensive
-        # filtering operation by simply returning an intentionally empty
-        # query.
-        if not primary_keys:
-            query = query.filter(FALSE())
+        attribute = getattr(model, relation_name)
+        if not is_proxy(attribute):
+            # The criterion of the relationship itself, so that only the
+            # requested page of related instances is loaded.
+            query = query.filter(with_parent(resource, attribute))
         else:
-            query = query.filter(self.api_manager.primary_key_value(related_model).in_(primary_keys))
+            # An association proxy can not be queried from the parent.
+            primary_keys = {self.api_manager.primary_key_value(inst) for inst in getattr(resource, relation_name)}
+            # If the relationship is empty, we can avoid a potentially expensive
+            # filtering operation by simply returning an intentionally empty
+            # query.
+            if not primary_keys:
+                query = query.filter(FALSE())
+            else:
+                query = query.filter(self.api_manager.primary_key_value(related_model).in_(primary_keys))
 
-        search_ = partial(search, self.session, related_model, _initial_query=query)
+        search_ = partial(search, self.session, related_model, _initial_query=query, iso_only=self.api_manager.iso_dates_only)
         try:
             search_items = search_(filters=filters, sort=sort)
         except ComparisonToNull as exception:
             detail = str(exception)
             return error_response(400, cause=exception, detail=detail)
+        serialize = None
+        if not self.use_resource_identifiers():
+            search_items = self._eager_load(search_items, related_model, filters=filters)
+        elif not is_proxy(attribute) and inspect(related_model).polymorphic_on is None:
+            # Only the IDs of the related resources are needed, so select
+            # them alone, from the association table if possible.
+            related_id = getattr(related_model, self.api_manager.primary_key_for(related_model))
+            linkage_query = None
+            # The association table alone cannot be sorted by the keys of
+            # the related model, nor restricted by a custom query of it.
+            if not filters and not sort and PAGE_CURSOR_PARAM not in request.args \
+                    and is_unrestricted_query(self.session, related_model):
+                linkage_query = association_linkage_query(self.session, resource, attribute, related_id)
+            if linkage_query is None:
+                linkage_query = search_items.with_entities(related_id)
+            search_items = linkage_query
+            serialize = partial(resource_identifiers, self.api_manager.collection_name(related_model))
 
         # Prepare the dictionary that will contain the JSON API response.
         result = {
@@ -1628,7 +2274,7 @@ class APIBase(ModelView):
         # If the result of the search is a SQLAlchemy query object, we need to
         # return a collection.
         try:
-            paginated = self._paginated(search_items, filters=filters, sort=sort)
+            paginated = self._paginated(search_items, filters=filters, sort=sort, serialize=serialize, model=related_model)
         except MultipleExceptions as e:
             return errors_from_serialization_exceptions(e.exceptions)
         except PaginationError as exception:
@@ -1642,7 +2288,7 @@ class APIBase(ModelView):
         link_header = ','.join(paginated.header_links)
         headers = dict(Link=link_header)
         # Add the metadata to the JSON API response object.
-        meta['total'] = paginated.num_results
+        meta.update(paginated.meta)
         result['meta'] = meta
 
         # Determine the resources to include (in a compound document).
@@ -1683,15 +2329,5 @@ class APIBase(ModelView):
         .. _Inclusion of Related Resources: https://jsonapi.org/format/#fetching-includes
 
         """
-        # Add any links requested to be included by URL parameters.
-        #
-        # We expect `toinclude` to be a comma-separated list of relationship
-        # paths.
-        toinclude = request.args.get('include')
-        if toinclude is None and self.default_includes is None:
-            return {}
-        elif toinclude is None and self.default_includes is not None:
-            toinclude = self.default_includes
-        else:
-            toinclude = set(toinclude.split(','))
+        toinclude = self._requested_includes()
         return set(chain.from_iterable(resources_from_path(instance, path) for path in toinclude))
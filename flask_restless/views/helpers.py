@@ -11,7 +11,6 @@
 # information, see LICENSE.AGPL and LICENSE.BSD.
 """Helper functions for view classes."""
 from sqlalchemy.inspection import inspect as sqlalchemy_inspect
-from sqlalchemy.sql import func
 
 
 def upper_keys(dictionary):
@@ -22,24 +21,6 @@ def upper_keys(dictionary):
     return {k.upper(): v for k, v in dictionary.items()}
 
 
-def count(session, query):
-    """Returns the count of the specified `query`.
-
-    This function employs an optimization that bypasses the
-    :meth:`sqlalchemy.orm.Query.count` method, which can be very slow
-    for large queries.
-
-    """
-    # There is no straightforward way to find if SQLAlchemy Statement class has limit set
-    if ' LIMIT ' in str(query.statement):
-        return query.order_by(None).count()
-    counts = query.selectable.with_only_columns(func.count(query.selectable.selected_columns[0]))
-    num_results = session.execute(counts.order_by(None)).scalar()
-    if num_results is None:
-        return query.order_by(None).count()
-    return num_results
-
-
 def changes_on_update(model):
     """Returns a best guess at whether the specified SQLAlchemy model class is
     modified on updates.
@@ -16,15 +16,25 @@ The main class in this module, :class:`RelationshipAPI`, is a
 relationships according to the JSON API specification.
 
 """
-from flask import json
+from typing import Any
+from typing import Optional
+from typing import Set
+
 from flask import request
 from markupsafe import escape
+from sqlalchemy import inspect
+from sqlalchemy.orm import RelationshipProperty
 from werkzeug.exceptions import BadRequest
 
+from ..helpers import MAX_IN_VALUES
 from ..helpers import get_by
+from ..helpers import get_by_many
 from ..helpers import get_related_model
 from ..helpers import is_like_list
 from .base import APIBase
+from .base import AssociationColumns
+from .base import association_columns
+from .base import association_key
 from .base import collection_parameters
 from .base import error
 from .base import error_response
@@ -63,6 +73,98 @@ class RelationshipAPI(APIBase):
     def use_resource_identifiers(self):
         return True
 
+    def _association_columns(self, relation_name) -> Optional[AssociationColumns]:
+        """Returns the columns of the association table of the relationship
+        named `relation_name`, if resources can be added to and removed
+        from it by inserting and deleting rows of that table directly, or
+        ``None`` otherwise.
+
+        That is not possible if either side of the relationship has a
+        validator, since it would not be called.
+
+        """
+        attribute = getattr(self.model, relation_name)
+        relationship = getattr(attribute, 'property', None)
+        if not isinstance(relationship, RelationshipProperty) or relationship.viewonly:
+            return None
+        columns = association_columns(attribute)
+        if columns is None:
+            return None
+        related_mapper = relationship.mapper
+        if related_mapper.polymorphic_on is not None or columns.target_column not in related_mapper.columns.values():
+            return None
+        if relation_name in inspect(self.model).validators:
+            return None
+        if any(reverse.secondary is columns.table and reverse.key in related_mapper.validators for reverse in related_mapper.relationships):
+            return None
+        return columns
+
+    def _related_keys(self, columns: AssociationColumns, instances) -> Set[Any]:
+        """Returns the values that identify the related `instances` in the
+        association table.
+
+        """
+        if not instances:
+            return set()
+        key = inspect(instances[0]).mapper.get_property_by_column(columns.target_column).key
+        return {getattr(instance, key) for instance in instances}
+
+    def _add_associations(self, instance, relation_name, columns: AssociationColumns, related_instances):
+        """Adds `related_instances` to the relationship named `relation_name`
+        of `instance` by inserting the missing rows of the association
+        table, without loading the relationship.
+
+        """
+        key = association_key(instance, columns)
+        ids = list(self._related_keys(columns, related_instances))
+        existing: Set[Any] = set()
+        for start in range(0, len(ids), MAX_IN_VALUES):
+            query = self.session.query(columns.id_column).filter(columns.parent_key_column == key)
+            query = query.filter(columns.id_column.in_(ids[start:start + MAX_IN_VALUES]))
+            existing.update(id_ for id_, in query)
+        rows = [{columns.parent_key_column.key: key, columns.id_column.key: id_} for id_ in ids if id_ not in existing]
+        if rows:
+            self.session.execute(columns.table.insert(), rows)
+        self._expire_associations(instance, relation_name, columns, related_instances)
+
+    def _delete_associations(self, instance, relation_name, columns: AssociationColumns, related_instances) -> int:
+        """Removes `related_instances` from the relationship named
+        `relation_name` of `instance` by deleting the rows of the
+        association table, without loading the relationship.
+
+        Returns the number of deleted rows.
+
+        """
+        key = association_key(instance, columns)
+        ids = list(self._related_keys(columns, related_instances))
+        num_deleted = 0
+        for start in range(0, len(ids), MAX_IN_VALUES):
+            statement = columns.table.delete().where(columns.parent_key_column == key)
+            statement = statement.where(columns.id_column.in_(ids[start:start + MAX_IN_VALUES]))
+            num_deleted += self.session.execute(statement).rowcount
+        self._expire_associations(instance, relation_name, columns, related_instances)
+        return num_deleted
+
+    def _expire_associations(self, instance, relation_name, columns: AssociationColumns, related_instances):
+        # The collections on both sides of the relationship may have been loaded before the table was changed.
+        self.session.expire(instance, [relation_name])
+        related_mapper = getattr(self.model, relation_name).property.mapper
+        reverse = [relationship.key for relationship in related_mapper.relationships if relationship.secondary is columns.table]
+        if reverse:
+            for related_instance in related_instances:
+                self.session.expire(related_instance, reverse)
+
+    def _invalidate_cache(self, instance):
+        """Drops the cached resource objects that may include the linkage
+        of the association rows changed for `instance`, since the session
+        does not know about them.
+
+        """
+        cache = self.api_manager.resource_cache
+        if cache is not None:
+            mapper = inspect(instance).mapper
+            cache.invalidate(mapper.class_, tuple(mapper.primary_key_from_instance(instance)))
+
     def get(self, resource_id, relation_name):
         """Fetches a to-one or to-many relationship from a resource.
 
@@ -92,7 +194,7 @@ class RelationshipAPI(APIBase):
         if primary_resource is None:
             return error_response(404, detail=f'No resource with ID {escape(resource_id)}')
         if is_like_list(primary_resource, relation_name):
-            filters, sort = collection_parameters()
+            filters, sort = collection_parameters(self.api_manager.json_loads)
             return self._get_collection_helper(resource=primary_resource,
                                                relation_name=relation_name,
                                                filters=filters, sort=sort)
@@ -110,7 +212,7 @@ class RelationshipAPI(APIBase):
         """
         # try to load the fields/values to update from the body of the request
         try:
-            data = json.loads(request.get_data()) or {}
+            data = self.api_manager.json_loads(request.get_data()) or {}
         except (BadRequest, TypeError, ValueError, OverflowError) as exception:
             # this also happens when request.data is empty
             detail = 'Unable to decode data'
@@ -127,34 +229,42 @@ class RelationshipAPI(APIBase):
         if instance is None:
             return error_response(404, detail=f'No instance with ID {escape(resource_id)} in model {self.model}')
         # If no such relation exists, return a 404.
-        if not hasattr(instance, relation_name):
+        if not hasattr(self.model, relation_name):
             return error_response(404, detail=f'Model {self.model} has no relation named {escape(relation_name)}')
         related_model = get_related_model(self.model, relation_name)
-        related_value = getattr(instance, relation_name)
         # Unwrap the data from the request.
         data = data.pop('data', {})
+        # The type name must match the collection name of model of the
+        # relation.
+        collection_name = self.api_manager.collection_name(related_model)
         for rel in data:
             if 'type' not in rel:
                 return error_response(400, detail='Must specify correct data type')
             if 'id' not in rel:
                 return error_response(400, detail='Must specify resource ID')
             type_ = rel['type']
-            # The type name must match the collection name of model of the
-            # relation.
-            collection_name = self.api_manager.collection_name(related_model)
             if type_ != collection_name:
                 return error_response(409, detail=f'Type must be {collection_name}, not {type_}')
-            # Get the new objects to add to the relation.
-            new_value = get_by(self.session, related_model, rel['id'], self.api_manager.primary_key_for(related_model))
-            if new_value is None:
-                return error_response(404, detail=f'No object of type {escape(type_)} found with ID {rel["id"]}')
+        # Get the new objects to add to the relation.
+        found = get_by_many(self.session, related_model, [rel['id'] for rel in data], self.api_manager.primary_key_for(related_model))
+        for rel in data:
+            if rel['id'] not in found:
+                return error_response(404, detail=f'No object of type {escape(rel["type"])} found with ID {rel["id"]}')
+        new_values = list(dict.fromkeys(found[rel['id']] for rel in data))
+        columns = self._association_columns(relation_name)
+        if columns is not None:
+            self._add_associations(instance, relation_name, columns, new_values)
+        else:
+            related_value = getattr(instance, relation_name)
             # Don't append a new value if it already exists in the to-many
             # relationship.
-            if new_value not in related_value:
-                try:
-                    related_value.append(new_value)
-                except self.validation_exceptions as exception:
-                    return self._handle_validation_exception(exception)
+            existing = set(related_value)
+            for new_value in new_values:
+                if new_value not in existing:
+                    try:
+                        related_value.append(new_value)
+                    except self.validation_exceptions as exception:
+                        return self._handle_validation_exception(exception)
 
         self.session.flush()
 
@@ -162,6 +272,8 @@ class RelationshipAPI(APIBase):
         for postprocessor in self.postprocessors['POST_RELATIONSHIP']:
             postprocessor()
         self.session.commit()
+        if columns is not None:
+            self._invalidate_cache(instance)
         return {}, 204, {}
 
     def patch(self, resource_id, relation_name):
@@ -178,7 +290,7 @@ class RelationshipAPI(APIBase):
         """
         # try to load the fields/values to update from the body of the request
         try:
-            data = json.loads(request.get_data()) or {}
+            data = self.api_manager.json_loads(request.get_data()) or {}
         except (BadRequest, TypeError, ValueError, OverflowError) as exception:
             # this also happens when request.data is empty
             detail = 'Unable to decode data'
@@ -219,7 +331,6 @@ class RelationshipAPI(APIBase):
                 if not self.allow_to_many_replacement:
                     detail = 'Not allowed to replace a to-many relationship'
                     return error_response(403, detail=detail)
-                replacement = []
                 for rel in data:
                     if 'type' not in rel:
                         return error_response(400, detail='Must specify correct data type')
@@ -232,8 +343,8 @@ class RelationshipAPI(APIBase):
                     if type_ != collection_name:
                         return error_response(409, detail=f'Type must be {collection_name}, not {type_}')
                     id_ = rel['id']
-                    obj = get_by(self.session, related_model, id_, self.api_manager.primary_key_for(related_model))
-                    replacement.append(obj)
+                found = get_by_many(self.session, related_model, [rel['id'] for rel in data], self.api_manager.primary_key_for(related_model))
+                replacement = [found.get(rel['id']) for rel in data]
             # Otherwise, we assume the client is trying to set a to-one
             # relationship.
             else:
@@ -288,11 +399,10 @@ class RelationshipAPI(APIBase):
             return error_response(403, detail=detail)
         # try to load the fields/values to update from the body of the request
         try:
-            data = json.loads(request.get_data()) or {}
+            data = self.api_manager.json_loads(request.get_data()) or {}
         except (BadRequest, TypeError, ValueError, OverflowError) as exception:
             # this also happens when request.data is empty
             return error_response(400, cause=exception, detail='Unable to decode data')
-        was_deleted = False
         for preprocessor in self.preprocessors['DELETE_RELATIONSHIP']:
             temp_result = preprocessor(instance_id=resource_id,
                                        relation_name=relation_name)
@@ -302,15 +412,12 @@ class RelationshipAPI(APIBase):
         instance = get_by(self.session, self.model, resource_id,
                           self.primary_key)
         # If no such relation exists, return an error to the client.
-        if not hasattr(instance, relation_name):
+        if instance is None or not hasattr(self.model, relation_name):
             return error_response(404, detail=f'No such link: {escape(relation_name)}')
         # We assume that the relation is a to-many relation.
         related_model = get_related_model(self.model, relation_name)
         related_type = self.api_manager.collection_name(related_model)
-        relation = getattr(instance, relation_name)
         data = data.pop('data')
-        not_found = []
-        to_remove = []
         for rel in data:
             if 'type' not in rel:
                 detail = 'Must specify correct data type'
@@ -323,30 +430,42 @@ class RelationshipAPI(APIBase):
             if type_ != related_type:
                 detail = f'Conflicting type: expected {related_type} but got type {escape(type_)} for linkage object with ID {escape(id_)}'
                 return error_response(409, detail=detail)
-            resource = get_by(self.session, related_model, id_, self.api_manager.primary_key_for(related_model))
-            if resource is None:
-                not_found.append((type_, id_))
-            else:
-                to_remove.append(resource)
+        found = get_by_many(self.session, related_model, [rel['id'] for rel in data], self.api_manager.primary_key_for(related_model))
+        not_found = [(rel['type'], rel['id']) for rel in data if rel['id'] not in found]
         if not_found:
             detail = 'No resource of type {0} and ID {1} found'
             errors = [error(detail=detail.format(escape(t), escape(i))) for t, i in not_found]
             return errors_response(404, errors)
-        # Remove each of the resources from the relation (if they are not
-        # already absent).
-        for resource in to_remove:
-            try:
-                relation.remove(resource)
-            except ValueError:
-                # The JSON API specification requires that we silently
-                # ignore requests to delete resources that are already
-                # missing from a to-many relation.
-                pass
-        was_deleted = len(self.session.dirty) > 0
+        to_remove = list(dict.fromkeys(found[rel['id']] for rel in data))
+        columns = self._association_columns(relation_name)
+        if columns is not None:
+            num_removed = self._delete_associations(instance, relation_name, columns, to_remove)
+        else:
+            relation = getattr(instance, relation_name)
+            if isinstance(relation, list):
+                remove = set(to_remove)
+                remaining = [resource for resource in relation if resource not in remove]
+                num_removed = len(relation) - len(remaining)
+                if num_removed:
+                    setattr(instance, relation_name, remaining)
+            else:
+                num_removed = 0
+                for resource in to_remove:
+                    try:
+                        relation.remove(resource)
+                        num_removed += 1
+                    except (KeyError, ValueError):
+                        pass
         self.session.commit()
+        if columns is not None:
+            self._invalidate_cache(instance)
+        # Postprocessors are told whether any resource was actually removed.
         for postprocessor in self.postprocessors['DELETE_RELATIONSHIP']:
-            postprocessor(was_deleted=was_deleted)
-        if not was_deleted:
+            postprocessor(was_deleted=num_removed > 0)
+        # The JSON API specification requires that we silently ignore
+        # requests to delete resources that are already missing from a
+        # to-many relation, so the request only fails if it is empty.
+        if not to_remove:
             detail = 'There was no instance to delete'
             return error_response(404, detail=detail)
         return {}, 204, {}
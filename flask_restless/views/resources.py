@@ -16,19 +16,23 @@ The main class in this module, :class:`API`, is a
 SQLAlchemy models compatible with the JSON API specification.
 
 """
-from flask import json
 from flask import request
 from markupsafe import escape
+from sqlalchemy.orm import with_parent
 from werkzeug.exceptions import BadRequest
 
+from ..helpers import coerce_fields
+from ..helpers import field_plan
 from ..helpers import get_by
+from ..helpers import get_by_many
 from ..helpers import get_related_model
-from ..helpers import has_field
 from ..helpers import is_like_list
-from ..helpers import strings_to_datetimes
+from ..helpers import is_proxy
+from ..helpers import query_by_primary_key
 from ..serialization import ClientGeneratedIDNotAllowed
 from ..serialization import ConflictingType
 from ..serialization import DeserializationException
+from ..serialization import RelatedResourcesNotFound
 from ..serialization import SerializationException
 from .base import JSONAPI_VERSION
 from .base import APIBase
@@ -139,16 +143,24 @@ class API(APIBase):
         # Return an error if the relation is a to-one relation.
         if not is_like_list(primary_resource, relation_name):
             return error_response(404, detail='Cannot access a related resource by ID from a to-one relation')
-        # Get the related resources.
-        resources = getattr(primary_resource, relation_name)
-        # Check if one of the related resources has the specified ID. (JSON API
-        # expects all IDs to be strings.)
-        primary_keys = (self.api_manager.primary_key_value(resource, as_string=True)
-                        for resource in resources)
-        if not any(k == str(related_resource_id) for k in primary_keys):
-            return error_response(404, detail=f'No related resource with ID {escape(related_resource_id)}')
-        # Get the related resource by its ID.
-        resource = get_by(self.session, related_model, related_resource_id, self.api_manager.primary_key_for(related_model))
+        attribute = getattr(self.model, relation_name)
+        if is_proxy(attribute):
+            # An association proxy can not be queried from the parent, so
+            # check if one of the related resources has the specified ID.
+            # (JSON API expects all IDs to be strings.)
+            primary_keys = (self.api_manager.primary_key_value(resource, as_string=True)
+                            for resource in getattr(primary_resource, relation_name))
+            if not any(k == str(related_resource_id) for k in primary_keys):
+                return error_response(404, detail=f'No related resource with ID {escape(related_resource_id)}')
+            resource = get_by(self.session, related_model, related_resource_id, self.api_manager.primary_key_for(related_model))
+        else:
+            # Get the related resource by its ID, if it is related to the
+            # primary resource, with a single query.
+            query = query_by_primary_key(self.session, related_model, related_resource_id, self.api_manager.primary_key_for(related_model))
+            query = query.filter(with_parent(primary_resource, attribute))
+            resource = self._eager_load(query, related_model).first()
+            if resource is None:
+                return error_response(404, detail=f'No related resource with ID {escape(related_resource_id)}')
         return self._get_resource_helper(resource,
                                          primary_resource=primary_resource,
                                          relation_name=relation_name,
@@ -174,7 +186,7 @@ class API(APIBase):
             GET /<collection_name>/<resource_id>/<relation_name>
 
         """
-        filters, sort = collection_parameters()
+        filters, sort = collection_parameters(self.api_manager.json_loads)
 
         for preprocessor in self.preprocessors['GET_RELATION']:
             temp_result = preprocessor(resource_id=resource_id,
@@ -273,7 +285,7 @@ class API(APIBase):
         """
         # try to read the parameters for the model from the body of the request
         try:
-            data = json.loads(request.get_data()) or {}
+            data = self.api_manager.json_loads(request.get_data()) or {}
         except (BadRequest, TypeError, ValueError, OverflowError) as exception:
             detail = 'Unable to decode data'
             return error_response(400, cause=exception, detail=detail)
@@ -293,6 +305,9 @@ class API(APIBase):
         except ConflictingType as exception:
             detail = exception.message()
             return error_response(409, cause=exception, detail=detail)
+        except RelatedResourcesNotFound as exception:
+            errors = [error(detail=f'No object of type {escape(exception.type_name)} found with ID {escape(id_)}') for id_ in exception.ids]
+            return errors_response(404, errors)
         except DeserializationException as exception:
             detail = exception.message()
             return error_response(400, cause=exception, detail=detail)
@@ -350,6 +365,7 @@ class API(APIBase):
         .. _Updating Resources: http://jsonapi.org/format/#crud-updating
 
         """
+        plan = field_plan(self.model)
         # Update any relationships.
         links = data.pop('relationships', {})
         for link_name, link in links.items():
@@ -361,7 +377,7 @@ class API(APIBase):
             if 'data' not in link:
                 return error_response(400, detail=f'relationship "{escape(link_name)}" is missing resource linkage')
             linkage = link['data']
-            related_model = get_related_model(self.model, link_name)
+            related_model = plan.relations.get(link_name)
             # If this is a to-many relationship, get all the related
             # resources.
             if is_like_list(instance, link_name):
@@ -375,26 +391,22 @@ class API(APIBase):
                     detail = (f'"data" element for the to-many relationship "{escape(link_name)}" on the instance of "{self.collection_name}"'
                               f' with ID "{escape(resource_id)}" must be a list; maybe you intended to provide an empty list?')
                     return error_response(400, detail=detail)
-                # If this is left empty, the relationship will be zeroed.
-                new_value = []
-                not_found = []
+                expected_type = self.api_manager.collection_name(related_model)
                 for rel in linkage:
-                    expected_type = self.api_manager.collection_name(related_model)
                     type_ = rel['type']
                     if type_ != expected_type:
                         return error_response(409, detail=f'Type must be {expected_type}, not {escape(type_)}')
-                    id_ = rel['id']
-                    inst = get_by(self.session, related_model, id_, self.api_manager.primary_key_for(related_model))
-                    if inst is None:
-                        not_found.append((id_, type_))
-                    else:
-                        new_value.append(inst)
+                # If this is empty, the relationship will be zeroed.
+                ids = [rel['id'] for rel in linkage]
+                found = get_by_many(self.session, related_model, ids, self.api_manager.primary_key_for(related_model))
                 # If any of the requested to-many linkage objects do not exist,
                 # return an error response.
+                not_found = [id_ for id_ in ids if id_ not in found]
                 if not_found:
-                    errors = [error(detail=f'No object of type {escape(t)} found with ID {escape(i)}')
-                              for i, t in not_found]
+                    errors = [error(detail=f'No object of type {escape(expected_type)} found with ID {escape(i)}')
+                              for i in not_found]
                     return errors_response(404, errors)
+                new_value = [found[id_] for id_ in ids]
             # Otherwise, it is a to-one relationship, so just get the single
             # related resource.
             else:
@@ -429,11 +441,14 @@ class API(APIBase):
         # Check for any request parameter naming a column which does not exist
         # on the current model.
         for field in data:
-            if not has_field(self.model, field):
+            if field not in plan.fields:
                 return error_response(400, detail=f"Model does not have field '{escape(field)}'")
         # Special case: if there are any dates, convert the string form of the
         # date into an instance of the Python ``datetime`` object.
-        data = strings_to_datetimes(self.model, data)
+        try:
+            data = coerce_fields(plan, data, iso_only=self.api_manager.iso_dates_only)
+        except ValueError as exception:
+            return error_response(400, cause=exception, detail=f'Invalid date or time: {escape(str(exception))}')
         # Finally, update each attribute individually.
         try:
             if data:
@@ -453,7 +468,7 @@ class API(APIBase):
         """
         # try to load the fields/values to update from the body of the request
         try:
-            data = json.loads(request.get_data()) or {}
+            data = self.api_manager.json_loads(request.get_data()) or {}
         except (BadRequest, TypeError, ValueError, OverflowError) as exception:
             # this also happens when request.data is empty
             detail = 'Unable to decode data'
@@ -0,0 +1,146 @@
+# test_cache.py - unit tests for the resource cache
+#
+# This file is part of Flask-Restless.
+#
+# Flask-Restless is distributed under both the GNU Affero General Public
+# License version 3 and under the 3-clause BSD license. For more
+# information, see LICENSE.AGPL and LICENSE.BSD.
+"""Unit tests for the :mod:`flask_restless.cache` module."""
+from sqlalchemy import Column
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import Unicode
+from sqlalchemy.orm import relationship
+
+from flask_restless import APIManager
+from flask_restless import ResourceCache
+from flask_restless.serialization import DefaultSerializer
+
+from .helpers import SQLAlchemyTestBase
+
+
+class TestResourceCache(SQLAlchemyTestBase):
+    """Tests for fetching resources through a
+    :class:`~flask_restless.ResourceCache`.
+
+    """
+
+    def setUp(self):
+        super(TestResourceCache, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            name = Column(Unicode)
+            articles = relationship('Article', backref='author')
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            title = Column(Unicode)
+            author_id = Column(Integer, ForeignKey('person.id'))
+
+        serialized = self.serialized = []
+
+        class CountingSerializer(DefaultSerializer):
+
+            def serialize(self, instance, only=None):
+                serialized.append(instance)
+                return super().serialize(instance, only=only)
+
+        self.Article = Article
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+        self.cache = ResourceCache()
+        self.manager = APIManager(self.flaskapp, session=self.session, resource_cache=self.cache)
+        self.manager.create_api(Person, methods=['GET', 'PATCH'], serializer=CountingSerializer(Person, 'person', self.manager, primary_key='id'))
+        self.manager.create_api(Article, serializer=CountingSerializer(Article, 'article', self.manager, primary_key='id'))
+
+    def test_cached_collection(self):
+        """Tests that resources are serialized once and responses are
+        the same as without the cache.
+
+        """
+        self.session.add_all([self.Person(id=1, name='foo'), self.Person(id=2, name='bar')])
+        self.session.commit()
+        first = self.app.get('/api/person')
+        second = self.app.get('/api/person')
+        assert first.json == second.json
+        assert [person['attributes']['name'] for person in second.json['data']] == ['foo', 'bar']
+        assert second.json['meta'] == {'total': 2}
+        assert len(self.serialized) == 2
+        assert len(self.cache) == 2
+
+    def test_cached_resource_and_included(self):
+        """Tests that a single resource and the included resources are
+        served from the cache.
+
+        """
+        self.session.add_all([self.Person(id=1, name='foo'), self.Article(id=1, author_id=1)])
+        self.session.commit()
+        self.app.get('/api/article/1', query_string={'include': 'author'})
+        response = self.app.get('/api/article/1', query_string={'include': 'author'})
+        document = response.json
+        assert document['data']['id'] == '1'
+        assert document['included'][0]['attributes']['name'] == 'foo'
+        assert len(self.serialized) == 2
+
+    def test_sparse_fieldsets(self):
+        """Tests that each sparse fieldset is cached separately."""
+        self.session.add(self.Person(id=1, name='foo'))
+        self.session.commit()
+        self.app.get('/api/person/1')
+        response = self.app.get('/api/person/1', query_string={'fields[person]': 'name'})
+        assert response.json['data'] == {'id': '1', 'type': 'person', 'attributes': {'name': 'foo'}}
+        assert len(self.serialized) == 2
+
+    def test_invalidate_on_commit(self):
+        """Tests that updated instances are serialized again."""
+        self.session.add(self.Person(id=1, name='foo'))
+        self.session.commit()
+        self.app.get('/api/person/1')
+        data = {'data': {'type': 'person', 'id': '1', 'attributes': {'name': 'bar'}}}
+        response = self.app.patch('/api/person/1', json=data)
+        assert response.status_code == 204
+        response = self.app.get('/api/person/1')
+        assert response.json['data']['attributes']['name'] == 'bar'
+
+    def test_invalidate_to_many_linkage(self):
+        """Tests that resources whose to-many relationship may have changed
+        are serialized again.
+
+        """
+        self.session.add(self.Person(id=1))
+        self.session.commit()
+        self.app.get('/api/person/1')
+        self.session.add(self.Article(id=1, author_id=1))
+        self.session.commit()
+        response = self.app.get('/api/person/1')
+        assert response.json['data']['relationships']['articles']['data'] == [{'id': '1', 'type': 'article'}]
+
+    def test_postprocessors(self):
+        """Tests that the cache is not used if there are postprocessors,
+        since they expect resource objects.
+
+        """
+        def add_name(result, **__):
+            result['data']['attributes']['name'] += '!'
+
+        self.manager.create_api(self.Person, url_prefix='/other', postprocessors={'GET_RESOURCE': [add_name]})
+        self.session.add(self.Person(id=1, name='foo'))
+        self.session.commit()
+        response = self.app.get('/other/person/1')
+        assert response.json['data']['attributes']['name'] == 'foo!'
+        assert len(self.cache) == 0
+
+    def test_maxsize(self):
+        """Tests that the least recently used instances are dropped."""
+        self.cache.maxsize = 1
+        self.session.add_all([self.Person(id=1), self.Person(id=2)])
+        self.session.commit()
+        self.app.get('/api/person')
+        assert len(self.cache) == 1
+        self.app.get('/api/person/2')
+        assert len(self.serialized) == 2
+        self.app.get('/api/person/1')
+        assert len(self.serialized) == 3
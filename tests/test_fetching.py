@@ -18,16 +18,28 @@ Flask-Restless meets the minimum requirements of the JSON API
 specification.
 
 """
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlalchemy import Boolean
 from sqlalchemy import Column
+from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
+from sqlalchemy import Table
 from sqlalchemy import Unicode
+from sqlalchemy import and_
+from sqlalchemy import event
 from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import backref
 from sqlalchemy.orm import relationship
 
+from flask_restless import CONTENT_TYPE
 from flask_restless import APIManager
 from flask_restless import ProcessingException
+from flask_restless.views import RelationshipAPI
 
 from .helpers import FlaskSQLAlchemyTestBase
 from .helpers import ManagerTestBase
@@ -44,6 +56,7 @@ class TestFetchRelation(ManagerTestBase):
             __tablename__ = 'article'
             id = Column(Integer, primary_key=True)
             title = Column(Unicode)
+            created_at = Column(DateTime)
             author_id = Column(Integer, ForeignKey('person.id'))
             author = relationship('Person', backref=backref('articles'))
 
@@ -66,6 +79,27 @@ class TestFetchRelation(ManagerTestBase):
         assert response.status_code == 404
         # TODO Check error message here.
 
+    def test_iso_dates_only(self):
+        """Tests that date strings in filters on a relation must be in ISO
+        8601 format if only ISO 8601 strings are allowed.
+
+        """
+        person = self.Person(id=1)
+        article = self.Article(id=1, author=person, created_at=datetime(2020, 1, 1))
+        self.session.add_all([person, article])
+        self.session.commit()
+        manager = APIManager(self.flaskapp, session=self.session, iso_dates_only=True)
+        manager.create_api(self.Person, url_prefix='/api2')
+        manager.create_api(self.Article, url_prefix='/api2')
+        filters = [{'name': 'created_at', 'op': 'eq', 'val': 'Jan 1 2020'}]
+        query_string = {'filter[objects]': dumps(filters)}
+        for url in ('/api2/person/1/articles', '/api2/person/1/relationships/articles'):
+            response = self.app.get(url, query_string=query_string)
+            assert response.status_code == 400
+        filters = [{'name': 'created_at', 'op': 'eq', 'val': '2020-01-01T00:00:00'}]
+        response = self.app.get('/api2/person/1/articles', query_string={'filter[objects]': dumps(filters)})
+        assert [article['id'] for article in response.json['data']] == ['1']
+
     def test_nonexistent_relation(self):
         """Tests that a request for a nonexistent relation yields an error."""
         person = self.Person(id=1)
@@ -127,6 +161,75 @@ class TestFetchRelation(ManagerTestBase):
                                    for article in articles]
         assert ['2', '1', '3'] == [article['id'] for article in articles]
 
+    def test_to_many_page_only(self):
+        """Tests that only the requested page of a to-many relation is
+        loaded, not the whole relationship.
+
+        """
+        person = self.Person(id=1)
+        self.session.add(person)
+        self.session.add_all([self.Article(id=i, author=person) for i in range(10)])
+        self.session.add(self.Article(id=10))
+        self.session.commit()
+        self.session.expunge_all()
+        loaded = []
+        event.listen(self.Article, 'load', lambda instance, context: loaded.append(instance.id))
+        response = self.app.get('/api/person/1/articles', query_string={'page[size]': 2, 'page[number]': 2})
+        document = response.json
+        assert [article['id'] for article in document['data']] == ['2', '3']
+        assert document['meta']['total'] == 10
+        assert sorted(loaded) == [2, 3]
+
+    def test_to_many_cursor_pagination(self):
+        """Tests that pages of a to-many relation and of its relationship
+        can be requested by their cursor.
+
+        """
+        person = self.Person(id=1)
+        self.session.add(person)
+        self.session.add_all([self.Article(id=i, title=str(i % 2), author=person) for i in range(5)])
+        self.session.add(self.Article(id=5))
+        self.session.commit()
+        for url in '/api/person/1/articles', '/api/person/1/relationships/articles':
+            query_string = {'sort': '-title', 'page[size]': 2, 'page[cursor]': ''}
+            document = self.app.get(url, query_string=query_string).json
+            ids = [article['id'] for article in document['data']]
+            while document['links']['next'] is not None:
+                document = self.app.get(document['links']['next']).json
+                ids.extend(article['id'] for article in document['data'])
+            assert ids == ['1', '3', '0', '2', '4']
+            assert 'total' not in document['meta']
+
+    def test_to_many_count_strategy(self):
+        """Tests that the count strategy requested by the client applies to
+        to-many relations and relationships.
+
+        """
+        person = self.Person(id=1)
+        self.session.add(person)
+        self.session.add_all([self.Article(id=i, author=person) for i in range(3)])
+        self.session.commit()
+        for url in '/api/person/1/articles', '/api/person/1/relationships/articles':
+            document = self.app.get(url, query_string={'page[size]': 2, 'page[count]': 'none'}).json
+            assert document['meta'] == {}
+            assert document['links']['last'] is None
+            assert 'page[number]=2' in document['links']['next']
+
+    def test_to_many_window_count(self):
+        """Tests that to-many relations and relationships can be counted
+        with a window function.
+
+        """
+        self.manager.create_api(self.Person, url_prefix='/window', count_strategy='window')
+        person = self.Person(id=1)
+        self.session.add(person)
+        self.session.add_all([self.Article(id=i, author=person) for i in range(3)])
+        self.session.commit()
+        for url in '/window/person/1/articles', '/window/person/1/relationships/articles':
+            document = self.app.get(url, query_string={'page[size]': 2}).json
+            assert [article['id'] for article in document['data']] == ['0', '1']
+            assert document['meta'] == {'total': 3}
+
 
 class TestFetchRelatedResource(ManagerTestBase):
 
@@ -207,6 +310,25 @@ class TestFetchRelatedResource(ManagerTestBase):
         assert author['id'] == '1'
         assert author['type'] == 'person'
 
+    def test_related_resource_only(self):
+        """Tests that only the requested related resource is loaded, and
+        that a resource that exists but is not related yields an error.
+
+        """
+        person = self.Person(id=1)
+        self.session.add(person)
+        self.session.add_all([self.Article(id=i, author=person) for i in range(10)])
+        self.session.add(self.Article(id=10))
+        self.session.commit()
+        self.session.expunge_all()
+        loaded = []
+        event.listen(self.Article, 'load', lambda instance, context: loaded.append(instance.id))
+        response = self.app.get('/api/person/1/articles/3')
+        assert response.json['data']['id'] == '3'
+        assert loaded == [3]
+        response = self.app.get('/api/person/1/articles/10')
+        check_sole_error(response, 404, ['No related resource', '10'])
+
     def test_nonexistent_resource(self):
         """Tests that a request for a relation on a nonexistent resource yields
         an error.
@@ -275,6 +397,26 @@ class TestFetchRelationship(ManagerTestBase):
         assert response.status_code == 404
         # TODO check error message here
 
+    def test_linkage_only(self):
+        """Tests that only the IDs of a page of related resources are
+        selected from a relationship URL.
+
+        """
+        person = self.Person(id=1)
+        self.session.add(person)
+        self.session.add_all([self.Article(id=i, author=person) for i in range(5)])
+        self.session.add(self.Article(id=5))
+        self.session.commit()
+        self.session.expunge_all()
+        loaded = []
+        event.listen(self.Article, 'load', lambda instance, context: loaded.append(instance))
+        query_string = {'page[size]': 2, 'page[number]': 2, 'sort': '-id', 'filter[objects]': dumps([{'name': 'id', 'op': 'gt', 'val': 0}])}
+        response = self.app.get('/api/person/1/relationships/articles', query_string=query_string)
+        document = response.json
+        assert document['data'] == [{'id': '2', 'type': 'article'}, {'id': '1', 'type': 'article'}]
+        assert document['meta']['total'] == 4
+        assert loaded == []
+
 
 class TestServerSparseFieldsets(ManagerTestBase):
     """Tests for specifying default sparse fieldsets on the server."""
@@ -489,6 +631,627 @@ class TestServerSparseFieldsets(ManagerTestBase):
         assert 'person' == author['type']
 
 
+class TestSerializeFromRows(ManagerTestBase):
+    """Tests for fetching collections with the ``serialize_from_rows``
+    option, which bypasses loading instances of the model.
+
+    """
+
+    def setUp(self):
+        super(TestSerializeFromRows, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            name = Column(Unicode)
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            title = Column(Unicode)
+            author_id = Column(Integer, ForeignKey('person.id'))
+            author = relationship('Person', backref=backref('articles'))
+
+        self.Article = Article
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+        self.manager.create_api(Article, serialize_from_rows=True)
+        self.manager.create_api(Person, serialize_from_rows=True)
+
+    def test_collection(self):
+        """Tests that resources are serialized from rows without adding
+        instances to the session.
+
+        """
+        self.session.add_all([self.Person(id=1, name='foo'),
+                              self.Article(id=1, title='bar', author_id=1),
+                              self.Article(id=2, title='baz')])
+        self.session.commit()
+        self.session.expunge_all()
+        response = self.app.get('/api/article', query_string={'sort': '-title'})
+        assert response.status_code == 200
+        document = response.json
+        assert document['meta']['total'] == 2
+        assert document['data'] == [
+            {'id': '2', 'type': 'article', 'attributes': {'title': 'baz'}, 'relationships': {'author': {'data': None}}},
+            {'id': '1', 'type': 'article', 'attributes': {'title': 'bar'},
+             'relationships': {'author': {'data': {'id': '1', 'type': 'person'}}}},
+        ]
+        assert len(self.session.identity_map) == 0
+
+    def test_sparse_fieldsets(self):
+        """Tests that sparse fieldsets without to-many relationships are
+        served from rows.
+
+        """
+        self.session.add_all([self.Person(id=1, name='foo'), self.Article(id=1, author_id=1)])
+        self.session.commit()
+        self.session.expunge_all()
+        response = self.app.get('/api/person', query_string={'fields[person]': 'name'})
+        document = response.json
+        assert document['data'] == [{'id': '1', 'type': 'person', 'attributes': {'name': 'foo'}}]
+        assert len(self.session.identity_map) == 0
+
+    def test_to_many_relationship(self):
+        """Tests that resources with to-many relationships are serialized
+        from instances of the model.
+
+        """
+        self.session.add_all([self.Person(id=1, name='foo'), self.Article(id=1, author_id=1)])
+        self.session.commit()
+        response = self.app.get('/api/person')
+        document = response.json
+        person = document['data'][0]
+        assert person['relationships']['articles']['data'] == [{'id': '1', 'type': 'article'}]
+
+
+class TestToManyLinkage(ManagerTestBase):
+    """Tests for loading the linkage of to-many relationships from the
+    foreign keys of the related tables.
+
+    """
+
+    def setUp(self):
+        super(TestToManyLinkage, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            articles = relationship('Article', backref='author', order_by='Article.title')
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            title = Column(Unicode)
+            author_id = Column(Integer, ForeignKey('person.id'))
+
+        self.Article = Article
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+        self.manager.create_api(Article)
+        self.manager.create_api(Person)
+
+    def test_no_related_instances(self):
+        """Tests that the linkage is ordered as the relationship and no
+        related instances are loaded.
+
+        """
+        self.session.add_all([self.Person(id=1), self.Person(id=2)])
+        self.session.add_all([self.Article(id=1, title='b', author_id=1), self.Article(id=2, title='a', author_id=1)])
+        self.session.commit()
+        self.session.expunge_all()
+        loaded = []
+        event.listen(self.Article, 'load', lambda instance, context: loaded.append(instance))
+        response = self.app.get('/api/person')
+        people = response.json['data']
+        assert people[0]['relationships']['articles']['data'] == [{'id': '2', 'type': 'article'}, {'id': '1', 'type': 'article'}]
+        assert people[1]['relationships']['articles']['data'] == []
+        assert loaded == []
+
+    def test_included(self):
+        """Tests that included resources are still loaded."""
+        self.session.add_all([self.Person(id=1), self.Article(id=1, author_id=1)])
+        self.session.commit()
+        response = self.app.get('/api/person/1', query_string={'include': 'articles'})
+        document = response.json
+        assert document['data']['relationships']['articles']['data'] == [{'id': '1', 'type': 'article'}]
+        assert [article['id'] for article in document['included']] == ['1']
+
+
+class TestNestedInclusion(ManagerTestBase):
+    """Tests for eager-loading included resources on every level of an
+    include path.
+
+    """
+
+    def setUp(self):
+        super(TestNestedInclusion, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            name = Column(Unicode)
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            title = Column(Unicode)
+            author_id = Column(Integer, ForeignKey('person.id'))
+            author = relationship('Person', backref='articles')
+
+        class Comment(self.Base):
+            __tablename__ = 'comment'
+            id = Column(Integer, primary_key=True)
+            article_id = Column(Integer, ForeignKey('article.id'))
+            article = relationship('Article', backref='comments')
+            author_id = Column(Integer, ForeignKey('person.id'))
+            author = relationship('Person')
+
+        self.Article = Article
+        self.Comment = Comment
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+        self.manager.create_api(Article)
+        self.manager.create_api(Comment)
+        self.manager.create_api(Person)
+
+    def add_article(self, id_):
+        author = self.Person(id=id_ * 10, name='author')
+        commenter = self.Person(id=id_ * 10 + 1, name='commenter')
+        article = self.Article(id=id_, title='article', author=author)
+        other = self.Article(id=id_ * 10, title='other', author=commenter)
+        self.session.add_all([author, commenter, article, other, self.Comment(id=id_, article=article, author=commenter)])
+        self.session.commit()
+        self.session.expunge_all()
+
+    def count_statements(self, url, query_string):
+        statements = []
+
+        def before_cursor_execute(*args):
+            statements.append(args)
+
+        event.listen(self.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.app.get(url, query_string=query_string)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', before_cursor_execute)
+        return response, len(statements)
+
+    def test_collection(self):
+        """Tests that the number of queries does not depend on the number
+        of included resources.
+
+        """
+        query_string = {'include': 'comments.author.articles', 'filter[objects]': dumps([{'name': 'title', 'op': 'eq', 'val': 'article'}])}
+        self.add_article(1)
+        response, expected = self.count_statements('/api/article', query_string)
+        assert sorted(resource['id'] for resource in response.json['included']) == ['1', '10', '11']
+        for id_ in range(2, 6):
+            self.add_article(id_)
+        response, num_statements = self.count_statements('/api/article', query_string)
+        assert len(response.json['data']) == 5
+        assert len(response.json['included']) == 15
+        assert num_statements == expected
+
+    def test_resource(self):
+        """Tests that nested included resources are eager-loaded when
+        fetching a single resource, also with sparse fieldsets.
+
+        """
+        self.add_article(1)
+        query_string = {'include': 'comments.author.articles', 'fields[person]': 'articles', 'fields[article]': 'title'}
+        response, expected = self.count_statements('/api/article/1', query_string)
+        self.add_article(2)
+        self.session.query(self.Comment).filter_by(id=2).update({'article_id': 1})
+        self.session.commit()
+        self.session.expunge_all()
+        response, num_statements = self.count_statements('/api/article/1', query_string)
+        included = {(resource['type'], resource['id']): resource for resource in response.json['included']}
+        assert set(included) == {('comment', '1'), ('comment', '2'), ('person', '11'), ('person', '21'), ('article', '10'), ('article', '20')}
+        assert included[('person', '21')]['relationships']['articles']['data'] == [{'id': '20', 'type': 'article'}]
+        assert included[('article', '20')]['attributes'] == {'title': 'other'}
+        assert num_statements == expected
+
+    def add_articles_by(self, author_id, ids):
+        if self.session.get(self.Person, author_id) is None:
+            self.session.add(self.Person(id=author_id, name='author'))
+        for id_ in ids:
+            commenter = self.Person(id=id_ * 100, name='commenter')
+            article = self.Article(id=id_, title='article', author_id=author_id)
+            self.session.add_all([commenter, article, self.Comment(id=id_, article=article, author=commenter)])
+        self.session.commit()
+        self.session.expunge_all()
+
+    def test_relation(self):
+        """Tests that the related resources fetched from a relation and
+        the resources included from them are eager-loaded.
+
+        """
+        query_string = {'include': 'comments.author'}
+        self.add_articles_by(1, [1])
+        response, expected = self.count_statements('/api/person/1/articles', query_string)
+        self.add_articles_by(1, range(2, 6))
+        response, num_statements = self.count_statements('/api/person/1/articles', query_string)
+        document = response.json
+        assert [article['id'] for article in document['data']] == ['1', '2', '3', '4', '5']
+        assert document['data'][0]['relationships']['comments']['data'] == [{'id': '1', 'type': 'comment'}]
+        included = sorted((resource['type'], int(resource['id'])) for resource in document['included'])
+        assert included == [('comment', id_) for id_ in range(1, 6)] + [('person', id_ * 100) for id_ in range(1, 6)]
+        assert num_statements == expected
+
+    def test_relationship(self):
+        """Tests that the resources included from a relationship endpoint
+        are eager-loaded.
+
+        """
+        query_string = {'include': 'articles.comments.author'}
+        self.add_articles_by(1, [1])
+        response, expected = self.count_statements('/api/person/1/relationships/articles', query_string)
+        self.add_articles_by(1, range(2, 6))
+        response, num_statements = self.count_statements('/api/person/1/relationships/articles', query_string)
+        document = response.json
+        assert [article['id'] for article in document['data']] == ['1', '2', '3', '4', '5']
+        assert len(document['included']) == 15
+        assert num_statements == expected
+
+    def test_resources_to_include_override(self):
+        """Tests that an override of :meth:`APIBase.resources_to_include`
+        decides the included resources.
+
+        """
+        self.add_articles_by(1, [1, 2])
+
+        def resources_to_include(view, instance):
+            return {comment for article in instance.articles for comment in article.comments}
+
+        with patch.object(RelationshipAPI, 'resources_to_include', resources_to_include):
+            response = self.app.get('/api/person/1/relationships/articles', query_string={'include': 'articles.comments.author'})
+        document = response.json
+        assert sorted((resource['type'], resource['id']) for resource in document['included']) == [('comment', '1'), ('comment', '2')]
+
+
+class TestBatchLoading(ManagerTestBase):
+    """Tests for loading many-to-many relationships and relationships with
+    a custom join condition for all the resources in a response at once.
+
+    """
+
+    def setUp(self):
+        super(TestBatchLoading, self).setUp()
+        article_tags = Table(
+            'article_tags', self.Base.metadata,
+            Column('article_id', Integer, ForeignKey('article.id')),
+            Column('tag_id', Integer, ForeignKey('tag.id')),
+        )
+        friendship = Table(
+            'friendship', self.Base.metadata,
+            Column('person_id', Integer, ForeignKey('person.id')),
+            Column('friend_id', Integer, ForeignKey('person.id')),
+        )
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            friends = relationship('Person', secondary=friendship, primaryjoin=id == friendship.c.person_id,
+                                   secondaryjoin=id == friendship.c.friend_id)
+            published = relationship('Article', primaryjoin='and_(Person.id == Article.author_id, Article.published == True)',
+                                     viewonly=True)
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            published = Column(Boolean, default=True)
+            author_id = Column(Integer, ForeignKey('person.id'))
+            tags = relationship('Tag', secondary=article_tags, order_by='Tag.name')
+
+        class Tag(self.Base):
+            __tablename__ = 'tag'
+            id = Column(Integer, primary_key=True)
+            name = Column(Unicode)
+
+        self.Article = Article
+        self.Person = Person
+        self.Tag = Tag
+        self.Base.metadata.create_all(bind=self.engine)
+        self.manager.create_api(Article)
+        self.manager.create_api(Person)
+        self.manager.create_api(Tag)
+
+    def add_articles(self, ids):
+        for id_ in ids:
+            tags = [self.Tag(id=id_ * 10, name='b'), self.Tag(id=id_ * 10 + 1, name='a')]
+            author = self.Person(id=id_)
+            articles = [self.Article(id=id_, author_id=id_, tags=tags), self.Article(id=id_ * 10, author_id=id_, published=False)]
+            self.session.add_all([author] + tags + articles)
+        self.session.commit()
+        self.session.expunge_all()
+
+    def count_statements(self, url, query_string=None):
+        statements = []
+
+        def before_cursor_execute(*args):
+            statements.append(args)
+
+        event.listen(self.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.app.get(url, query_string=query_string)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', before_cursor_execute)
+        return response, len(statements)
+
+    def test_many_to_many_linkage(self):
+        """Tests that the linkage of a many-to-many relationship is read
+        from the association table without loading related instances.
+
+        """
+        self.add_articles([1])
+        loaded = []
+        event.listen(self.Tag, 'load', lambda instance, context: loaded.append(instance))
+        response, expected = self.count_statements('/api/article', {'filter[objects]': dumps([{'name': 'published', 'op': 'eq', 'val': True}])})
+        assert response.json['data'][0]['relationships']['tags']['data'] == [{'id': '11', 'type': 'tag'}, {'id': '10', 'type': 'tag'}]
+        assert loaded == []
+        self.add_articles([2, 3])
+        response, num_statements = self.count_statements('/api/article', {'filter[objects]': dumps([{'name': 'published', 'op': 'eq', 'val': True}])})
+        assert len(response.json['data']) == 3
+        assert num_statements == expected
+
+    def test_custom_join_linkage(self):
+        """Tests that the linkage of a relationship with a custom join
+        condition is loaded for all resources at once.
+
+        """
+        self.add_articles([1])
+        response, expected = self.count_statements('/api/person')
+        assert response.json['data'][0]['relationships']['published']['data'] == [{'id': '1', 'type': 'article'}]
+        self.add_articles([2, 3])
+        response, num_statements = self.count_statements('/api/person')
+        assert [person['relationships']['published']['data'] for person in response.json['data']] == [
+            [{'id': '1', 'type': 'article'}], [{'id': '2', 'type': 'article'}], [{'id': '3', 'type': 'article'}]
+        ]
+        assert num_statements == expected
+
+    def test_self_referential_linkage(self):
+        """Tests the linkage of a self-referential many-to-many
+        relationship.
+
+        """
+        person1 = self.Person(id=1)
+        person2 = self.Person(id=2, friends=[person1])
+        person3 = self.Person(id=3, friends=[person1, person2])
+        self.session.add_all([person1, person2, person3])
+        self.session.commit()
+        response = self.app.get('/api/person', query_string={'linkage[limit]': 1})
+        friends = [person['relationships']['friends'] for person in response.json['data']]
+        assert [relationship['data'] for relationship in friends] == [[], [{'id': '1', 'type': 'person'}], [{'id': '1', 'type': 'person'}]]
+        assert friends[2]['meta'] == {'total': 2}
+
+    def test_included(self):
+        """Tests that included resources of these relationships are
+        loaded with one query per level.
+
+        """
+        query_string = {'include': 'published.tags', 'fields[article]': 'tags'}
+        self.add_articles([1])
+        response, expected = self.count_statements('/api/person', query_string)
+        self.add_articles([2, 3])
+        response, num_statements = self.count_statements('/api/person', query_string)
+        included = sorted((resource['type'], resource['id']) for resource in response.json['included'])
+        assert included == sorted([('article', str(id_)) for id_ in (1, 2, 3)] + [('tag', str(id_)) for id_ in (10, 11, 20, 21, 30, 31)])
+        assert num_statements == expected
+
+    def test_relation(self):
+        """Tests fetching the related resources of many-to-many
+        relationships and relationships with a custom join condition.
+
+        """
+        self.add_articles([1, 2])
+        response = self.app.get('/api/article/1/tags')
+        assert [tag['id'] for tag in response.json['data']] == ['10', '11']
+        response = self.app.get('/api/person/2/published')
+        assert [article['id'] for article in response.json['data']] == ['2']
+        assert response.json['meta']['total'] == 1
+
+    def test_relationship_url(self):
+        """Tests that the linkage of a many-to-many relationship URL is
+        read from the association table.
+
+        """
+        self.add_articles([1])
+        self.session.add(self.Tag(id=5, name='c'))
+        self.session.execute(self.Article.tags.property.secondary.insert().values(article_id=1, tag_id=5))
+        self.session.commit()
+        statements = []
+        event.listen(self.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+        response = self.app.get('/api/article/1/relationships/tags', query_string={'page[size]': 2})
+        document = response.json
+        assert document['data'] == [{'id': '5', 'type': 'tag'}, {'id': '10', 'type': 'tag'}]
+        assert document['meta']['total'] == 3
+        assert not any('FROM tag' in statement for statement in statements)
+
+    def test_relationship_url_custom_query(self):
+        """Tests that the linkage of a many-to-many relationship URL
+        respects a custom ``query`` attribute of the related model.
+
+        """
+        self.add_articles([1])
+        visible = aliased(self.Tag)
+        queries = [
+            lambda cls: Query(cls).filter(cls.name != 'a'),
+            # A restriction without a WHERE clause.
+            lambda cls: Query(cls).join(visible, and_(visible.id == cls.id, visible.name != 'a')),
+        ]
+        for query in queries:
+            self.Tag.query = classmethod(query)
+            response = self.app.get('/api/article/1/relationships/tags')
+            assert response.json['data'] == [{'id': '10', 'type': 'tag'}]
+            assert response.json['meta']['total'] == 1
+            response = self.app.get('/api/article/1/tags')
+            assert [tag['id'] for tag in response.json['data']] == ['10']
+
+    def test_included_resource(self):
+        """Tests that the included resources of a single resource are in
+        the order of the relationship.
+
+        """
+        self.add_articles([1])
+        response = self.app.get('/api/article/1', query_string={'include': 'tags'})
+        document = response.json
+        assert document['data']['relationships']['tags']['data'] == [{'id': '11', 'type': 'tag'}, {'id': '10', 'type': 'tag'}]
+        assert sorted(tag['id'] for tag in document['included']) == ['10', '11']
+
+
+class TestLinkageLimit(ManagerTestBase):
+    """Tests for limiting the number of resource identifier objects in the
+    linkage of to-many relationships.
+
+    """
+
+    def setUp(self):
+        super(TestLinkageLimit, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            articles = relationship('Article', backref='author')
+            comments = relationship('Comment', primaryjoin='and_(Person.id == Comment.author_id, Comment.text != None)')
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            author_id = Column(Integer, ForeignKey('person.id'))
+
+        class Comment(self.Base):
+            __tablename__ = 'comment'
+            id = Column(Integer, primary_key=True)
+            text = Column(Unicode)
+            author_id = Column(Integer, ForeignKey('person.id'))
+
+        self.Article = Article
+        self.Comment = Comment
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+        self.manager.create_api(Article)
+        self.manager.create_api(Comment)
+        self.session.add_all([self.Person(id=1), self.Person(id=2)])
+        self.session.add_all([self.Article(id=i, author_id=1) for i in range(1, 4)])
+        self.session.add_all([self.Comment(id=i, text='foo', author_id=1) for i in range(1, 4)])
+        self.session.commit()
+
+    def test_api_option(self):
+        """Tests that the linkage is limited and the total is given in
+        the relationship meta.
+
+        """
+        self.manager.create_api(self.Person, linkage_limit=2)
+        response = self.app.get('/api/person')
+        people = response.json['data']
+        for relation, type_ in (('articles', 'article'), ('comments', 'comment')):
+            relationship = people[0]['relationships'][relation]
+            assert relationship['data'] == [{'id': '1', 'type': type_}, {'id': '2', 'type': type_}]
+            assert relationship['meta'] == {'total': 3}
+            assert relationship['links']['self'] == f'/api/person/1/relationships/{relation}'
+            relationship = people[1]['relationships'][relation]
+            assert relationship == {'data': [], 'meta': {'total': 0}}
+
+    def test_query_parameter(self):
+        """Tests that clients can limit the linkage, up to the limit of the
+        API.
+
+        """
+        self.manager.create_api(self.Person)
+        self.manager.create_api(self.Person, url_prefix='/limited', linkage_limit=1)
+        response = self.app.get('/api/person/1', query_string={'linkage[limit]': 0})
+        relationship = response.json['data']['relationships']['articles']
+        assert relationship['data'] == []
+        assert relationship['meta'] == {'total': 3}
+        response = self.app.get('/limited/person/1', query_string={'linkage[limit]': 5})
+        assert len(response.json['data']['relationships']['articles']['data']) == 1
+
+    def test_bad_query_parameter(self):
+        """Tests that an invalid limit causes an error response."""
+        self.manager.create_api(self.Person)
+        response = self.app.get('/api/person', query_string={'linkage[limit]': -1})
+        check_sole_error(response, 400, 'linkage[limit]')
+
+
+class TestStreamUnpaginated(ManagerTestBase):
+    """Tests for fetching whole collections with the
+    ``stream_unpaginated`` option.
+
+    """
+
+    def setUp(self):
+        super(TestStreamUnpaginated, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            name = Column(Unicode)
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            author_id = Column(Integer, ForeignKey('person.id'))
+            author = relationship('Person', backref=backref('articles'))
+
+        self.Article = Article
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+
+    def test_streamed_document(self):
+        """Tests that a streamed collection is the same document as a
+        collection that is built in memory.
+
+        """
+        self.manager.create_api(self.Article, url_prefix='/streamed', stream_unpaginated=True)
+        self.manager.create_api(self.Article)
+        self.manager.create_api(self.Person)
+        self.session.add_all([self.Person(id=1, name='foo'), self.Person(id=2, name='bar')])
+        self.session.add_all([self.Article(id=i, author_id=i % 2 + 1) for i in range(5)])
+        self.session.commit()
+        query_string = {'page[size]': 0, 'include': 'author'}
+        response = self.app.get('/streamed/article', query_string=query_string)
+        assert response.status_code == 200
+        assert 'Content-Length' not in response.headers
+        assert response.mimetype == CONTENT_TYPE
+        streamed = response.json
+        expected = self.app.get('/api/article', query_string=query_string).json
+        assert streamed['meta'] == expected['meta'] == {'total': 5}
+        assert streamed['data'] == expected['data']
+
+        def by_id(resource):
+            return resource['id']
+
+        assert sorted(streamed['included'], key=by_id) == sorted(expected['included'], key=by_id)
+        assert streamed['links']['self'] == expected['links']['self']
+
+    def test_empty_collection(self):
+        """Tests for streaming an empty collection."""
+        self.manager.create_api(self.Person, stream_unpaginated=True)
+        response = self.app.get('/api/person', query_string={'page[size]': 0})
+        assert response.json['data'] == []
+        assert response.json['meta'] == {'total': 0}
+
+    def test_paginated(self):
+        """Tests that paginated collections are not streamed."""
+        self.manager.create_api(self.Person, stream_unpaginated=True)
+        response = self.app.get('/api/person')
+        assert 'Content-Length' in response.headers
+
+    def test_postprocessors(self):
+        """Tests that collections are not streamed if there are
+        postprocessors that expect the whole document.
+
+        """
+        def add_meta(result, **__):
+            result['meta']['foo'] = 'bar'
+
+        self.manager.create_api(self.Person, stream_unpaginated=True, postprocessors={'GET_COLLECTION': [add_meta]})
+        response = self.app.get('/api/person', query_string={'page[size]': 0})
+        assert 'Content-Length' in response.headers
+        assert response.json['meta']['foo'] == 'bar'
+
+
 class TestProcessors(ManagerTestBase):
     """Tests for pre- and postprocessors."""
 
@@ -32,6 +32,8 @@ from sqlalchemy.orm import backref
 from sqlalchemy.orm import relationship
 from testing.postgresql import PostgresqlFactory as PGFactory
 
+from flask_restless.search import filter_template
+
 from .helpers import ManagerTestBase
 from .helpers import check_sole_error
 from .helpers import dumps
@@ -585,6 +587,29 @@ class TestFiltering(SearchTestBase):
         articles = document['data']
         assert ['3', '4'] == sorted(article['id'] for article in articles)
 
+    def test_same_shape(self):
+        """Tests that filter objects that differ only in their values are
+        compiled once, and that each request uses its own values.
+
+        """
+        people = [self.Person(id=i, name=name, birthday=date(1990, 1, i)) for i, name in enumerate(['foo', 'bar', 'baz'], start=1)]
+        self.session.add_all(people)
+        self.session.add(self.Comment(id=1, content='cool', author_id=2))
+        self.session.commit()
+        compiled = filter_template.cache_info().misses
+
+        def search(name, birthday, content):
+            filters = [{'or': [dict(name='name', op='like', val=name), dict(name='birthday', op='lt', val=birthday)]},
+                       dict(name='comments', op='any', val=dict(name='content', op='eq', val=content))]
+            response = self.search('/api/person', filters)
+            assert response.status_code == 200
+            return sorted(person['id'] for person in response.json['data'])
+
+        assert search('ba%', '1990-01-01', 'cool') == ['2']
+        assert search('foo', '1990-01-03', 'cool') == ['2']
+        assert search('foo', '1990-01-03', 'bad') == []
+        assert filter_template.cache_info().misses == compiled + 1
+
 
 class TestOperators(SearchTestBase):
 
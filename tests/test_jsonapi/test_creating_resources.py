@@ -617,6 +617,30 @@ class TestCreatingResources(BaseTestClass):
         self.post_and_validate('/api/article', json=data, expected_response_code=409,
                                error_msg='Failed to deserialize object: expected type "article" but got type "person"')
 
+    def test_to_many_relationship_nonexistent(self):
+        """Tests that the server responds with :https:status:`404` to a request to create a resource with a to-many relationship that
+        references related resources that do not exist, with an error for each of them.
+        """
+        self.session.add(Article(id=1))
+        self.session.commit()
+        data = {
+            'data': {
+                'type': 'person',
+                'relationships': {
+                    'articles': {
+                        'data': [
+                            {'type': 'article', 'id': '1'},
+                            {'type': 'article', 'id': '2'},
+                            {'type': 'article', 'id': '3'}
+                        ]
+                    }
+                }
+            }
+        }
+        document = self.post_and_validate('/api/person', json=data, expected_response_code=404)
+        assert [error['detail'] for error in document['errors']] == ['No object of type article found with ID 2', 'No object of type article found with ID 3']
+        assert self.session.query(Person).count() == 0
+
     def test_create_that_has_association_proxy(self):
         """
         Test for creating a new instance of the database model that has a many-to-many relation that uses an association object to allow extra
@@ -312,6 +312,23 @@ class TestDocumentStructure(BaseTestClass):
         document2 = self.fetch_and_validate(self_url)
         assert document1 == document2
 
+    def test_link_urls(self):
+        """Tests that resource links are absolute URLs and relationship
+        links are relative to the root of the server.
+
+        """
+        self.session.add_all([Person(pk=1), Article(id=1, author_id=1)])
+        self.session.commit()
+        document = self.fetch_and_validate('/api/article/1')
+        article = document['data']
+        assert article['links'] == {'self': 'http://localhost/api/article/1'}
+        assert article['relationships']['author']['links'] == {
+            'self': '/api/article/1/relationships/author',
+            'related': '/api/article/1/author',
+        }
+        document = self.fetch_and_validate('/api/article/1', headers={'Host': 'example.com'})
+        assert document['data']['links'] == {'self': 'http://example.com/api/article/1'}
+
     def test_resource_identifier_object_keys(self):
         """Tests that a resource identifier object contains the required
         keys.
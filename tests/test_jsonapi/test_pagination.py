@@ -1,6 +1,13 @@
+import base64
+import json
+
 import pytest
+from sqlalchemy import event
 
 from flask_restless import APIManager
+from flask_restless import CappedCount
+from flask_restless import EstimatedCount
+from flask_restless import WindowCount
 
 from ..conftest import BaseTestClass
 from .models import Base
@@ -328,3 +335,214 @@ class TestPagination(BaseTestClass):
         assert any(all(('/api/person?' in link, 'page[number]=5' in link,
                         'page[size]=3' in link, 'rel="next"' in link))
                    for link in links)
+
+    def test_cursor_pagination(self):
+        """Tests that following the ``next`` and ``prev`` links of pages
+        requested by their cursor visits each resource once, in the order
+        of multiple sort fields in different directions, with the primary
+        key as tie-breaker.
+
+        """
+        self.session.bulk_save_objects([Person(pk=i, age=i % 3, other=i % 4) for i in range(1, 11)])
+        self.session.commit()
+        expected = sorted(range(1, 11), key=lambda i: (-(i % 3), i % 4, i))
+        query_string = {'sort': '-age,other', 'page[size]': 3, 'page[cursor]': ''}
+        document = self.fetch_and_validate('/api/person', query_string=query_string)
+        assert 'total' not in document['meta']
+        assert document['links']['prev'] is None
+        assert document['links']['last'] is None
+        pages = [[int(person['id']) for person in document['data']]]
+        while document['links']['next'] is not None:
+            assert 'sort=-age,other' in document['links']['next']
+            document = self.fetch_and_validate(document['links']['next'])
+            pages.append([int(person['id']) for person in document['data']])
+        assert [len(page) for page in pages] == [3, 3, 3, 1]
+        assert sum(pages, []) == expected
+        for page in reversed(pages[:-1]):
+            document = self.fetch_and_validate(document['links']['prev'])
+            assert [int(person['id']) for person in document['data']] == page
+        assert document['links']['prev'] is None
+
+    def test_invalid_cursor(self):
+        """Tests that a cursor which cannot be decoded, or which does not
+        match the sort fields, causes an error response.
+
+        """
+        self.session.bulk_save_objects([Person(pk=1, age=1), Person(pk=2, age=2)])
+        self.session.commit()
+        self.fetch_and_validate('/api/person', query_string={'page[cursor]': 'bogus'}, expected_response_code=400,
+                                error_msg='Invalid page cursor: bogus')
+        document = self.fetch_and_validate('/api/person', query_string={'sort': 'age', 'page[size]': 1, 'page[cursor]': ''})
+        cursor = document['links']['next'].split('page[cursor]=')[1]
+        query_string = {'sort': 'age,other', 'page[size]': 1, 'page[cursor]': cursor}
+        self.fetch_and_validate('/api/person', query_string=query_string, expected_response_code=400,
+                                error_msg=f'Page cursor does not match the sort fields: {cursor}')
+
+    @pytest.mark.parametrize('values', [[[1], 1], [{'a': 1}, 1], [True, 1], ['x', 1], [1.5, 1], [1, None]])
+    def test_malformed_cursor(self, values):
+        """Tests that a cursor whose values are not of the types of the
+        sort fields causes an error response.
+
+        """
+        self.session.bulk_save_objects([Person(pk=1, age=1), Person(pk=2, age=2)])
+        self.session.commit()
+        payload = json.dumps([0, values]).encode()
+        cursor = base64.urlsafe_b64encode(payload).decode().rstrip('=')
+        query_string = {'sort': 'age', 'page[cursor]': cursor}
+        document = self.fetch_and_validate('/api/person', query_string=query_string, expected_response_code=400)
+        assert len(document['errors']) == 1
+
+    @pytest.mark.parametrize('nulls_last', [False, True])
+    @pytest.mark.parametrize('sort', ['age', '-age'])
+    def test_cursor_null_sort_key(self, sort, nulls_last, monkeypatch):
+        """Tests that following the ``next`` and ``prev`` links of pages
+        requested by their cursor visits resources whose sort field is
+        null where the database sorts nulls, both for databases that sort
+        them first and for those that sort them last.
+
+        """
+        if nulls_last:
+            monkeypatch.setattr('flask_restless.pagination.NULLS_LAST_DIALECTS', frozenset({'sqlite'}))
+        ages = [None, 1, None, 2, 1, None]
+        self.session.bulk_save_objects([Person(pk=i, age=age) for i, age in enumerate(ages, 1)])
+        self.session.commit()
+        expected = sorted(range(1, 7), key=lambda i: ((ages[i - 1] is None) == nulls_last, ages[i - 1] or 0, i))
+        if sort == '-age':
+            expected = sorted(expected, key=lambda i: ((ages[i - 1] is None) != nulls_last, -(ages[i - 1] or 0), i))
+        query_string = {'sort': sort, 'page[size]': 2, 'page[cursor]': ''}
+        document = self.fetch_and_validate('/api/person', query_string=query_string)
+        pages = [[int(person['id']) for person in document['data']]]
+        while document['links']['next'] is not None:
+            document = self.fetch_and_validate(document['links']['next'])
+            pages.append([int(person['id']) for person in document['data']])
+        assert sum(pages, []) == expected
+        for page in reversed(pages[:-1]):
+            document = self.fetch_and_validate(document['links']['prev'])
+            assert [int(person['id']) for person in document['data']] == page
+        assert document['links']['prev'] is None
+        if not nulls_last:
+            # The same order as pages requested by their number.
+            document = self.fetch_and_validate('/api/person', query_string={'sort': sort + ',pk', 'page[size]': 10})
+            assert [int(person['id']) for person in document['data']] == expected
+
+    def test_capped_count(self):
+        """Tests that a capped count gives the total only if it is below
+        the limit, and that the next page is found without it.
+
+        """
+        self.manager.create_api(Person, url_prefix='/capped', count_strategy=CappedCount(limit=5))
+        self.session.bulk_save_objects([Person(pk=i) for i in range(1, 13)])
+        self.session.commit()
+        document = self.fetch_and_validate('/capped/person', query_string={'page[size]': 5})
+        assert document['meta'] == {'total_at_least': 5}
+        assert document['links']['last'] is None
+        assert 'page[number]=2' in document['links']['next']
+        document = self.fetch_and_validate('/capped/person', query_string={'page[size]': 5, 'page[number]': 3})
+        assert [person['id'] for person in document['data']] == ['11', '12']
+        assert document['links']['next'] is None
+        document = self.fetch_and_validate('/capped/person', query_string={'page[size]': 5, 'filter[objects]': '[{"name": "pk", "op": "lt", "val": 4}]'})
+        assert document['meta'] == {'total': 3}
+        assert 'page[number]=1' in document['links']['last']
+        document = self.fetch_and_validate('/capped/person', query_string={'page[size]': 2, 'filter[objects]': '[{"name": "pk", "op": "le", "val": 5}]'})
+        assert document['meta'] == {'total': 5}
+        assert 'page[number]=3' in document['links']['last']
+
+    def test_estimated_count(self):
+        """Tests that an estimated count is given with its own key, and only
+        if there is an estimator for the database.
+
+        """
+        self.manager.create_api(Person, url_prefix='/estimated', count_strategy=EstimatedCount(estimators={'sqlite': lambda session, query: 42}))
+        self.manager.create_api(Person, url_prefix='/unsupported', count_strategy='estimated')
+        self.session.bulk_save_objects([Person(pk=i) for i in range(1, 4)])
+        self.session.commit()
+        document = self.fetch_and_validate('/estimated/person')
+        assert document['meta'] == {'estimated_total': 42}
+        assert len(document['data']) == 3
+        document = self.fetch_and_validate('/unsupported/person')
+        assert document['meta'] == {}
+        assert document['links']['next'] is None
+
+    def test_request_count_strategy(self):
+        """Tests that clients can request a cheaper count strategy, but not
+        a more expensive one.
+
+        """
+        self.manager.create_api(Person, url_prefix='/none', count_strategy='none')
+        self.session.bulk_save_objects([Person(pk=i) for i in range(1, 13)])
+        self.session.commit()
+        document = self.fetch_and_validate('/api/person', query_string={'page[count]': 'none'})
+        assert document['meta'] == {}
+        assert 'page[count]=none' in document['links']['next']
+        document = self.fetch_and_validate('/api/person', headers={'Prefer': 'return=minimal, count=none'})
+        assert document['meta'] == {}
+        document = self.fetch_and_validate('/none/person', query_string={'page[count]': 'exact'})
+        assert document['meta'] == {}
+        document = self.fetch_and_validate('/api/person', headers={'Prefer': 'count=bogus'})
+        assert document['meta'] == {'total': 12}
+        self.fetch_and_validate('/api/person', query_string={'page[count]': 'bogus'}, expected_response_code=400,
+                                error_msg='Unknown count strategy: bogus')
+
+    def test_count_strategy_only_for_pages(self):
+        """Tests that the requested count strategy is only parsed for
+        pages requested by their number.
+
+        """
+        self.manager.create_api(Person, url_prefix='/api2', methods=['GET', 'POST', 'PATCH', 'DELETE'])
+        self.session.add(Person(pk=1))
+        self.session.commit()
+        query_string = {'page[count]': 'bogus'}
+        self.fetch_and_validate('/api2/person/1', query_string=query_string)
+        self.fetch_and_validate('/api2/person', query_string=dict(query_string, **{'page[cursor]': ''}))
+        self.fetch_and_validate('/api2/person/1/articles', query_string=query_string, expected_response_code=400,
+                                error_msg='Unknown count strategy: bogus')
+        self.post_and_validate('/api2/person', query_string=query_string, json={'data': {'type': 'person'}})
+        response = self.client.patch('/api2/person/1', query_string=query_string, json={'data': {'type': 'person', 'id': '1'}})
+        assert response.status_code == 204
+        response = self.client.delete('/api2/person/2', query_string=query_string)
+        assert response.status_code == 204
+
+    def test_window_count(self):
+        """Tests that the window count strategy fetches a page and the total
+        in a single query, and counts separately past the end.
+
+        """
+        self.manager.create_api(Person, url_prefix='/window', count_strategy=WindowCount())
+        self.session.bulk_save_objects([Person(pk=i) for i in range(1, 13)])
+        self.session.commit()
+        queries = []
+        event.listen(self.engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+        document = self.fetch_and_validate('/window/person', query_string={'page[size]': 5, 'page[number]': 2})
+        people_queries = [query for query in queries if 'FROM person' in query]
+        assert len(people_queries) == 1
+        assert 'count(*) OVER ()' in people_queries[0]
+        assert [person['id'] for person in document['data']] == ['6', '7', '8', '9', '10']
+        assert document['meta'] == {'total': 12}
+        assert 'page[number]=3' in document['links']['last']
+        document = self.fetch_and_validate('/window/person', query_string={'page[size]': 5, 'page[number]': 4})
+        assert document['data'] == []
+        assert document['meta'] == {'total': 12}
+
+    def test_deferred_join(self):
+        """Tests that pages past the deferred join offset are fetched by
+        their primary keys first, in the same order as other pages.
+
+        """
+        self.manager.create_api(Person, url_prefix='/deferred', deferred_join_offset=10)
+        self.session.bulk_save_objects([Person(pk=i, age=i % 4) for i in range(1, 26)])
+        self.session.commit()
+        queries = []
+        event.listen(self.engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+        for number in range(1, 6):
+            query_string = {'sort': '-age,pk', 'page[size]': 5, 'page[number]': number}
+            expected = self.fetch_and_validate('/api/person', query_string=query_string)
+            del queries[:]
+            document = self.fetch_and_validate('/deferred/person', query_string=query_string)
+            assert [person['id'] for person in document['data']] == [person['id'] for person in expected['data']]
+            assert document['meta'] == expected['meta']
+            people_queries = [query for query in queries if 'FROM person' in query and 'count(' not in query]
+            if number < 3:
+                assert len(people_queries) == 1
+            else:
+                assert people_queries[0].startswith('SELECT person.pk AS person_pk \nFROM person')
+                assert 'IN (' in people_queries[1]
@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 
 from flask_restless import APIManager
 
@@ -115,3 +116,29 @@ class TestSparseFieldsets(BaseTestClass):
         assert ['name'] == sorted(person['attributes'])
         # We requested only 'id', but 'type' must always appear as well.
         assert all(['id', 'type'] == sorted(article) for article in linked)
+
+    def test_sparse_fieldsets_load_only_requested_columns(self):
+        """Tests that columns that are not in the sparse fieldsets are not
+        loaded from the database, except for the keys needed for linkage.
+
+        """
+        self.session.add_all([
+            Person(pk=1, name=u'foo', age=99),
+            Article(id=1, title=u'bar', author_id=1)
+        ])
+        self.session.commit()
+        self.session.expunge_all()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(self.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            query_string = {'include': 'articles', 'fields[person]': 'name', 'fields[article]': 'author'}
+            document = self.fetch_and_validate('/api/person', query_string=query_string)
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', before_cursor_execute)
+        assert document['data'][0]['attributes'] == {'name': 'foo'}
+        assert document['included'][0]['relationships']['author']['data'] == {'id': '1', 'type': 'person'}
+        assert not any('person.age' in statement or 'article.title' in statement for statement in statements)
@@ -10,8 +10,14 @@
 # License version 3 and under the 3-clause BSD license. For more
 # information, see LICENSE.AGPL and LICENSE.BSD.
 """Unit tests for the :mod:`flask_restless.manager` module."""
+import enum
+import json
+from datetime import date
+from datetime import timedelta
+
 from flask import Flask
 from sqlalchemy import Column
+from sqlalchemy import Date
 from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
 from sqlalchemy import Unicode
@@ -20,6 +26,7 @@ from sqlalchemy.orm import relationship
 
 from flask_restless import APIManager
 from flask_restless import IllegalArgumentError
+from flask_restless import json_default
 
 from .helpers import ManagerTestBase
 from .helpers import SQLAlchemyTestBase
@@ -210,11 +217,14 @@ class TestLocalAPIManager(SQLAlchemyTestBase):
         level but not when creating an API.
 
         """
+        self.session.add(self.Person(id=1))
+        self.session.commit()
         manager = APIManager(self.flaskapp, session=self.session,
-                             url_prefix='')
+                             url_prefix='', include_links=True)
         manager.create_api(self.Person)
         response = self.app.get('/person')
         assert response.status_code == 200
+        assert response.json['data'][0]['links']['self'] == 'http://localhost/person/1'
         response = self.app.get('/api/person')
         assert response.status_code == 404
 
@@ -366,6 +376,11 @@ class TestAPIManager(ManagerTestBase):
         with self.assertRaises(IllegalArgumentError):
             self.manager.create_api(self.Person, only=['id'], exclude=['name'])
 
+    def test_unknown_count_strategy(self):
+        """Tests that an unknown name of a count strategy yields an error."""
+        with self.assertRaises(IllegalArgumentError):
+            self.manager.create_api(self.Person, count_strategy='bogus')
+
     def test_additional_attributes_nonexistent(self):
         """Tests that an attempt to include an additional attribute that
         does not exist on the model raises an exception at the time of
@@ -374,3 +389,82 @@ class TestAPIManager(ManagerTestBase):
         """
         with self.assertRaises(AttributeError):
             self.manager.create_api(self.Person, additional_attributes=['bogus'])
+
+
+class TestJSONBackend(SQLAlchemyTestBase):
+    """Tests for replacing the JSON encoder and decoder used by the
+    :class:`~flask_restless.APIManager`.
+
+    """
+
+    def setUp(self):
+        super(TestJSONBackend, self).setUp()
+
+        class Person(self.Base):
+            __tablename__ = 'person'
+            id = Column(Integer, primary_key=True)
+            name = Column(Unicode)
+            birthday = Column(Date)
+
+        self.Person = Person
+        self.Base.metadata.create_all(bind=self.engine)
+        self.encoded = []
+        self.decoded = []
+
+        def dumps(value):
+            self.encoded.append(value)
+            return json.dumps(value, default=json_default).encode()
+
+        def loads(value):
+            self.decoded.append(value)
+            return json.loads(value)
+
+        self.manager = APIManager(self.flaskapp, session=self.session, json_dumps=dumps, json_loads=loads)
+        self.manager.create_api(Person, methods=['GET', 'POST', 'PATCH'], url_prefix='/api')
+
+    def test_encode_response(self):
+        """Tests that responses are encoded by the given function, which
+        may return bytes.
+
+        """
+        self.session.add(self.Person(id=1, birthday=date(1990, 1, 2)))
+        self.session.commit()
+        response = self.app.get('/api/person/1')
+        assert response.status_code == 200
+        assert response.json['data']['attributes']['birthday'] == '1990-01-02'
+        assert len(self.encoded) == 1
+
+    def test_decode_request(self):
+        """Tests that request documents are decoded by the given
+        function.
+
+        """
+        data = {'data': {'type': 'person', 'attributes': {'name': 'foo'}}}
+        response = self.app.post('/api/person', data=json.dumps(data))
+        assert response.status_code == 201
+        assert self.session.query(self.Person).one().name == 'foo'
+        assert len(self.decoded) == 1
+
+    def test_decode_filters(self):
+        """Tests that filter objects are decoded by the given function."""
+        self.session.add_all([self.Person(id=1, name='foo'), self.Person(id=2, name='bar')])
+        self.session.commit()
+        filters = json.dumps([{'name': 'name', 'op': 'eq', 'val': 'bar'}])
+        response = self.app.get('/api/person', query_string={'filter[objects]': filters})
+        assert [person['id'] for person in response.json['data']] == ['2']
+        assert self.decoded == [filters]
+
+    def test_default(self):
+        """Tests that values outside of resource objects are encoded as
+        the serializer encodes attributes.
+
+        """
+        class Color(enum.Enum):
+            RED = 1
+
+        def add_meta(result, **__):
+            result['meta']['extra'] = [date(1990, 1, 2), timedelta(minutes=1), Color.RED]
+
+        self.manager.create_api(self.Person, url_prefix='/other', postprocessors={'GET_COLLECTION': [add_meta]})
+        response = self.app.get('/other/person')
+        assert response.json['meta']['extra'] == ['1990-01-02', 60.0, 'RED']
@@ -37,6 +37,7 @@ from sqlalchemy.orm import backref
 from sqlalchemy.orm import relationship
 
 from flask_restless import SerializationException
+from flask_restless.serialization import DefaultSerializer
 
 from .helpers import GUID
 from .helpers import ManagerTestBase
@@ -286,6 +287,73 @@ class TestFetchResource(ManagerTestBase):
         assert author['attributes']['foo'] == 'foo'
         assert 'bar' not in author['attributes']
 
+    def test_serialize_many(self):
+        """Tests that :meth:`Serializer.serialize_many` is called once for
+        each model in a response.
+
+        """
+        person1 = self.Person(id=1)
+        person2 = self.Person(id=2)
+        articles = [self.Article(id=1, author=person1), self.Article(id=2, author=person2)]
+        self.session.add_all([person1, person2] + articles)
+        self.session.commit()
+
+        calls = []
+
+        class BatchSerializer(DefaultSerializer):
+
+            def serialize_many(self, instances, only=None, **kwargs):
+                calls.append(sorted(instance.id for instance in instances))
+                return super().serialize_many(instances, only=only, **kwargs)
+
+        self.manager.create_api(self.Person, serializer=BatchSerializer(self.Person, 'person', self.manager, primary_key='id'))
+        self.manager.create_api(self.Article, serializer=BatchSerializer(self.Article, 'article', self.manager, primary_key='id'))
+
+        response = self.app.get('/api/article', query_string={'include': 'author'})
+        document = response.json
+        assert [article['id'] for article in document['data']] == ['1', '2']
+        assert sorted(person['id'] for person in document['included']) == ['1', '2']
+        assert calls == [[1, 2], [1, 2]]
+
+    def test_serialize_many_without_linkage_limit(self):
+        """Tests that a serializer which overrides
+        :meth:`Serializer.serialize_many` without a `linkage_limit`
+        argument works if there is no linkage limit.
+
+        """
+        person = self.Person(id=1)
+        self.session.add_all([person, self.Article(id=1, author=person), self.Article(id=2, author=person)])
+        self.session.commit()
+
+        class MySerializer(DefaultSerializer):
+
+            def serialize_many(self, instances, only=None):
+                return [self.serialize(instance, only=only) for instance in instances]
+
+        self.manager.create_api(self.Person, serializer=MySerializer(self.Person, 'person', self.manager, primary_key='id'))
+        self.manager.create_api(self.Article)
+        response = self.app.get('/api/person')
+        assert response.status_code == 200
+        assert [person['id'] for person in response.json['data']] == ['1']
+
+    def test_serialize_many_exception(self):
+        """Tests that an exception raised by
+        :meth:`Serializer.serialize_many` is reported even if each
+        instance can be serialized on its own.
+
+        """
+        self.session.add_all([self.Person(id=1), self.Person(id=2)])
+        self.session.commit()
+
+        class MySerializer(DefaultSerializer):
+
+            def serialize_many(self, instances, only=None, linkage_limit=None):
+                raise SerializationException(instances[0], resource_id=instances[0].id, resource_type='person')
+
+        self.manager.create_api(self.Person, serializer=MySerializer(self.Person, 'person', self.manager, primary_key='id'))
+        response = self.app.get('/api/person')
+        check_sole_error(response, 500, ['Failed to serialize', 'type', 'person', 'ID', '1'])
+
     def test_exception(self):
         """Tests that exceptions are caught when a custom serialization method
         raises an exception.
@@ -109,3 +109,27 @@ def test_raises_value_error_when_provided_pk_is_not_pk():
 
 def test_skip_pk_test():
     assert DefaultSerializer(Model, 'test-model', None, primary_key='date_field', allow_non_primary_key_id=True)
+
+
+def test_serialize_attributes_with_sparse_fields():
+    serializer = DefaultSerializer(Model, 'test-model', None, primary_key='id')
+    instance = Model(id=1, int_field=1, date_field=datetime.date(2021, 1, 1), interval_field=None, enum_field=MyEnum.one)
+
+    serialized = serializer.serialize_attributes(instance, only={'date_field', 'interval_field', 'enum_field'})
+    assert serialized == {'date_field': '2021-01-01', 'interval_field': None, 'enum_field': 'one'}
+    # the plan for the same set of fields is computed only once
+    assert serializer.plan_for({'date_field', 'interval_field', 'enum_field'}) is serializer.plan_for(['enum_field', 'interval_field', 'date_field'])
+
+
+def test_serialize_additional_attributes():
+    class ModelWithProperties(Model):
+        @property
+        def start_date(self):
+            return datetime.date(2021, 1, 1)
+
+        def double(self):
+            return self.int_field * 2
+
+    serializer = DefaultSerializer(ModelWithProperties, 'test-model', None, primary_key='id', additional_attributes=['start_date', 'double'])
+    serialized = serializer.serialize_attributes(ModelWithProperties(id=1, int_field=2), only={'start_date', 'double'})
+    assert serialized == {'start_date': '2021-01-01', 'double': 4}
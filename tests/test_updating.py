@@ -21,6 +21,7 @@ specification.
 from __future__ import division
 
 from datetime import datetime
+from datetime import time
 
 from sqlalchemy import Column
 from sqlalchemy import Date
@@ -29,14 +30,19 @@ from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
 from sqlalchemy import Time
 from sqlalchemy import Unicode
+from sqlalchemy import and_
+from sqlalchemy import event
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import backref
 from sqlalchemy.orm import relationship
 
 from flask_restless import CONTENT_TYPE
 from flask_restless import APIManager
 from flask_restless import ProcessingException
+from flask_restless.helpers import field_plan
 
 from .helpers import BetterJSONEncoder as JSONEncoder
 from .helpers import FlaskSQLAlchemyTestBase
@@ -240,6 +246,52 @@ class TestUpdating(ManagerTestBase):
         assert response.status_code == 204
         assert person.birth_datetime == now
 
+    def test_deserializing_non_iso_datetime(self):
+        """Tests that date strings that are not in ISO 8601 format are
+        parsed unless only ISO 8601 strings are allowed.
+
+        """
+        self.session.add(self.Person(id=1))
+        self.session.commit()
+        manager = APIManager(self.flaskapp, session=self.session, iso_dates_only=True)
+        manager.create_api(self.Person, methods=['PATCH'], url_prefix='/api2')
+        data = {
+            'data': {
+                'type': 'person',
+                'id': '1',
+                'attributes': {
+                    'birth_datetime': 'May 1 2020 10:30'
+                }
+            }
+        }
+        response = self.app.patch('/api2/person/1', json=data)
+        check_sole_error(response, 400, ['Invalid date or time'])
+        response = self.app.patch('/api/person/1', json=data)
+        assert response.status_code == 204
+        person = self.session.get(self.Person, 1)
+        assert person.birth_datetime == datetime(2020, 5, 1, 10, 30)
+        data['data']['attributes'] = {'birth_datetime': '2020-05-01T10:30:00Z', 'bedtime': '22:15'}
+        response = self.app.patch('/api2/person/1', json=data)
+        assert response.status_code == 204
+        assert person.birth_datetime == datetime(2020, 5, 1, 10, 30)
+        assert person.bedtime == time(22, 15)
+
+    def test_field_plan(self):
+        """Tests that the fields that can be updated, the conversions of
+        date-like values and the related models are computed once for
+        each model.
+
+        """
+        plan = field_plan(self.Person)
+        assert set(plan.coercers) == {'bedtime', 'date_created', 'birth_datetime'}
+        assert plan.relations == {'articles': self.Article}
+        assert {'id', 'name', 'articles'} <= plan.fields
+        assert 'bogus' not in plan.fields
+        assert field_plan(self.Person) is plan
+        plan = field_plan(self.Interval)
+        assert 'length' in plan.fields
+        assert 'radius' not in plan.fields
+
     def test_correct_content_type(self):
         """Tests that the server responds with :http:status:`201` if the
         request has the correct JSON API content type.
@@ -630,6 +682,101 @@ class TestUpdating(ManagerTestBase):
         assert response.status_code == 409
         # TODO check error message here
 
+    def test_to_many_linkage_single_query(self):
+        """Tests that the resources in the linkage of a to-many
+        relationship are loaded with a single query.
+
+        """
+        self.session.add_all([self.Person(id=1)] + [self.Article(id=i) for i in range(1, 6)])
+        self.session.commit()
+        self.manager.create_api(self.Person, methods=['PATCH'],
+                                url_prefix='/api2',
+                                allow_to_many_replacement=True)
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if 'FROM article' in statement:
+                statements.append(statement)
+
+        event.listen(self.engine, 'before_cursor_execute', count)
+        data = {
+            'data': {
+                'type': 'person',
+                'id': '1',
+                'relationships': {
+                    'articles': {
+                        'data': [{'type': 'article', 'id': str(i)} for i in range(1, 6)]
+                    }
+                }
+            }
+        }
+        response = self.app.patch('/api2/person/1', json=data)
+        event.remove(self.engine, 'before_cursor_execute', count)
+        assert response.status_code == 204
+        # One query for the linkage and one for the current articles of the person.
+        assert len(statements) == 2
+        person = self.session.get(self.Person, 1)
+        assert sorted(article.id for article in person.articles) == [1, 2, 3, 4, 5]
+
+    def test_to_many_linkage_custom_query(self):
+        """Tests that resources in the identity map of the session are not
+        taken for the linkage of a to-many relationship if a custom
+        ``query`` attribute of the model leaves them out.
+
+        """
+        self.session.add_all([self.Person(id=1), self.Article(id=1), self.Article(id=2)])
+        self.session.commit()
+        # Load the articles into the identity map, which only keeps weak
+        # references to them.
+        articles = self.session.query(self.Article).all()
+        visible = aliased(self.Article)
+        self.Article.query = classmethod(lambda cls: Query(cls).join(visible, and_(visible.id == cls.id, visible.id != 2)))
+        self.manager.create_api(self.Person, methods=['PATCH'],
+                                url_prefix='/api2',
+                                allow_to_many_replacement=True)
+        data = {
+            'data': {
+                'type': 'person',
+                'id': '1',
+                'relationships': {
+                    'articles': {
+                        'data': [{'type': 'article', 'id': str(i)} for i in range(1, 3)]
+                    }
+                }
+            }
+        }
+        response = self.app.patch('/api2/person/1', json=data)
+        assert response.status_code == 404
+        details = [error['detail'] for error in response.json['errors']]
+        assert details == ['No object of type article found with ID 2']
+        assert len(articles) == 2
+
+    def test_nonexistent_to_many_linkage(self):
+        """Tests that every missing resource in the linkage of a to-many
+        relationship is reported.
+
+        """
+        self.session.add_all([self.Person(id=1), self.Article(id=1)])
+        self.session.commit()
+        self.manager.create_api(self.Person, methods=['PATCH'],
+                                url_prefix='/api2',
+                                allow_to_many_replacement=True)
+        data = {
+            'data': {
+                'type': 'person',
+                'id': '1',
+                'relationships': {
+                    'articles': {
+                        'data': [{'type': 'article', 'id': str(i)} for i in range(1, 4)]
+                    }
+                }
+            }
+        }
+        response = self.app.patch('/api2/person/1', json=data)
+        assert response.status_code == 404
+        details = [error['detail'] for error in response.json['errors']]
+        assert details == ['No object of type article found with ID 2', 'No object of type article found with ID 3']
+
     def test_relationship_empty_object(self):
         """Tests for an error response on a missing ``'data'`` key in a
         relationship object.
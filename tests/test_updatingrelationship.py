@@ -20,10 +20,13 @@ specification.
 from sqlalchemy import Column
 from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
+from sqlalchemy import Table
+from sqlalchemy import event
 from sqlalchemy.orm import backref
 from sqlalchemy.orm import relationship
 
 from .helpers import ManagerTestBase
+from .helpers import check_sole_error
 from .helpers import dumps
 
 
@@ -540,6 +543,12 @@ class TestDeleting(ManagerTestBase):
                                    json=data)
         assert response.status_code == 204
         assert has_run == [True]
+        # Deleting a resource that is not related is silently ignored, and
+        # the postprocessor is told that nothing was deleted.
+        response = self.app.delete('/api2/person/1/relationships/articles',
+                                   json=data)
+        assert response.status_code == 204
+        assert has_run == [True, False]
 
 
 class TestUpdatingToMany(ManagerTestBase):
@@ -1006,3 +1015,109 @@ class TestUpdatingToOne(ManagerTestBase):
                                   data=data)
         assert response.status_code == 400
         # TODO check error message here
+
+
+class TestAssociationTable(ManagerTestBase):
+    """Tests for adding to and deleting from a many-to-many relationship
+    via the relationship URL by changing the rows of the association
+    table.
+
+    """
+
+    def setUp(self):
+        super(TestAssociationTable, self).setUp()
+        article_tags = Table('article_tags', self.Base.metadata,
+                             Column('article_id', Integer, ForeignKey('article.id'), primary_key=True),
+                             Column('tag_id', Integer, ForeignKey('tag.id'), primary_key=True))
+
+        class Article(self.Base):
+            __tablename__ = 'article'
+            id = Column(Integer, primary_key=True)
+            tags = relationship('Tag', secondary=article_tags, backref='articles')
+
+        class Tag(self.Base):
+            __tablename__ = 'tag'
+            id = Column(Integer, primary_key=True)
+
+        self.Article = Article
+        self.Tag = Tag
+        self.article_tags = article_tags
+        self.Base.metadata.create_all(bind=self.engine)
+        self.manager.create_api(Article, methods=['GET', 'PATCH'], allow_delete_from_to_many_relationships=True)
+        self.manager.create_api(Tag)
+
+    def loaded_tags(self):
+        """Returns the IDs of the tags loaded from the database from now on."""
+        loaded = []
+        event.listen(self.Tag, 'load', lambda target, context: loaded.append(target.id))
+        return loaded
+
+    def tag_ids(self):
+        rows = self.session.execute(self.article_tags.select().order_by(self.article_tags.c.tag_id))
+        return [(row.article_id, row.tag_id) for row in rows]
+
+    def test_add(self):
+        """Tests that adding to the relationship only loads the requested
+        resources and inserts only the missing rows.
+
+        """
+        self.session.add_all([self.Article(id=1, tags=[self.Tag(id=1), self.Tag(id=2)]), self.Tag(id=3)])
+        self.session.commit()
+        self.session.expunge_all()
+        loaded = self.loaded_tags()
+        data = {'data': [{'type': 'tag', 'id': '2'}, {'type': 'tag', 'id': '3'}, {'type': 'tag', 'id': '3'}]}
+        response = self.app.post('/api/article/1/relationships/tags', json=data)
+        assert response.status_code == 204
+        assert sorted(loaded) == [2, 3]
+        assert self.tag_ids() == [(1, 1), (1, 2), (1, 3)]
+        response = self.app.get('/api/article/1/relationships/tags')
+        assert [tag['id'] for tag in response.json['data']] == ['1', '2', '3']
+
+    def test_delete(self):
+        """Tests that deleting from the relationship only loads the
+        requested resources and ignores the ones that are not related.
+
+        """
+        self.session.add_all([self.Article(id=1, tags=[self.Tag(id=1), self.Tag(id=2)]), self.Tag(id=3)])
+        self.session.commit()
+        self.session.expunge_all()
+        loaded = self.loaded_tags()
+        data = {'data': [{'type': 'tag', 'id': '1'}, {'type': 'tag', 'id': '3'}]}
+        response = self.app.delete('/api/article/1/relationships/tags', json=data)
+        assert response.status_code == 204
+        assert sorted(loaded) == [1, 3]
+        assert self.tag_ids() == [(1, 2)]
+        tag = self.session.get(self.Tag, 1)
+        assert tag.articles == []
+
+    def test_delete_postprocessor(self):
+        """Tests that postprocessors are told whether any row of the
+        association table was deleted.
+
+        """
+        self.session.add_all([self.Article(id=1, tags=[self.Tag(id=1)]), self.Tag(id=2)])
+        self.session.commit()
+        has_run = []
+
+        def record(was_deleted=None, **kw):
+            has_run.append(was_deleted)
+
+        postprocessors = {'DELETE_RELATIONSHIP': [record]}
+        self.manager.create_api(self.Article, methods=['PATCH'], url_prefix='/api2', postprocessors=postprocessors,
+                                allow_delete_from_to_many_relationships=True)
+        for id_ in ('2', '1'):
+            response = self.app.delete('/api2/article/1/relationships/tags', json={'data': [{'type': 'tag', 'id': id_}]})
+            assert response.status_code == 204
+        assert has_run == [False, True]
+
+    def test_nonexistent_linkage(self):
+        """Tests that every missing resource is reported and nothing is
+        added.
+
+        """
+        self.session.add_all([self.Article(id=1), self.Tag(id=1)])
+        self.session.commit()
+        data = {'data': [{'type': 'tag', 'id': '1'}, {'type': 'tag', 'id': '2'}]}
+        response = self.app.post('/api/article/1/relationships/tags', json=data)
+        check_sole_error(response, 404, ['No object of type', 'tag', 'found with ID 2'])
+        assert self.tag_ids() == []